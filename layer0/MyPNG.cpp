@@ -357,6 +357,26 @@ int MyPNGWrite(pymol::zstring_view file_name_view, const pymol::Image& img,
     }
     return 1;
     break;
+  case cMyPNG_FormatRGBA:
+    {
+      const size_t rowbytes = 4 * width;
+      png_outbuf_t buffer;
+      png_outbuf_t* out = io_ptr ? io_ptr : &buffer;
+      out->reserve(out->size() + rowbytes * height);
+      for(int b = height - 1; b >= 0; b--) {
+        const unsigned char* p = data_ptr + rowbytes * b;
+        out->insert(out->end(), p, p + rowbytes);
+      }
+      if(!io_ptr) {
+        FILE *fil = pymol_fopen(file_name, "wb");
+        if(!fil)
+          return 0;
+        fwrite(buffer.data(), 1, buffer.size(), fil);
+        fclose(fil);
+      }
+    }
+    return 1;
+    break;
   }
   return 0;
 }
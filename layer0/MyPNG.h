@@ -28,6 +28,7 @@ Z* -------------------------------------------------------------------
 
 #define cMyPNG_FormatPNG 0
 #define cMyPNG_FormatPPM 1
+#define cMyPNG_FormatRGBA 2 /* raw, top row first */
 
 int MyPNGWrite(pymol::zstring_view file_name, const pymol::Image& img, const float dpi,
     const int format, const int quiet, const float screen_gamma,
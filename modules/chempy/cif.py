@@ -12,8 +12,13 @@
 #-*
 #Z* -------------------------------------------------------------------
 
+import bz2
+import gzip
+import io
 import re
 
+import numpy
+
 from chempy import Atom, Bond
 from chempy.models import Indexed
 
@@ -86,6 +91,31 @@ class ciftokeniter(object):
                 break
             yield s
 
+def _read_item(s, token_it, block):
+    '''
+    Read a key-value pair or a loop, starting with token s. Return False
+    if s is neither a key nor "loop_".
+    '''
+    s_lower = s.lower()
+    if s[0] == '_':
+        key = s_lower.replace('.', '_')
+        block.key_value[key] = next(token_it)
+    elif s_lower == 'loop_':
+        loop = CIFLoop()
+        block.loops.append(loop)
+        for i, key in enumerate(token_it.loopkeysiter()):
+            key = key.lower().replace('.', '_')
+            loop.keys[key] = i
+        ncols = len(loop.keys)
+        for i, value in enumerate(token_it.loopdataiter()):
+            if i % ncols == 0:
+                row = []
+                loop.rows.append(row)
+            row.append(value)
+    else:
+        return False
+    return True
+
 def parse_cif(cifstr):
     '''
     Parse a CIF string and return an iterator over CIFData records.
@@ -96,21 +126,8 @@ def parse_cif(cifstr):
 
     for s in token_it:
         s_lower = s.lower()
-        if s[0] == '_':
-            key = s_lower.replace('.', '_')
-            current_block.key_value[key] = next(token_it)
-        elif s_lower == 'loop_':
-            loop = CIFLoop()
-            current_block.loops.append(loop)
-            for i, key in enumerate(token_it.loopkeysiter()):
-                key = key.lower().replace('.', '_')
-                loop.keys[key] = i
-            ncols = len(loop.keys)
-            for i, value in enumerate(token_it.loopdataiter()):
-                if i % ncols == 0:
-                    row = []
-                    loop.rows.append(row)
-                row.append(value)
+        if _read_item(s, token_it, current_block):
+            pass
         elif s_lower[:5] == 'data_':
             if current_data is not None:
                 yield current_data
@@ -127,6 +144,162 @@ def parse_cif(cifstr):
     if current_data is not None:
         yield current_data
 
+def _open_binary(source):
+    '''
+    Open a file name or file object for binary reading. Gzipped input is
+    detected by its magic number and decompressed incrementally.
+    '''
+    if isinstance(source, str):
+        handle = open(source, 'rb')
+    elif isinstance(getattr(source, 'mode', 'b'), str) and \
+            'b' not in getattr(source, 'mode', 'b'):
+        # text mode file object
+        return (line.encode('utf-8') for line in source)
+    else:
+        handle = source
+
+    if not hasattr(handle, 'peek'):
+        handle = io.BufferedReader(handle)
+
+    magic = handle.peek(10)[:10]
+    if magic[:2] == b'\x1f\x8b':
+        handle = gzip.GzipFile(fileobj=handle)
+    elif magic[:2] == b'BZ' and magic[4:10] == b'1AY&SY':
+        handle = bz2.BZ2File(handle)
+
+    return handle
+
+def _iter_lines(handle, size=1 << 22):
+    '''
+    Iterate over the lines of a binary file object, reading it in large
+    chunks (much faster than readline for compressed streams).
+    '''
+    if not hasattr(handle, 'read'):
+        yield from handle
+        return
+
+    tail = b''
+    while True:
+        chunk = handle.read(size)
+        if not chunk:
+            break
+        lines = (tail + chunk).splitlines(True)
+        tail = lines.pop()
+        if tail[-1:] == b'\n':
+            lines.append(tail)
+            tail = b''
+        yield from lines
+
+    if tail:
+        yield tail
+
+# first characters of lines which can't start a tag, a reserved word, a
+# comment or a text field (used to skip _line_keyword for loop data)
+_plain_line_start = frozenset(bytes([c]) for c in range(33, 127)
+        if bytes([c]) not in b'_#;dDsSlL')
+
+def _line_keyword(line):
+    '''
+    Lower case first token of a line if it is a tag or a reserved word
+    (data_, save_, loop_), or None. Comment and blank lines give ''.
+    '''
+    stripped = line.lstrip()
+    if not stripped or stripped[:1] == b'#':
+        return ''
+    if stripped[:1] == b'_':
+        return '_'
+    word = stripped[:5].lower()
+    if word in (b'data_', b'save_', b'loop_'):
+        return word.decode()
+    return None
+
+def parse_cif_stream(source):
+    '''
+    Parse a CIF file (file name or file object, optionally gzipped) line
+    by line and return an iterator over CIFData records.
+
+    Unlike parse_cif, loop data is not tokenized while reading. Loops are
+    CIFArrayLoop instances which tokenize their data on first access and
+    convert individual columns to NumPy arrays on demand.
+    '''
+    current_data = current_block = None
+
+    buf = []        # lines of non-loop content
+    loop = None     # loop which receives data lines
+    loop_lines = []
+    in_text = False # inside a semicolon text field
+
+    def flush():
+        if buf:
+            token_it = ciftokeniter(b''.join(buf).decode('utf-8', 'replace'))
+            for s in token_it:
+                if not _read_item(s, token_it, current_block):
+                    raise ValueError(s)
+            del buf[:]
+        if loop is not None:
+            loop._data = b''.join(loop_lines)
+            del loop_lines[:]
+
+    for line in _iter_lines(_open_binary(source)):
+        if loop is not None and not in_text and \
+                line[:1] in _plain_line_start and loop.keys:
+            loop_lines.append(line)
+            continue
+
+        if line[:1] == b';':
+            in_text = not in_text
+        elif in_text:
+            pass
+        else:
+            keyword = _line_keyword(line)
+
+            if loop is not None:
+                if keyword is None:
+                    loop_lines.append(line)
+                    continue
+                if keyword == '':
+                    continue
+                if keyword == '_' and not loop_lines:
+                    loop.add_keys(line.split())
+                    continue
+                flush()
+                loop = None
+
+            if keyword == 'loop_':
+                flush()
+                tokens = line.split()
+                if len(tokens) > 1:
+                    # keys on the same line as "loop_", handle by buffer
+                    buf.append(line)
+                    continue
+                loop = CIFArrayLoop()
+                current_block.loops.append(loop)
+                continue
+
+            if keyword in ('data_', 'save_'):
+                flush()
+                name = line.strip()[5:].decode('utf-8', 'replace')
+                if keyword == 'data_':
+                    if current_data is not None:
+                        yield current_data
+                    current_block = current_data = CIFData(name)
+                elif name:
+                    current_block = CIFData(name)
+                    current_data.saveframes.append(current_block)
+                else:
+                    current_block = current_data
+                continue
+
+        if loop is not None:
+            loop_lines.append(line)
+        else:
+            buf.append(line)
+
+    flush()
+
+    if current_data is not None:
+        yield current_data
+
 def _row_get(row, i, d, cast):
     if i < 0:
         return d
@@ -162,6 +335,153 @@ class CIFLoop:
             raise KeyError
         return idx
 
+# whitespace lookup table for the vectorized tokenizer
+_isspace = numpy.zeros(256, dtype=bool)
+_isspace[list(b' \t\n\r\v\f')] = True
+
+class CIFArrayLoop(CIFLoop):
+    '''
+    CIF loop (table) with lazy tokenization and per-column NumPy arrays.
+
+    The raw loop data is kept as bytes. Rows of string tokens (for
+    compatibility with CIFLoop) and columns are only created when accessed.
+    '''
+    def __init__(self):
+        self.keys = {}
+        self._data = b''
+        self._rows = None
+        self._tokens = None
+        self._bounds = None
+        self._columns = {}
+
+    def add_keys(self, keys):
+        for key in keys:
+            key = key.decode().lower().replace('.', '_')
+            self.keys[key] = len(self.keys)
+
+    def _tokenize(self):
+        '''
+        Split the loop data into tokens. Data without comments, text
+        fields, quoted values with whitespace or non-ASCII characters is
+        split with NumPy into token start/end offsets, everything else goes
+        through the regular expression tokenizer.
+        '''
+        if self._bounds is not None or self._tokens is not None:
+            return
+
+        data = self._data
+        buf = numpy.frombuffer(data, dtype=numpy.uint8)
+
+        if not ((buf > 127).any() or data[:1] == b';' or b'\n;' in data):
+            isspace = _isspace[buf]
+            edges = numpy.diff(numpy.concatenate(([1], isspace, [1])).astype(numpy.int8))
+            starts = numpy.flatnonzero(edges == -1)
+            ends = numpy.flatnonzero(edges == 1)
+
+            first = buf[starts]
+            quoted = (first == ord('"')) | (first == ord("'"))
+            if quoted.any():
+                # quoted values without whitespace, strip the quotes
+                qstarts, qends = starts[quoted], ends[quoted]
+                if ((qends - qstarts < 2) |
+                        (buf[qends - 1] != first[quoted])).any():
+                    quoted = None
+                else:
+                    starts[quoted] += 1
+                    ends[quoted] -= 1
+
+            if quoted is not None and not (first == ord('#')).any():
+                self._bounds = (starts, ends)
+                return
+
+        tokens = token_re.findall(data.decode('utf-8', 'replace') + '\n')
+        if b'#' in data:
+            tokens = [t for t in tokens if t[0] != '#']
+        self._tokens = tokens
+
+    def __len__(self):
+        self._tokenize()
+        if self._tokens is not None:
+            ntokens = len(self._tokens)
+        else:
+            ntokens = len(self._bounds[0])
+        return ntokens // max(1, len(self.keys))
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._tokenize()
+            ncols = len(self.keys)
+            if self._tokens is not None:
+                tokens = self._tokens
+            else:
+                tokens = self._data.split()
+                tokens = [t.decode() for t in tokens]
+            self._rows = [tokens[i:i + ncols]
+                    for i in range(0, len(self) * ncols, ncols)]
+        return self._rows
+
+    def _column(self, idx):
+        '''
+        Unquoted string tokens of column idx as a NumPy bytes array (or
+        unicode array if there are non-ASCII characters)
+        '''
+        col = self._columns.get(idx)
+        if col is not None:
+            return col
+
+        self._tokenize()
+        ncols = len(self.keys)
+        nrows = len(self)
+
+        if self._tokens is not None:
+            col = numpy.array([unquote(t) if t[0] in '\'";[' else t
+                for t in self._tokens[idx:nrows * ncols:ncols]], dtype=str)
+            if col.size and max(map(ord, ''.join(col.tolist()))) < 128:
+                col = col.astype(bytes)
+        else:
+            starts = self._bounds[0][idx:nrows * ncols:ncols]
+            ends = self._bounds[1][idx:nrows * ncols:ncols]
+            lengths = ends - starts
+            width = max(1, int(lengths.max())) if nrows else 1
+            offsets = numpy.arange(width)
+            gather = numpy.minimum(starts[:, None] + offsets, len(self._data) - 1)
+            chars = numpy.frombuffer(self._data, dtype=numpy.uint8)[gather]
+            chars[offsets >= lengths[:, None]] = 0
+            col = chars.view('S%d' % width).ravel()
+
+        self._columns[idx] = col
+        return col
+
+    def get_str(self, *names):
+        '''
+        Get the first found column in names as a string array, with '.'
+        and '?' (missing values) mapped to empty strings. Raise KeyError
+        if no column is found.
+        '''
+        col = self._column(self.get_col_idx(*names)).astype(str)
+        return numpy.where((col == '.') | (col == '?'), '', col)
+
+    def get_array(self, *names, dtype=float, default=0):
+        '''
+        Get the first found column in names as a typed NumPy array, with
+        '.' and '?' mapped to default. Raise KeyError if no column is
+        found.
+        '''
+        col = self._column(self.get_col_idx(*names))
+        char = col.dtype.type
+        missing = (col == char('.')) | (col == char('?'))
+        if missing.any():
+            col = numpy.where(missing, char('0'), col)
+        if numpy.dtype(dtype).kind == 'f' and \
+                numpy.char.find(col, char('(')).max(initial=-1) >= 0:
+            arr = numpy.array([scifloat(str(v, 'ascii') if char is bytes
+                else v) for v in col.tolist()], dtype=dtype)
+        else:
+            arr = col.astype(dtype)
+        arr[missing] = default
+        return arr
+
 class CIFData:
     '''
     CIF data
@@ -170,7 +490,7 @@ class CIFData:
         self.name = name
         self.loops = []
         self.key_value = {}
-        self.saveframes = {}
+        self.saveframes = []
 
     def __repr__(self):
         return '<%s:%s #kv=%d #loops=%d>' % (type(self).__name__,
@@ -666,12 +986,176 @@ class CIFRec(CIFData):
         return True
 
 
+class CIFArrayRec(CIFData):
+    '''
+    CIF record with a columnar chempy.fast.FastModel, read from a data
+    block of parse_cif_stream without creating a chempy.Atom per row.
+
+    Only coordinates from _atom_site.cartn_* and covalent bonds from
+    _struct_conn are read. Other data blocks (e.g. fractional coordinates
+    or chemical components) go through CIFRec and are converted.
+    '''
+    def __init__(self, datablock):
+        from chempy.fast import FastModel
+
+        self.loops = datablock.loops
+        self.key_value = datablock.key_value
+        self.name = datablock.name
+
+        # coordinates for state 2-N, as (N, 3) array
+        self.extra_coords = numpy.zeros((0, 3))
+
+        for loop in self.loops:
+            if '_atom_site_fract_x' in loop.keys:
+                break
+            if isinstance(loop, CIFArrayLoop) and \
+                    self.read_atom_site_cartn(loop):
+                self.model.molecule.title = datablock.name
+                self.model.connect_mode = 3
+                self.read_symmetry()
+                for loop in self.loops:
+                    if isinstance(loop, CIFArrayLoop) and \
+                            self.read_struct_conn_(loop):
+                        break
+                return
+
+        rec = CIFRec(datablock)
+        # keeps connect_mode, cell, spacegroup, ...
+        self.model = FastModel().from_indexed(rec.model)
+        self.extra_coords = numpy.reshape(rec.extra_coords, (-1, 3))
+
+    read_symmetry = CIFRec.read_symmetry
+
+    def read_atom_site_cartn(self, loop):
+        from chempy.fast import FastModel
+
+        try:
+            coord = numpy.column_stack([
+                loop.get_array('_atom_site.cartn_x'),
+                loop.get_array('_atom_site.cartn_y'),
+                loop.get_array('_atom_site.cartn_z')])
+        except KeyError:
+            return False
+
+        columns = {'coord': coord}
+
+        # use auth fields preferentially, if provided
+        for (attr, names) in [
+                ('symbol', ('_atom_site.type_symbol',)),
+                ('name', ('_atom_site.auth_atom_id', '_atom_site.label_atom_id')),
+                ('resn', ('_atom_site.auth_comp_id', '_atom_site.label_comp_id')),
+                ('chain', ('_atom_site.auth_asym_id', '_atom_site.label_asym_id')),
+                ('alt', ('_atom_site.label_alt_id',)),
+                ('ins_code', ('_atom_site.pdbx_pdb_ins_code',)),
+                ]:
+            try:
+                columns[attr] = loop.get_str(*names)
+            except KeyError:
+                pass
+
+        if ASYM_ID_AS_SEGI and 'chain' in columns:
+            columns['segi'] = columns['chain']
+
+        for (attr, names, dtype) in [
+                ('resi_number', ('_atom_site.auth_seq_id', '_atom_site.label_seq_id'), int),
+                ('q', ('_atom_site.occupancy',), float),
+                ('b', ('_atom_site.b_iso_or_equiv',), float),
+                ('id', ('_atom_site.id',), int),
+                ]:
+            try:
+                columns[attr] = loop.get_array(*names, dtype=dtype)
+            except KeyError:
+                pass
+
+        try:
+            columns['hetatm'] = loop.get_str('_atom_site.group_pdb') != 'ATOM'
+        except KeyError:
+            pass
+
+        try:
+            model_num = loop.get_array('_atom_site.pdbx_pdb_model_num', dtype=int)
+        except KeyError:
+            pass
+        else:
+            first = model_num == model_num[:1]
+            if not first.all():
+                self.extra_coords = coord[~first]
+                columns = dict((k, v[first]) for (k, v) in columns.items())
+
+        self.model = FastModel.from_columns(columns)
+        return True
+
+    def read_struct_conn_(self, loop):
+        '''
+        Create bonds from STRUCT_CONN category
+        '''
+        try:
+            type_id = loop.get_str('_struct_conn.conn_type_id')
+            keys = [[loop.get_str(*names) for names in [
+                ('_struct_conn.ptnr%d_auth_asym_id' % p, '_struct_conn.ptnr%d_label_asym_id' % p),
+                ('_struct_conn.ptnr%d_auth_comp_id' % p, '_struct_conn.ptnr%d_label_comp_id' % p),
+                ('_struct_conn.ptnr%d_auth_seq_id' % p, '_struct_conn.ptnr%d_label_seq_id' % p),
+                ('_struct_conn.ptnr%d_label_atom_id' % p,),
+                ]] for p in (1, 2)]
+        except KeyError:
+            return False
+
+        nrows = len(type_id)
+        for (p, prefix) in [(0, '_struct_conn.pdbx_ptnr1_'), (1, '_struct_conn.pdbx_ptnr2_')]:
+            for suffix in ('pdb_ins_code', 'label_alt_id'):
+                try:
+                    keys[p].append(loop.get_str(prefix + suffix))
+                except KeyError:
+                    keys[p].append(numpy.full(nrows, ''))
+
+        try:
+            symm = [loop.get_str('_struct_conn.ptnr1_symmetry'),
+                    loop.get_str('_struct_conn.ptnr2_symmetry')]
+        except KeyError:
+            symm = [numpy.full(nrows, '')] * 2
+
+        # ignore non-covalent bonds (metalc, hydrog) and symmetry mates
+        mask = (numpy.char.lower(type_id) == 'covale') & (symm[0] == symm[1])
+        if not mask.any():
+            return True
+
+        # only index atoms from residues which take part in a bond
+        atom = self.model.atom
+        resi = numpy.char.add(atom['resi_number'].astype(str), atom['ins_code'])
+        partners = numpy.concatenate([
+            numpy.char.add(keys[p][2][mask], keys[p][4][mask]) for p in (0, 1)])
+        candidates = numpy.flatnonzero(numpy.isin(resi, partners))
+
+        atom_dict = dict(((atom['chain'][i], atom['resn'][i], resi[i],
+            atom['name'][i], atom['alt'][i]), i) for i in candidates.tolist())
+
+        bonds = []
+        for row in numpy.flatnonzero(mask).tolist():
+            key_1, key_2 = [(k[0][row], k[1][row], k[2][row] + k[4][row],
+                k[3][row], k[5][row]) for k in keys]
+            try:
+                bonds.append((atom_dict[key_1], atom_dict[key_2], 1))
+            except KeyError:
+                print(" CIF _struct_conn, invalid keys:", key_1, key_2)
+
+        self.model.add_bonds(bonds)
+        return True
+
 class CIF:
 
-    def __init__(self, fname, mode='r'):
+    def __init__(self, fname, mode='r', stream=False):
+        '''
+        @param stream: If True, parse the file incrementally with
+        parse_cif_stream and return CIFArrayRec records (with a columnar
+        chempy.fast.FastModel).
+        '''
         if mode not in ('r','pf'):
             print(" CIF: bad mode")
             return None
+        self.rec_type = CIFArrayRec if stream else CIFRec
+        if stream:
+            self.datablocks_it = parse_cif_stream(fname)
+            return
         if mode=='pf': # pseudofile
             contents = fname.read()
         else:
@@ -680,14 +1164,16 @@ class CIF:
                 contents = file_read(fname)
             except ImportError:
                 contents = open(fname, mode).read()
+        if isinstance(contents, bytes): # file_read
+            contents = contents.decode('utf-8', 'replace')
         self.datablocks_it = parse_cif(contents)
 
     def __iter__(self):
         return self
 
     def next(self):
-        rec = CIFRec(next(self.datablocks_it))
-        if rec.model.atom:
+        rec = self.rec_type(next(self.datablocks_it))
+        if rec.model.nAtom:
             return rec
         return next(self)
 
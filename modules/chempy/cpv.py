@@ -319,89 +319,113 @@ def fit(target_array, source_array):
     if len(target_array[0]) != 3 or len(source_array[0]) != 3:
         print ("Error: arrays must be dimension 3 for RMS fitting.")
         raise ValueError
-    nvec = len(target_array)
-    ndim = 3
-    maxiter = 200
-    tol = 0.001
-
-# Calculate translation vectors (center-of-mass).
-
-    t1 = get_null()
-    t2 = get_null()
-    tvec1 = get_null()
-    tvec2 = get_null()
-
-    for i in range(nvec):
-        for j in range(ndim):
-            t1[j] = t1[j] + target_array[i][j]
-            t2[j] = t2[j] + source_array[i][j]
-    for j in range(ndim):
-        t1[j] = t1[j] / nvec
-        t2[j] = t2[j] / nvec
-
-# Calculate correlation matrix.
-
-    corr_mtx = []
-    for i in range(ndim):
-        temp_vec = []
-        for j in range(ndim):
-            temp_vec.append(0.0)
-        corr_mtx.append(temp_vec)
-
-    rot_mtx = []
-    for i in range(ndim):
-        temp_vec = []
-        for j in range(ndim):
-            temp_vec.append(0.0)
-        rot_mtx.append(temp_vec)
-    for i in range(ndim):
-        rot_mtx[i][i] = 1.
-
-    for i in range(nvec):
-        for j in range(ndim):
-            tvec1[j] = target_array[i][j] - t1[j]
-            tvec2[j] = source_array[i][j] - t2[j]
-        for j in range(ndim):
-            for k in range(ndim):
-                corr_mtx[j][k] = corr_mtx[j][k] + tvec2[j]*tvec1[k]
-
-# Main iteration scheme (hardwired for 3X3 matrix, but could be extended).
-
-    iters = 0
-    while (iters < maxiter):
-        iters = iters + 1
-        ix = (iters-1)%ndim
-        iy = iters%ndim
-        iz = (iters+1)%ndim
-        sig = corr_mtx[iz][iy] - corr_mtx[iy][iz]
-        gam = corr_mtx[iy][iy] + corr_mtx[iz][iz]
-
-        sg = (sig**2 + gam**2)**0.5
-        if sg != 0.0 and (abs(sig) > tol*abs(gam)):
-            sg = 1.0 / sg
-            for i in range(ndim):
-
-                bb = gam*corr_mtx[iy][i] + sig*corr_mtx[iz][i]
-                cc = gam*corr_mtx[iz][i] - sig*corr_mtx[iy][i]
-                corr_mtx[iy][i] = bb*sg
-                corr_mtx[iz][i] = cc*sg
-
-                bb = gam*rot_mtx[iy][i] + sig*rot_mtx[iz][i]
-                cc = gam*rot_mtx[iz][i] - sig*rot_mtx[iy][i]
-                rot_mtx[iy][i] = bb*sg
-                rot_mtx[iz][i] = cc*sg
-
-        else:
-# We have a converged rotation matrix.  Calculate RMS deviation.
-            vt1 = translate_array(negate(t1),target_array)
-            vt2 = translate_array(negate(t2),source_array)
-            vt3 = transform_array(rot_mtx,vt2)
-            rmsd = 0.0
-            for i in range(nvec):
-                rmsd = rmsd + distance_sq(vt1[i], vt3[i])
-            rmsd = math.sqrt(rmsd/nvec)
-            return(t1, t2, rot_mtx, rmsd)
-
-# Too many iterations; something wrong.
-    print ("Error: Too many iterations in RMS fit.")
-    raise ValueError
+
+    t1, t2, rot_mtx, rmsd = fit_arrays(target_array, source_array)
+    return (t1.tolist(), t2.tolist(), rot_mtx.tolist(), float(rmsd))
+
+#------------------------------------------------------------------------------
+def fit_arrays(target_array, source_array, weights=None):
+
+    '''fit_arrays(target_array, source_array, weights=None)
+        -> (t1, t2, rot_mtx, rmsd) [fit_result]
+
+    NumPy version of fit (Kabsch, by singular value decomposition) with
+    optional per-atom weights. Results are arrays, with
+
+        target ~ t1 + (source - t2) . rot_mtx^T
+
+    source_array may be a stack of coordinate sets (frames x atoms x 3),
+    which are all fitted onto target_array (atoms x 3), or pairwise onto
+    a target stack of the same shape. Then each result has a leading
+    frames dimension.
+    '''
+
+    import numpy
+
+    target = numpy.asarray(target_array, dtype=float)
+    source = numpy.asarray(source_array, dtype=float)
+    if target.ndim not in (2, 3) or source.ndim not in (2, 3) or \
+            target.shape[-1] != 3 or source.shape[-1] != 3:
+        raise ValueError("arrays must be (atoms x 3) or (frames x atoms x 3)")
+    if target.shape[-2] != source.shape[-2]:
+        raise ValueError("arrays must be of same length for RMS fitting")
+    if target.ndim == 3 and target.shape != source.shape:
+        raise ValueError("target stack must match the source stack")
+
+    if weights is None:
+        weights = numpy.full(source.shape[-2], 1.0 / source.shape[-2])
+    else:
+        weights = numpy.asarray(weights, dtype=float)
+        if weights.shape != source.shape[-2:-1]:
+            raise ValueError("need one weight per atom")
+        weights = weights / weights.sum()
+    weights = weights[:, None]
+
+# Centers and weighted correlation matrix.
+
+    t1 = (target * weights).sum(-2)
+    t2 = (source * weights).sum(-2)
+    target = target - t1[..., None, :]
+    source = source - t2[..., None, :]
+    corr_mtx = numpy.matmul((source * weights).swapaxes(-1, -2), target)
+
+# Optimal rotation, without reflection.
+
+    u, _, vt = numpy.linalg.svd(corr_mtx)
+    det = numpy.linalg.det(numpy.matmul(u, vt))
+    u[..., :, 2] *= numpy.where(det < 0.0, -1.0, 1.0)[..., None]
+    rot_mtx = numpy.matmul(u, vt).swapaxes(-1, -2)
+
+    diff = numpy.matmul(source, rot_mtx.swapaxes(-1, -2)) - target
+    rmsd = numpy.sqrt(((diff ** 2).sum(-1) * weights[:, 0]).sum(-1))
+
+    return (t1, t2, rot_mtx, rmsd)
+
+#------------------------------------------------------------------------------
+def transform_array_inplace(rot_mtx, vec_array):
+
+    '''transform_array_inplace(matrix, vec_array) -> vec_array
+
+    Transforms a float NumPy array of vectors (... x 3) in place. A stack
+    of matrices (frames x 3 x 3) transforms a stack of arrays.
+    '''
+
+    import numpy
+
+    rot_mtx = numpy.asarray(rot_mtx, dtype=float)
+    vec_array[...] = numpy.matmul(vec_array, rot_mtx.swapaxes(-1, -2))
+    return vec_array
+
+#------------------------------------------------------------------------------
+def translate_array_inplace(trans_vec, vec_array):
+
+    '''translate_array_inplace(trans_vec, vec_array) -> vec_array
+
+    Adds 'trans_vec' (or one vector per frame of a stack) to each element
+    of a float NumPy array of vectors, in place.
+    '''
+
+    import numpy
+
+    trans_vec = numpy.asarray(trans_vec, dtype=float)
+    vec_array += trans_vec[..., None, :]
+    return vec_array
+
+#------------------------------------------------------------------------------
+def fit_apply_inplace(fit_result, vec_array):
+
+    '''fit_apply_inplace(fit_result, vec_array) -> vec_array
+
+    Applies a fit or fit_arrays result to a float NumPy array of vectors
+    (atoms x 3, or frames x atoms x 3 for a batched result) in place.
+
+    >>> fit_apply_inplace(fit_arrays(frames[0], frames[:, sele]), frames)
+    '''
+
+    import numpy
+
+    t1, t2, m = fit_result[:3]
+    translate_array_inplace(-numpy.asarray(t2, dtype=float), vec_array)
+    transform_array_inplace(m, vec_array)
+    translate_array_inplace(t1, vec_array)
+    return vec_array
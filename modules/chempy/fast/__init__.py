@@ -1,12 +1,161 @@
+'''
+Columnar (structure of arrays) chempy model.
+
+A FastModel stores one record per atom in a NumPy structured array instead
+of one chempy.Atom instance per atom. It converts losslessly to and from
+chempy.models.Indexed and can be passed to cmd.load_model. Use
+cmd.get_model(..., fast=1) to obtain one from PyMOL.
+
+>>> model = cmd.get_model('polymer', fast=1)
+>>> model.atom['b'][model.atom['name'] == 'CA'] = 50.0
+>>> cmd.load_model(model, 'copy')
+'''
 
-import chempy
 import copy
+
+import numpy
+
+import chempy
 from chempy.models import Indexed
 
-from Numeric import *
-from Precision import *
+# (attribute, kind) for every per-atom column. kind is one of 's' (string),
+# 'i' (integer), 'u' (32bit flags, signed or unsigned), 'f' (float), '3f',
+# '6f' (fixed size float vectors).
+atom_fields = (
+    ('model',           's'),
+    ('name',            's'),
+    ('symbol',          's'),
+    ('resn',            's'),
+    ('resn_code',       's'),
+    ('resi_number',     'i'),
+    ('ins_code',        's'),
+    ('alt',             's'),
+    ('chain',           's'),
+    ('segi',            's'),
+    ('ss',              's'),
+    ('text_type',       's'),
+    ('custom',          's'),
+    ('hetatm',          'i'),
+    ('flags',           'u'),
+    ('color_code',      'i'),
+    ('stereo',          'i'),
+    ('numeric_type',    'i'),
+    ('id',              'i'),
+    ('index',           'i'),
+    ('b',               'f'),
+    ('q',               'f'),
+    ('vdw',             'f'),
+    ('elec_radius',     'f'),
+    ('partial_charge',  'f'),
+    ('formal_charge',   'f'),
+    ('coord',           '3f'),
+    ('ref_coord',       '3f'),
+    ('u_aniso',         '6f'),
+)
+
+bond_fields = (
+    ('order',           'i'),
+    ('stereo',          'i'),
+    ('symmetry_2',      's'),
+)
+
+# bit in the "present" column for every field which was explicitly set on
+# the chempy atom (chempy.Atom.has() semantics)
+atom_bits = dict((name, 1 << i) for (i, (name, _)) in enumerate(atom_fields))
+bond_bits = dict((name, 1 << i) for (i, (name, _)) in enumerate(bond_fields))
+
+# fallback values for attributes without a chempy class default
+_no_default = {
+    's': '',
+    'i': 0,
+    'u': 0,
+    'f': 0.0,
+    '3f': (0.0, 0.0, 0.0),
+    '6f': (0.0,) * 6,
+}
+
+_numpy_type = {
+    'i': numpy.int32,
+    'u': numpy.int64,
+    'f': numpy.float64,
+}
+
+_vector_size = {
+    '3f': 3,
+    '6f': 6,
+}
+
+
+def _default(cls, name, kind):
+    return getattr(cls, name, _no_default[kind])
+
+
+def _differs(column, default):
+    '''
+    Boolean array, True where a column value is not the default value
+    '''
+    isset = column != numpy.asarray(default)
+    if isset.ndim > 1:
+        isset = isset.any(axis=1)
+    return isset
+
+
+def _column(values, kind):
+    '''
+    Make a 1d (or 2d for vector kinds) array from a sequence of values.
+    String columns are sized to the longest value.
+    '''
+    if kind == 's':
+        return numpy.array(values, dtype=str) if len(values) else \
+                numpy.zeros(0, 'U1')
+    if kind in _vector_size:
+        return numpy.array(values, dtype=numpy.float64).reshape(
+                (-1, _vector_size[kind]))
+    return numpy.array(values, dtype=_numpy_type[kind])
+
+
+def _field_dtype(name, kind, column):
+    if kind in _vector_size:
+        return (name, numpy.float64, (_vector_size[kind],))
+    return (name, column.dtype)
+
+
+def _record_array(fields, columns, present, index=None):
+    '''
+    Assemble a structured array from a dict of columns. If given, "index"
+    is prepended as a (n, 2) integer column (bonds).
+    '''
+    dtype = [_field_dtype(name, kind, columns[name])
+             for (name, kind) in fields]
+    dtype.append(('present', numpy.uint32))
+    if index is not None:
+        dtype.insert(0, ('index', numpy.int32, (2,)))
+    arr = numpy.empty(len(present), dtype)
+    for (name, kind) in fields:
+        arr[name] = columns[name]
+    arr['present'] = present
+    if index is not None:
+        arr['index'] = index
+    return arr
+
 
 class FastModel:
+    '''
+    Columnar model with a structured atom array and a structured bond array.
+
+    Atom columns are the chempy.Atom attributes listed in "atom_fields"
+    plus a "present" bit mask. Bond columns are "index" (2 atom indices)
+    plus the attributes listed in "bond_fields" and a "present" bit mask.
+
+    Per-atom "atom_properties" and any non-standard attributes are kept in
+    sparse dictionaries keyed by atom (bond) index. Other model level
+    attributes (e.g. "cell", "spacegroup", "connect_mode") are plain
+    instance attributes, like on chempy.models.Indexed.
+    '''
+
+    # instance attributes which are not model level attributes
+    _internal = ('molecule', 'molecule_properties', 'atom', 'bond',
+            'atom_properties', 'atom_extra', 'bond_extra')
 
 #------------------------------------------------------------------------------
     def __init__(self):
@@ -14,165 +163,196 @@ class FastModel:
 
 #------------------------------------------------------------------------------
     def reset(self):
-        self.nAtom = 0
+        self.__dict__.clear()
         self.molecule = chempy.Molecule()
-        self.txta = None
-        self.inta = None
-        self.flta = None
-        self.crda = None
-        self.bnda = None
+        self.molecule_properties = []
+        self.atom = _record_array(atom_fields,
+                dict((name, _column([], kind)) for (name, kind) in atom_fields),
+                numpy.zeros(0, numpy.uint32))
+        self.bond = _record_array(bond_fields,
+                dict((name, _column([], kind)) for (name, kind) in bond_fields),
+                numpy.zeros(0, numpy.uint32), numpy.zeros((0, 2), int))
+        self.atom_properties = {}
+        self.atom_extra = {}
+        self.bond_extra = {}
+
+    @property
+    def nAtom(self):
+        return len(self.atom)
+
+    @property
+    def nBond(self):
+        return len(self.bond)
+
+    @property
+    def coord(self):
+        '''(nAtom, 3) view of the atom coordinates'''
+        return self.atom['coord']
+
+    def get_coord_list(self):
+        return self.atom['coord'].tolist()
+
+    def has(self, attr, index):
+        '''Like chempy.Atom.has() for the atom at the given index'''
+        return bool(self.atom['present'][index] & atom_bits[attr])
 
 #------------------------------------------------------------------------------
-    def from_indexed(self,model):
+    @classmethod
+    def from_columns(cls, columns, bonds=(), molecule=None):
+        '''
+        Make a model from a dict of per-atom columns (any sequence or
+        array, keyed by chempy.Atom attribute name). Missing columns get
+        chempy defaults, and a value counts as explicitly set if it differs
+        from the chempy.Atom default.
+
+        @param bonds: sequence of (atm1, atm2, order) with 0-based indices
+        '''
+        self = cls()
+        if molecule is not None:
+            self.molecule = molecule
+
+        n = len(columns['coord'])
+        present = numpy.zeros(n, numpy.uint32)
+        arrays = {}
+
+        for (name, kind) in atom_fields:
+            default = _default(chempy.Atom, name, kind)
+            if name in columns:
+                col = _column(columns[name], kind)
+                if hasattr(chempy.Atom, name):
+                    isset = _differs(col, default)
+                else:
+                    isset = numpy.ones(n, bool)
+                present[isset] |= atom_bits[name]
+            else:
+                col = _column([default] * n, kind)
+            arrays[name] = col
+
+        self.atom = _record_array(atom_fields, arrays, present)
+
+        self.add_bonds(bonds)
+
+        return self
+
+    def add_bonds(self, bonds):
+        '''
+        Append bonds from a sequence of (atm1, atm2, order) with 0-based
+        atom indices.
+        '''
+        bonds = numpy.asarray(bonds, dtype=numpy.int32).reshape((-1, 3))
+        nBond = len(bonds)
+        bond_arrays = {
+            'order': bonds[:, 2],
+            'stereo': numpy.zeros(nBond, numpy.int32),
+            'symmetry_2': numpy.zeros(nBond, self.bond.dtype['symmetry_2']),
+        }
+        bond_present = numpy.full(nBond, bond_bits['order'], numpy.uint32)
+        self.bond = numpy.concatenate([self.bond,
+                _record_array(bond_fields, bond_arrays, bond_present,
+                    bonds[:, :2])])
+
+#------------------------------------------------------------------------------
+    def from_indexed(self, model):
+        '''
+        Populate from a chempy.models.Indexed model. Returns self.
+        '''
         self.reset()
-        self.nAtom = model.nAtom
-        self.nBond = model.nBond
         self.molecule = copy.deepcopy(model.molecule)
-        self.txta = resize(array(' ','c'),(self.nAtom,as_width))
-        self.inta = zeros((self.nAtom,ai_width),Int32)
-        self.flta = zeros((self.nAtom,af_width),Float)
-        self.bnda = zeros((self.nBond,bi_width),Int32)
-        self.crda = zeros((self.nAtom,3),Float)
-
-        c = 0
-        for a in model.atom:
-            txt = "%-4s%-2s%-1s%-4s%-1s%-4s%-1s%-4s%-20s" % \
-                    (a.name[0:4],a.symbol[0:2],a.alt[0:1],a.resn[0:4],
-                     a.resn_code[0:1],a.resi[0:4],a.chain[0:1],
-                     a.segi[0:4],a.text_type[0:20])
-            self.txta[c] = txt
-            self.inta[c] = [ a.resi_number, a.hetatm, a.formal_charge,
-                                  a.flags, a.color_code, a.stereo, a.numeric_type ]
-            self.flta[c] = [ a.b, a.q, a.partial_charge, a.vdw ]
-            self.crda[c] = [ a.coord[0], a.coord[1], a.coord[2] ]
-            c = c + 1
-
-        c = 0
-        for b in model.bond:
-            self.bnda[c] = [ b.index[0], b.index[1], b.order, b.stereo ]
-            c = c + 1
+        self.molecule_properties = copy.deepcopy(
+                getattr(model, 'molecule_properties', []))
+
+        for (key, value) in model.__dict__.items():
+            if key not in self._internal and key != 'index':
+                setattr(self, key, copy.deepcopy(value))
+
+        self.atom, self.atom_properties, self.atom_extra = \
+                self._pack(model.atom, chempy.Atom, atom_fields, atom_bits)
+
+        index = numpy.array([b.index for b in model.bond],
+                dtype=numpy.int32).reshape((-1, 2))
+        self.bond, _, self.bond_extra = \
+                self._pack(model.bond, chempy.Bond, bond_fields, bond_bits,
+                        index)
+
+        return self
+
+    @staticmethod
+    def _pack(objects, cls, fields, bits, index=None):
+        dicts = [o.__dict__ for o in objects]
+        n = len(dicts)
+        present = numpy.zeros(n, numpy.uint32)
+        arrays = {}
+
+        known = set(name for (name, _) in fields)
+        known.update(('index', '_atom_properties') if index is not None
+                else ('_atom_properties',))
+
+        for (name, kind) in fields:
+            default = _default(cls, name, kind)
+            arrays[name] = _column([d.get(name, default) for d in dicts], kind)
+            isset = numpy.fromiter((name in d for d in dicts), bool, n)
+            present[isset] |= bits[name]
+
+        properties = {}
+        extra = {}
+        for (i, d) in enumerate(dicts):
+            if d.get('_atom_properties'):
+                properties[i] = copy.deepcopy(d['_atom_properties'])
+            if not known.issuperset(d):
+                extra[i] = dict((k, copy.deepcopy(v))
+                        for (k, v) in d.items() if k not in known)
+
+        return (_record_array(fields, arrays, present, index),
+                properties, extra)
 
 #------------------------------------------------------------------------------
     def convert_to_indexed(self):
-
+        '''
+        Return a new chempy.models.Indexed model.
+        '''
         model = Indexed()
         model.molecule = copy.deepcopy(self.molecule)
+        model.molecule_properties = copy.deepcopy(self.molecule_properties)
 
-        for c in range(self.nAtom):
-            at = chempy.Atom()
-            txta = self.txta[c]
-
-            for attrib in ( 'name', 'symbol', 'resn', 'resn_code', 'resi',
-                                 'alt', 'chain', 'segi', 'text_type' ):
-                ll = as_[attrib]
-                setattr(at,attrib,''.join(txta[ll[0]:ll[1]]).strip())
-
-            inta = self.inta[c]
-            for attrib in ( 'resi_number', 'hetatm', 'formal_charge','flags',
-                                 'color_code', 'stereo', 'numeric_type' ):
-                setattr(at,attrib,inta[ai[attrib]])
+        for (key, value) in self.__dict__.items():
+            if key not in self._internal:
+                setattr(model, key, copy.deepcopy(value))
 
-            flta = self.flta[c]
-            for attrib in ( 'b', 'q', 'partial_charge' ) :
-                setattr(at,attrib,flta[af[attrib]])
+        model.atom = self._unpack(self.atom, chempy.Atom, atom_fields,
+                atom_bits, self.atom_extra)
+        for (i, props) in self.atom_properties.items():
+            model.atom[i].atom_properties.update(copy.deepcopy(props))
 
-            crda = self.crda[c]
-            at.coord = [crda[0],crda[1],crda[2]]
-
-            # probably need to add some checking here to eliminate values
-            # which come back as defaults
-
-            model.atom.append(at)
-
-        for c in range(self.nBond):
-            bnd = chempy.Bond()
-            bnda = self.bnda[c]
-            bnd.index = [bnda[bi_index0],bnda[bi_index1]]
-            bnd.order = bnda[bi_order]
-            bnd.stereo = bnda[bi_stereo]
-            model.bond.append(bnd)
+        model.bond = self._unpack(self.bond, chempy.Bond, bond_fields,
+                bond_bits, self.bond_extra)
+        for (b, index) in zip(model.bond, self.bond['index'].tolist()):
+            b.index = index
 
         return model
 
-#------------------------------------------------------------------------------
-
-# text properties
-
-as_ = {}
-as_width = 0
-
-as_['name'] = [ as_width ]
-as_width = as_width + 4
-as_['name'].append(as_width)
-
-as_['symbol'] = [ as_width ]
-as_width = as_width + 2
-as_['symbol'].append(as_width)
-
-as_['alt'] = [ as_width ]
-as_width = as_width + 1
-as_['alt'].append(as_width)
-
-as_['resn'] = [ as_width ]
-as_width = as_width + 4
-as_['resn'].append(as_width)
-
-as_['resn_code'] = [ as_width ]
-as_width = as_width + 1
-as_['resn_code'].append(as_width)
-
-as_['resi'] = [ as_width ]
-as_width = as_width + 4
-as_['resi'].append(as_width)
-
-as_['chain'] = [ as_width ]
-as_width = as_width + 1
-as_['chain'].append(as_width)
-
-as_['segi' ] = [ as_width ]
-as_width = as_width + 4
-as_['segi'].append(as_width)
-
-as_['text_type'] = [ as_width ]
-as_width = as_width + 20
-as_['text_type'].append(as_width)
-
-# integer properties
-
-ai = {}
-ai_width = 0
-ai['resi_number']    = ai_width
-ai_width = ai_width + 1
-ai['hetatm']         = ai_width
-ai_width = ai_width + 1
-ai['formal_charge']  = ai_width
-ai_width = ai_width + 1
-ai['flags']          = ai_width
-ai_width = ai_width + 1
-ai['color_code']     = ai_width
-ai_width = ai_width + 1
-ai['stereo']         = ai_width
-ai_width = ai_width + 1
-ai['numeric_type']   = ai_width
-ai_width = ai_width + 1
-
-# float properties
-
-af = {}
-af_width = 0
-af['b']              = af_width
-af_width = af_width + 1
-af['q']              = af_width
-af_width = af_width + 1
-af['partial_charge'] = af_width
-af_width = af_width + 1
-af['vdw'] = af_width
-af_width = af_width + 1
-
-# bond information
-
-bi_index0         = 0
-bi_index1         = 1
-bi_order          = 2
-bi_stereo         = 3
-bi_width          = 4
+    @staticmethod
+    def _unpack(arr, cls, fields, bits, extra):
+        present = arr['present']
+        columns = []
+        for (name, kind) in fields:
+            # set explicitly, or modified in the array
+            isset = (present & bits[name]).astype(bool) | _differs(
+                    arr[name], _default(cls, name, kind))
+            isset = isset.tolist()
+            values = arr[name].tolist()
+            if name == 'formal_charge':
+                values = [int(v) if v.is_integer() else v for v in values]
+            columns.append((name, isset, values))
+
+        objects = []
+        for i in range(len(arr)):
+            obj = cls()
+            d = obj.__dict__
+            for (name, isset, values) in columns:
+                if isset[i]:
+                    d[name] = values[i]
+            if i in extra:
+                d.update(copy.deepcopy(extra[i]))
+            objects.append(obj)
+
+        return objects
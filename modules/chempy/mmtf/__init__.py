@@ -139,9 +139,138 @@ def _to_chempy(data, use_auth=True):
 
     return model_output
 
+def _to_fast_models(data, use_auth=True):
+    '''
+    Construct columnar "chempy.fast.FastModel" models from decoded MMTF
+    data, with array operations instead of per-atom loops.
+    '''
+    import numpy
+    from chempy.fast import FastModel
+
+    def get_array(key, default=(), dtype=None):
+        value = data.get(key)
+        if value is None:
+            value = default
+        return numpy.asarray(value, dtype)
+
+    groupList = data.get('groupList', ())
+    groupType = get_array('groupTypeList', dtype=int)
+    n_groups = len(groupType)
+
+    # group templates, concatenated
+    def template_column(key, dtype):
+        return numpy.array([x for g in groupList for x in g.get(key, ())],
+                dtype=dtype)
+
+    tmpl_natoms = numpy.array([len(g['atomNameList']) for g in groupList], int)
+    tmpl_start = numpy.concatenate(([0], tmpl_natoms.cumsum()[:-1]))
+    tmpl_name = template_column('atomNameList', str)
+    tmpl_elem = template_column('elementList', str)
+    tmpl_charge = template_column('formalChargeList', float)
+    tmpl_resn = numpy.array([as_str(g['groupName']) for g in groupList], str)
+
+    # atom -> group
+    group_natoms = tmpl_natoms[groupType]
+    group_start = numpy.concatenate(([0], group_natoms.cumsum()[:-1]))
+    n_atoms = int(group_natoms.sum())
+    atom_group = numpy.repeat(numpy.arange(n_groups), group_natoms)
+    atom_tmpl = tmpl_start[groupType][atom_group] + \
+            numpy.arange(n_atoms) - group_start[atom_group]
+
+    # group -> chain -> model
+    groupsPerChain = get_array('groupsPerChain', dtype=int)
+    chainsPerModel = get_array('chainsPerModel', dtype=int)
+    group_chain = numpy.repeat(numpy.arange(len(groupsPerChain)), groupsPerChain)
+    chain_model = numpy.repeat(numpy.arange(len(chainsPerModel)), chainsPerModel)
+    atom_chain = group_chain[atom_group]
+    atom_model = chain_model[atom_chain]
+
+    columns = {
+        'coord': numpy.column_stack([get_array(k) for k in (
+            'xCoordList', 'yCoordList', 'zCoordList')]),
+        'b': get_array('bFactorList', numpy.zeros(n_atoms)),
+        'q': get_array('occupancyList', numpy.ones(n_atoms)),
+        'alt': get_array('altLocList', numpy.full(n_atoms, '')),
+        'id': get_array('atomIdList', numpy.full(n_atoms, -1)),
+        'name': tmpl_name[atom_tmpl],
+        'symbol': tmpl_elem[atom_tmpl],
+        'formal_charge': tmpl_charge[atom_tmpl],
+        'resn': tmpl_resn[groupType][atom_group],
+    }
+
+    for (attr, key) in [('segi', 'chainIdList'), ('chain', 'chainNameList')]:
+        columns[attr] = get_array(key, [''] * len(groupsPerChain), str)[atom_chain]
+
+    label_seq_id = data.get('sequenceIndexList')
+    if label_seq_id is not None:
+        label_seq_id = numpy.asarray(label_seq_id, int)
+        columns['hetatm'] = (label_seq_id == -1)[atom_group]
+    else:
+        columns['hetatm'] = numpy.zeros(n_atoms, bool)
+
+    if use_auth or label_seq_id is None:
+        columns['resi_number'] = get_array('groupIdList',
+                numpy.ones(n_groups), int)[atom_group]
+        columns['ins_code'] = get_array('insCodeList',
+                numpy.full(n_groups, ''), str)[atom_group]
+    else:
+        columns['resi_number'] = (label_seq_id + 1)[atom_group]
+
+    ss_lookup = numpy.array([ss_map.get(i, '') for i in range(-1, 8)])
+    ss_info = get_array('secStructList', numpy.full(n_groups, -1), int)
+    columns['ss'] = ss_lookup[ss_info.clip(-1, 7) + 1][atom_group]
+
+    # intra-group bonds
+    tmpl_nbonds = numpy.array([len(g.get('bondAtomList', ())) // 2
+        for g in groupList], int)
+    tmpl_bond_start = numpy.concatenate(([0], tmpl_nbonds.cumsum()[:-1]))
+    tmpl_bond_atoms = template_column('bondAtomList', int).reshape((-1, 2))
+    tmpl_bond_order = numpy.array([x for (g, n) in zip(groupList, tmpl_nbonds)
+        for x in (g.get('bondOrderList') or [1] * n)], dtype=int)
+    group_nbonds = tmpl_nbonds[groupType]
+    n_bonds = int(group_nbonds.sum())
+    bond_group = numpy.repeat(numpy.arange(n_groups), group_nbonds)
+    bond_tmpl = tmpl_bond_start[groupType][bond_group] + numpy.arange(n_bonds) - \
+            numpy.concatenate(([0], group_nbonds.cumsum()[:-1]))[bond_group]
+    bonds = numpy.column_stack([
+        tmpl_bond_atoms[bond_tmpl] + group_start[bond_group, None],
+        tmpl_bond_order[bond_tmpl]]).reshape((-1, 3))
+
+    # inter-group bonds
+    bondAtomList = get_array('bondAtomList', numpy.zeros(0, int), int).reshape((-1, 2))
+    if len(bondAtomList):
+        bondOrderList = get_array('bondOrderList',
+                numpy.ones(len(bondAtomList), int), int)
+        bonds = numpy.concatenate([bonds,
+            numpy.column_stack([bondAtomList, bondOrderList])])
+
+    symmetry = (
+        data.get('unitCell', None),
+        as_str(data.get('spaceGroup', '')),
+    )
+
+    model_output = []
+    model_bonds = atom_model[bonds[:, 0]] if n_atoms else numpy.zeros(0, int)
+    bonds = bonds[numpy.argsort(model_bonds, kind='stable')]
+    model_bonds.sort()
+
+    for i in range(len(chainsPerModel)):
+        atoms = numpy.flatnonzero(atom_model == i)
+        first = atoms[0] if len(atoms) else 0
+        model = FastModel.from_columns(dict((k, v[atoms])
+            for (k, v) in columns.items()))
+        lo, hi = numpy.searchsorted(model_bonds, [i, i + 1])
+        model.add_bonds(bonds[lo:hi] - [first, first, 0])
+        if symmetry[0] is not None:
+            model.cell, model.spacegroup = symmetry
+        model_output.append(model)
+
+    return model_output
+
 #####################################################################
 
 from .io import MmtfReader
 MmtfReader.to_chempy = _to_chempy
+MmtfReader.to_fast_models = _to_fast_models
 
 #####################################################################
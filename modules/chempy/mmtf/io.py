@@ -60,12 +60,8 @@ class RunLength:
 
     @staticmethod
     def decode(iterable):
-        in_iter = simpleiter(iterable)
-        out = []
-        extend = out.extend
-        for item in in_iter:
-            extend([item] * next(in_iter))
-        return out
+        arr = asarray(iterable)
+        return numpy.repeat(arr[0::2], arr[1::2])
 
 class Delta:
     @staticmethod
@@ -93,12 +89,12 @@ class RecursiveIndex:
 
     def decode(self, iterable):
         min, max = self.limits
-        decoded_val = 0
-        for item in simpleiter(iterable):
-            decoded_val += item
-            if item != max and item != min:
-                yield decoded_val
-                decoded_val = 0
+        arr = asarray(iterable, 'i4')
+        # every item which is not a limit value terminates a sum
+        ends = numpy.flatnonzero((arr != max) & (arr != min))
+        cumsum = arr.cumsum(dtype='i4')[ends]
+        cumsum[1:] -= cumsum[:-1].copy()
+        return cumsum
 
 class IntegerFloats:
     def __init__(self, factor):
@@ -117,7 +113,8 @@ class IntegerChars:
 
     @staticmethod
     def decode(in_ints):
-        return [(chr(x) if x else '') for x in simpleiter(in_ints)]
+        # code point 0 becomes the empty string
+        return asarray(in_ints, 'u4').view('U1')
 
 ######## BUFFERS ###########
 
@@ -139,7 +136,7 @@ class StringsBuffer:
 
     def decode(self, in_bytes):
         bstrings = numpy.frombuffer(in_bytes, self.enctype)
-        return [b.decode(self.encoding) for b in bstrings]
+        return numpy.char.decode(bstrings, self.encoding)
 
     def encode(self, strings):
         bstrings = numpy.fromiter((s.encode(self.encoding) for s in strings),
@@ -12,63 +12,337 @@
 #-*
 #Z* -------------------------------------------------------------------
 
-import copy
+import math
+import numpy
+
+# upper bound for (query points x visited cells) per batch, limits the size
+# of intermediate arrays
+_CHUNK_CELLS = 1 << 20
 
 class Neighbor:
+    '''
+    Cell list spatial index over a set of 3D points.
+
+    Points are binned into cubic cells of edge length "spacing" and kept as
+    cell ids sorted with NumPy, so a cell lookup is a binary search.
+    get_neighbors() returns all points in the 27 cells around a position
+    (every point within "spacing" is among them), the get_within(),
+    get_pairs() and get_nearest() methods do exact distance queries.
+
+    With "box" (a, b, c), the index is periodic in an orthorhombic box with
+    edge lengths a, b, c, and distances use the minimum image convention.
+    Query cutoffs must not exceed half the shortest box edge in that case.
+
+    >>> nbr = Neighbor(model.get_coord_list(), 2.2)
+    >>> i, j, dist = nbr.get_self_pairs(1.8)
+    '''
+
+    def __init__(self,vect_list,spacing,box=None):
+        self.spacing = float(spacing)
+        self.box = None if box is None else \
+                numpy.array(box, dtype=float).reshape(3)
+        self.coords = numpy.array(vect_list, dtype=float).reshape((-1, 3))
+        if self.box is not None:
+            self.shape = numpy.maximum(1,
+                    (self.box // self.spacing).astype(int))
+            self.cell_size = self.box / self.shape
+            self.lower = numpy.zeros(3, int)
+        else:
+            self.cell_size = numpy.full(3, self.spacing)
+        self._build()
 
-    def __init__(self,vect_list,spacing):
-        self.voxel = {}
-        self.neighbor = None
-        self.spacing = spacing
-        c = 0
-        voxel = self.voxel
-        for v in vect_list:
-            k = self.address(v)
-            if k not in voxel:
-                voxel[k] = [c]
+    def _build(self):
+        self.cells = self._cells(self.coords)
+        if self.box is None:
+            if len(self.cells):
+                self.lower = self.cells.min(0)
+                self.shape = self.cells.max(0) - self.lower + 1
             else:
-                voxel[k].append(c)
-            c = c + 1
+                self.lower = numpy.zeros(3, int)
+                self.shape = numpy.ones(3, int)
+        self.cell_id = self._linear(self.cells)
+        self.order = numpy.argsort(self.cell_id, kind='stable')
+        self.sorted_id = self.cell_id[self.order]
+        self.neighbor = {}
+        self._voxel = None
+
+    def _cells(self, coords):
+        if self.box is not None:
+            cells = numpy.floor((coords % self.box) / self.cell_size)
+            # "x % box" can round up to "box" for tiny negative x
+            return numpy.minimum(cells.astype(int), self.shape - 1)
+        return numpy.floor(coords / self.cell_size).astype(int)
+
+    def _linear(self, cells):
+        c = cells - self.lower
+        return (c[..., 0] * self.shape[1] + c[..., 1]) * self.shape[2] + c[..., 2]
+
+    def _reach(self, cutoff):
+        return numpy.ceil(cutoff / self.cell_size).astype(int)
+
+#------------------------------------------------------------------------------
+    def _cell_candidates(self, cells, reach):
+        '''
+        All (query, point) index pairs where the point is in a cell at most
+        "reach" (per dimension) cells away from the query cell.
+        '''
+        m = len(cells)
+        shape = self.shape
+        width = numpy.minimum(2 * reach + 1, shape)
 
+        ranges = []
+        valid = numpy.ones((m, 1, 1, 1), bool)
+        for d in range(3):
+            if self.box is not None:
+                if width[d] == shape[d]:
+                    cd = numpy.broadcast_to(numpy.arange(shape[d]),
+                            (m, shape[d]))
+                else:
+                    cd = (cells[:, d, None] + numpy.arange(-reach[d],
+                        reach[d] + 1)) % shape[d]
+                cd = cd - self.lower[d]
+            else:
+                # window of "width" cells inside the grid which covers
+                # the intersection of the grid with [c - reach, c + reach]
+                lo = self.lower[d]
+                start = numpy.clip(cells[:, d] - reach[d], lo,
+                        lo + shape[d] - width[d])
+                cd = start[:, None] + numpy.arange(width[d])
+                inside = numpy.abs(cd - cells[:, d, None]) <= reach[d]
+                cd = cd - lo
+                valid = valid & numpy.expand_dims(inside,
+                        [i for i in (1, 2, 3) if i != d + 1])
+            ranges.append(cd)
+
+        ids = (ranges[0][:, :, None, None] * shape[1] +
+               ranges[1][:, None, :, None]) * shape[2] + \
+               ranges[2][:, None, None, :]
+        valid = numpy.broadcast_to(valid, ids.shape)
+        per_query = ids[0].size if m else 0
+
+        ids = ids.ravel()
+        start = numpy.searchsorted(self.sorted_id, ids, 'left')
+        counts = numpy.searchsorted(self.sorted_id, ids, 'right') - start
+        counts[~valid.ravel()] = 0
+
+        total = counts.sum()
+        ends = counts.cumsum()
+        pos = numpy.repeat(start - (ends - counts), counts) + \
+                numpy.arange(total)
+        qi = numpy.repeat(numpy.arange(m),
+                counts.reshape((m, per_query)).sum(1))
+        return qi, self.order[pos]
+
+    def _candidates(self, points, reach):
+        '''
+        Like _cell_candidates, but for query points, in chunks.
+        '''
+        cells = self._cells(points)
+        visited = numpy.prod(numpy.minimum(2 * reach + 1, self.shape))
+        chunk = max(1, _CHUNK_CELLS // int(visited))
+        for i in range(0, len(points), chunk):
+            qi, ai = self._cell_candidates(cells[i:i + chunk], reach)
+            yield qi + i, ai
+
+    def _distances(self, points, qi, ai):
+        delta = self.coords[ai] - points[qi]
+        if self.box is not None:
+            delta -= self.box * numpy.round(delta / self.box)
+        return numpy.sqrt((delta * delta).sum(1))
+
+#------------------------------------------------------------------------------
     def optimize(self):
-        self.neighbor = {}
-        voxel = self.voxel
-        for k in voxel.keys():
-            lst = self.neighbor[k]
-            for a in (k[0]-1,k[0],k[0]+1):
-                for b in (k[1]-1,k[1],k[1]+1):
-                    for c in (k[2]-1,k[2],k[2]+1):
-                        k2 = (a,b,c)
-                        if k2 in voxel:
-                            lst.extend(voxel[k2])
+        '''
+        Precompute get_neighbors() results for all occupied cells.
+        '''
+        bounds = numpy.flatnonzero(numpy.diff(self.sorted_id)) + 1
+        starts = numpy.concatenate([[0], bounds]) if len(self.sorted_id) \
+                else numpy.zeros(0, int)
+        cells = self.cells[self.order[starts]]
+        qi, ai = self._cell_candidates(cells, numpy.ones(3, int))
+        lists = numpy.split(ai, numpy.searchsorted(qi, numpy.arange(1,
+            len(cells))))
+        self.neighbor = dict((tuple(k), lst.tolist())
+                for (k, lst) in zip(cells.tolist(), lists))
 
     def address(self,vect):
-        return (int(vect[0]/self.spacing),
-                  int(vect[1]/self.spacing),
-                  int(vect[2]/self.spacing))
+        if self.box is None:
+            # plain Python for single points, same result as _cells()
+            spacing = self.spacing
+            return (math.floor(vect[0] / spacing),
+                    math.floor(vect[1] / spacing),
+                    math.floor(vect[2] / spacing))
+        cells = self._cells(numpy.asarray(vect, dtype=float).reshape((1, 3)))
+        return tuple(cells[0].tolist())
+
+    @property
+    def voxel(self):
+        '''
+        dict of occupied cell address -> list of point indices (built on
+        first use)
+        '''
+        if self._voxel is None:
+            order = self.order.tolist()
+            starts = [0] + (numpy.flatnonzero(numpy.diff(self.sorted_id))
+                    + 1).tolist()
+            keys = zip(*self.cells[self.order[starts]].T.tolist()) \
+                    if order else ()
+            self._voxel = dict((k, order[i:j]) for (k, i, j) in
+                    zip(keys, starts, starts[1:] + [len(order)]))
+        return self._voxel
 
     def get_voxel(self,vect):
-        k = self.address(vect)
-        if k in self.voxel:
-            return self.voxel[k]
-        else:
-            return []
+        return self.voxel.get(self.address(vect), [])
 
     def get_neighbors(self,vect):
-        if self.neighbor:
-            k = self.address(vect)
-            if k in self.neighbor:
-                return self.neighbor[k]
+        '''
+        Indices of all points in the cells adjacent to vect (candidates,
+        not filtered by distance). Results are cached per cell.
+
+        Use get_pairs() or get_self_pairs() for many positions.
+        '''
+        k = self.address(vect)
+        lst = self.neighbor.get(k)
+        if lst is None:
+            if self.box is None:
+                voxel = self.voxel
+                lst = []
+                for a in (k[0]-1,k[0],k[0]+1):
+                    for b in (k[1]-1,k[1],k[1]+1):
+                        for c in (k[2]-1,k[2],k[2]+1):
+                            k2 = (a,b,c)
+                            if k2 in voxel:
+                                lst.extend(voxel[k2])
             else:
-                return []
+                _, ai = self._cell_candidates(numpy.array([k]),
+                        numpy.ones(3, int))
+                lst = ai.tolist()
+            self.neighbor[k] = lst
+        return lst
+
+#------------------------------------------------------------------------------
+    def get_within(self,vect,cutoff=None):
+        '''
+        Indices of all points within cutoff (default: spacing) of vect.
+        '''
+        if cutoff is None:
+            cutoff = self.spacing
+        _, ai, _ = self.get_pairs([vect], cutoff)
+        return ai.tolist()
+
+    def get_pairs(self,vect_list,cutoff):
+        '''
+        Batch radius query: all (query, point) pairs within cutoff.
+
+        @param vect_list: (m, 3) query positions
+        @return: (query index array, point index array, distance array)
+        '''
+        points = numpy.asarray(vect_list, dtype=float).reshape((-1, 3))
+        result = ([], [], [])
+        for qi, ai in self._candidates(points, self._reach(cutoff)):
+            dist = self._distances(points, qi, ai)
+            mask = dist <= cutoff
+            for (lst, arr) in zip(result, (qi, ai, dist)):
+                lst.append(arr[mask])
+        if not result[0]:
+            return (numpy.zeros(0, int), numpy.zeros(0, int),
+                    numpy.zeros(0, float))
+        return tuple(numpy.concatenate(lst) for lst in result)
+
+    def get_self_pairs(self,cutoff):
+        '''
+        All pairs (i < j) of indexed points within cutoff.
+
+        @return: (i array, j array, distance array)
+        '''
+        qi, ai, dist = self.get_pairs(self.coords, cutoff)
+        mask = qi < ai
+        return qi[mask], ai[mask], dist[mask]
+
+    def get_nearest(self,vect_list,k=1):
+        '''
+        k-nearest neighbor query.
+
+        @return: (distance array, index array), both of shape (m, k) and
+        sorted by distance. Rows are padded with inf and -1 if there are
+        fewer than k points.
+        '''
+        points = numpy.asarray(vect_list, dtype=float).reshape((-1, 3))
+        m = len(points)
+        out_dist = numpy.full((m, k), numpy.inf)
+        out_index = numpy.full((m, k), -1, int)
+        n = len(self.coords)
+        if not n:
+            return out_dist, out_index
+
+        pending = numpy.arange(m)
+        cutoff = self.spacing
+        while len(pending):
+            qi, ai, dist = self.get_pairs(points[pending], cutoff)
+            order = numpy.lexsort((dist, qi))
+            qi, ai, dist = qi[order], ai[order], dist[order]
+
+            counts = numpy.bincount(qi, minlength=len(pending))
+            rank = numpy.arange(len(qi)) - numpy.repeat(
+                    counts.cumsum() - counts, counts)
+            done = (counts >= k) | (counts == n)
+            mask = (rank < k) & done[qi]
+            rows = pending[qi[mask]]
+            out_dist[rows, rank[mask]] = dist[mask]
+            out_index[rows, rank[mask]] = ai[mask]
+
+            pending = pending[~done]
+            cutoff *= 2.0
+        return out_dist, out_index
+
+#------------------------------------------------------------------------------
+    def update(self,vect_list,indices=None):
+        '''
+        Move points to new positions. Only points which change their cell
+        are re-inserted into the sorted cell arrays.
+
+        @param vect_list: new positions for all points, or for "indices"
+        @return: number of points which changed their cell
+        '''
+        coords = numpy.asarray(vect_list, dtype=float).reshape((-1, 3))
+        if indices is None:
+            if len(coords) != len(self.coords):
+                raise ValueError('number of points changed')
+            indices = numpy.arange(len(coords))
         else:
-            voxel = self.voxel
-            k = self.address(vect)
-            lst = []
-            for a in (k[0]-1,k[0],k[0]+1):
-                for b in (k[1]-1,k[1],k[1]+1):
-                    for c in (k[2]-1,k[2],k[2]+1):
-                        k2 = (a,b,c)
-                        if k2 in voxel:
-                            lst.extend(voxel[k2])
-            return lst
+            indices = numpy.asarray(indices, dtype=int).reshape(-1)
+        self.coords[indices] = coords
+
+        cells = self._cells(coords)
+        moved = (cells != self.cells[indices]).any(1)
+        if not moved.any():
+            return 0
+        indices = indices[moved]
+        cells = cells[moved]
+        self.cells[indices] = cells
+        self.neighbor = {}
+        self._voxel = None
+
+        if self.box is None and ((cells < self.lower) |
+                (cells >= self.lower + self.shape)).any():
+            self._build()
+            return len(indices)
+
+        ids = self._linear(cells)
+        self.cell_id[indices] = ids
+
+        is_moved = numpy.zeros(len(self.coords), bool)
+        is_moved[indices] = True
+        keep = ~is_moved[self.order]
+        order = self.order[keep]
+        sorted_id = self.sorted_id[keep]
+
+        new = numpy.lexsort((indices, ids))
+        indices, ids = indices[new], ids[new]
+        # keep points within a cell ordered by index
+        pos = numpy.searchsorted(sorted_id, ids, 'left')
+        pos += [numpy.searchsorted(order[p:q], i) for (p, q, i) in zip(pos,
+            numpy.searchsorted(sorted_id, ids, 'right'), indices)]
+        self.order = numpy.insert(order, pos, indices)
+        self.sorted_id = numpy.insert(sorted_id, pos, ids)
+        return len(indices)
@@ -12,23 +12,113 @@
 #-*
 #Z* -------------------------------------------------------------------
 
+import io
+import os
+
 from chempy import Storage
 
 if True:
+    import codecs
+    import contextlib
+    import gc
     import pickle
 
     # Python 3: Unpickle printable ASCII strings in [TAB, DEL) to unicode,
     # and everything else to bytes.
-    # This uses the Python implementation of pickle, not the fast cpython
-    # version, which unfortunately is much slower.
+    # The Python implementation of pickle (pickle._Unpickler) is patched to
+    # do this, but it is much slower than the C unpickler. cPickle.load(s)
+    # therefore first tries the C unpickler with a codec which only decodes
+    # printable ASCII (always succeeds for Python 3 pickles, which don't
+    # contain legacy strings). If a legacy string is binary, the C
+    # unpickler is used with encoding="bytes" and the printable strings
+    # are decoded afterwards (_decode_legacy).
+
+    _printable = bytes(range(9, 127))
+
+    def _is_printable(value):
+        return not value.translate(None, _printable)
 
     def _decode_string(self, value):
-        if all(8 < b < 127 for b in value):
+        if _is_printable(value):
             return value.decode('ascii')
         return value
 
     pickle._Unpickler._decode_string = _decode_string
 
+    _LEGACY_ENCODING = 'pymol_legacy_ascii'
+
+    def _legacy_decode(value, errors='strict'):
+        value = bytes(value)
+        if not _is_printable(value):
+            raise UnicodeDecodeError(_LEGACY_ENCODING, value, 0, len(value),
+                    'not printable ASCII')
+        return value.decode('ascii'), len(value)
+
+    def _legacy_search(name):
+        if name == _LEGACY_ENCODING:
+            return codecs.CodecInfo(None, _legacy_decode,
+                    name=_LEGACY_ENCODING)
+        return None
+
+    codecs.register(_legacy_search)
+
+    # immutable types which never contain legacy strings
+    _atomic_types = frozenset([int, float, str, bool, complex, type(None)])
+
+    def _decode_legacy(obj, memo):
+        '''
+        Decode printable bytes to str, recursively for lists, tuples,
+        dicts, sets and instance dictionaries. Lists, dicts and instances
+        are modified in place.
+        '''
+        t = type(obj)
+        if t is bytes:
+            return _decode_string(None, obj)
+        if t in _atomic_types:
+            return obj
+
+        key = id(obj)
+        if key in memo:
+            return memo[key]
+
+        if t is list:
+            memo[key] = obj
+            for (i, value) in enumerate(obj):
+                if type(value) not in _atomic_types:
+                    obj[i] = _decode_legacy(value, memo)
+        elif t is dict:
+            memo[key] = obj
+            items = [(_decode_legacy(k, memo), _decode_legacy(v, memo))
+                     for (k, v) in obj.items()]
+            obj.clear()
+            obj.update(items)
+        elif t in (tuple, set, frozenset):
+            obj = memo[key] = t(_decode_legacy(v, memo) for v in obj)
+        elif isinstance(getattr(obj, '__dict__', None), dict) and \
+                not isinstance(obj, type):
+            memo[key] = obj
+            state = _decode_legacy(dict(obj.__dict__), memo)
+            obj.__dict__.clear()
+            if hasattr(obj, '__setstate__'):
+                obj.__setstate__(state)
+            else:
+                obj.__dict__.update(state)
+        return obj
+
+    @contextlib.contextmanager
+    def _gc_paused():
+        '''
+        Unpickling a session allocates millions of containers, which
+        triggers many (useless) cyclic garbage collections.
+        '''
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            yield
+        finally:
+            if enabled:
+                gc.enable()
+
     # string pickling backported from Python 2
 
     def save_str(self, obj):
@@ -52,12 +142,36 @@ if True:
     class cPickle:
         dumps = pickle.dumps
         dump = pickle.dump
-        load = pickle._load
+
+        def load(fp):
+            '''
+            Unpickle from a file object. The C unpickler reads the file
+            incrementally, so the (uncompressed) contents are never held
+            in memory as a whole.
+            '''
+            if not (hasattr(fp, 'seekable') and fp.seekable()):
+                return cPickle.loads(fp.read())
+            pos = fp.tell()
+            with _gc_paused():
+                try:
+                    return pickle.load(fp, encoding=_LEGACY_ENCODING)
+                except UnicodeDecodeError:
+                    fp.seek(pos)
+                    return _decode_legacy(pickle.load(fp, encoding='bytes'),
+                                          {})
 
         def loads(s):
-            if not isinstance(s, bytes):
+            '''
+            Unpickle from bytes or any buffer (e.g. mmap.mmap)
+            '''
+            if isinstance(s, str):
                 s = s.encode(errors='ignore')
-            return pickle._loads(s)
+            with _gc_paused():
+                try:
+                    return pickle.loads(s, encoding=_LEGACY_ENCODING)
+                except UnicodeDecodeError:
+                    return _decode_legacy(pickle.loads(s, encoding='bytes'),
+                                          {})
 
         @classmethod
         def configure_legacy_dump(cls, py2=False):
@@ -68,14 +182,43 @@ if True:
                 cls.dumps = pickle.dumps
                 cls.dump = pickle.dump
 
+    def _open_uncompressed(fname):
+        '''
+        Open a file for binary reading, with transparent gzip or bzip2
+        decompression (detected by magic number).
+        '''
+        fp = open(fname, 'rb')
+        magic = fp.read(10)
+        if magic[:2] == b'\x1f\x8b':
+            import gzip
+            fp.close()
+            return gzip.open(fname, 'rb')
+        if magic[:2] == b'BZ' and magic[4:10] == b'1AY&SY':
+            import bz2
+            fp.close()
+            return bz2.open(fname, 'rb')
+        fp.seek(0)
+        return fp
+
 
 class PKL(Storage):
 
     def fromFile(self,fname,**params):
-        fp = self.my_open(fname,'rb')
-        result = cPickle.load(fp)
-        fp.close()
-        return result
+        if '://' in fname:
+            fp = self.my_open(fname,'rb')
+            result = cPickle.loads(fp.read())
+            fp.close()
+            return result
+
+        import mmap
+        with _open_uncompressed(fname) as fp:
+            if not isinstance(fp, io.BufferedReader):
+                return cPickle.load(fp) # stream from decompressor
+            if not os.fstat(fp.fileno()).st_size:
+                raise EOFError('empty file: ' + fname)
+            # uncompressed: unpickle from the page cache without a copy
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return cPickle.loads(mm)
 
 #---------------------------------------------------------------------------
     def toFile(self,indexed,fname,**params):
@@ -48,6 +48,23 @@ def generate(model, forcefield = protein_amber, histidine = 'HIE',
     place.simple_unknowns(connected,bondfield = bondfield)
     return connected.convert_to_indexed()
 
+#---------------------------------------------------------------------------------
+def _close_pairs(model, names):
+    '''
+atom index -> [(index, distance), ...] of all atoms within MAX_BOND_LEN
+for the atoms called one of "names" (one batch query instead of one
+query per atom)
+'''
+    crd = model.get_coord_list()
+    query = [i for (i, at) in enumerate(model.atom) if at.name in names]
+    near = dict((i, []) for i in query)
+    if query:
+        nbr = Neighbor(crd,MAX_BOND_LEN)
+        qi, ai, dist = nbr.get_pairs([crd[i] for i in query], MAX_BOND_LEN)
+        for (a, b, dst) in zip(qi.tolist(), ai.tolist(), dist.tolist()):
+            near[query[a]].append((b, dst))
+    return near
+
 #---------------------------------------------------------------------------------
 def strip_atom_bonds(model):
     new_bond = []
@@ -68,8 +85,7 @@ but does not add any bonds!
     if not isinstance(model, chempy.models.Indexed):
         raise ValueError('model is not an "Indexed" model object')
     if model.nAtom:
-        crd = model.get_coord_list()
-        nbr = Neighbor(crd,MAX_BOND_LEN)
+        near = _close_pairs(model, ('SG',))
         res_list = model.get_residues()
         if len(res_list):
             for a in res_list:
@@ -124,13 +140,11 @@ but does not add any bonds!
                         if 'SG' in dict: # cysteine
                             cur = dict['SG']
                             at = model.atom[cur]
-                            lst = nbr.get_neighbors(at.coord)
-                            for b in lst:
+                            for (b, dst) in near.get(cur, ()):
                                 if b>cur: # only do this once (only when b>cur - i.e. this is 1st CYS)
                                     at2 = model.atom[b]
                                     if at2.name=='SG':
                                         if not at2.in_same_residue(at):
-                                            dst = distance(at.coord,at2.coord)
                                             if dst<=MAX_BOND_LEN:
                                                 if forcefield:
                                                     for c in range(a[0],a[1]): # this residue
@@ -166,8 +180,7 @@ add_bonds(model, forcefield = protein_amber, histidine = 'HIE' )
     if not isinstance(model, chempy.models.Indexed):
         raise ValueError('model is not an "Indexed" model object')
     if model.nAtom:
-        crd = model.get_coord_list()
-        nbr = Neighbor(crd,MAX_BOND_LEN)
+        near = _close_pairs(model, ('N', 'SG'))
         res_list = model.get_residues()
         if len(res_list):
             for a in res_list:
@@ -231,12 +244,10 @@ add_bonds(model, forcefield = protein_amber, histidine = 'HIE' )
                         if 'N' in dict:  # connect residues N-C based on distance
                             cur_n = dict['N']
                             at = model.atom[cur_n]
-                            lst = nbr.get_neighbors(at.coord)
-                            for b in lst:
+                            for (b, dst) in near.get(cur_n, ()):
                                 at2 = model.atom[b]
                                 if at2.name=='C':
                                     if not at2.in_same_residue(at):
-                                        dst = distance(at.coord,at2.coord)
                                         if dst<=PEPT_CUTOFF:
                                             bnd=Bond()
                                             bnd.index = [cur_n,b]
@@ -246,13 +257,11 @@ add_bonds(model, forcefield = protein_amber, histidine = 'HIE' )
                         if 'SG' in dict: # cysteine
                             cur = dict['SG']
                             at = model.atom[cur]
-                            lst = nbr.get_neighbors(at.coord)
-                            for b in lst:
+                            for (b, dst) in near.get(cur, ()):
                                 if b>cur: # only do this once (only when b>cur - i.e. this is 1st CYS)
                                     at2 = model.atom[b]
                                     if at2.name=='SG':
                                         if not at2.in_same_residue(at):
-                                            dst = distance(at.coord,at2.coord)
                                             if dst<=MAX_BOND_LEN:
                                                 bnd=Bond()
                                                 bnd.index = [cur,b]
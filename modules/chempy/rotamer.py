@@ -0,0 +1,622 @@
+#A* -------------------------------------------------------------------
+#B* This file contains source code for the PyMOL computer program
+#C* copyright Schrodinger LLC.
+#D* -------------------------------------------------------------------
+#E* It is unlawful to modify or remove this copyright notice.
+#F* -------------------------------------------------------------------
+#G* Please see the accompanying LICENSE file for further information.
+#H* -------------------------------------------------------------------
+#I* Additional authors of this source file include:
+#-*
+#-*
+#-*
+#Z* -------------------------------------------------------------------
+
+'''
+Side chain rotamer scanning with NumPy.
+
+A Template holds the atoms of one residue. Rotamers (chi angles from the
+rotamer libraries) are applied to all conformations at once as array
+operations, and an Environment scores van der Waals overlaps of the built
+side chains against a precomputed cell list.
+'''
+
+import json
+import os
+
+import numpy
+
+import chempy
+from chempy import cpv, io
+from chempy.neighbor import Neighbor
+
+# residue types which use the rotamers of another type
+rot_type_xref = {
+    'GLUH' : 'GLU',
+    'ASPH' : 'ASP',
+    'ARGN' : 'ARG',
+    'LYSN' : 'LYS',
+    'HID' : 'HIS',
+    'HIE' : 'HIS',
+    'HIP' : 'HIS',
+}
+
+backbone_names = ('N', 'CA', 'C', 'O', 'OXT', 'H', 'HA')
+
+# atoms used to superpose a template onto a residue
+fit_names = ('N', 'CA', 'C', 'CB')
+
+# Bondi van der Waals radii
+vdw_radii = {
+    'C' : 1.70,
+    'N' : 1.55,
+    'O' : 1.52,
+    'S' : 1.80,
+    'SE' : 1.90,
+    'P' : 1.80,
+    'H' : 1.20,
+}
+
+default_radius = 1.70
+
+# binary library file format
+_magic = b'PYMOLROT'
+_format_version = 1
+
+# backbone dependent rotamers are indexed in 10 degree phi/psi bins
+_bin_width = 10
+_bin_count = 360 // _bin_width + 1
+
+_sources = ('sc_bb_dep', 'sc_bb_ind')
+
+_library = None
+
+def _source_path(name):
+    return chempy.path + 'sidechains/' + name + '.pkl'
+
+def _cache_path():
+    return os.path.join(os.path.expanduser('~'), '.pymol', 'cache',
+                        'rotamers.bin')
+
+def _library_paths():
+    '''
+    Locations of the binary library: prebuilt in the data directory, or
+    converted in the user cache directory.
+    '''
+    return [chempy.path + 'sidechains/rotamers.bin', _cache_path()]
+
+def _get_sources():
+    '''
+    [size, mtime] of the source pickle files, or None if they are missing
+    '''
+    try:
+        return dict((name, [st.st_size, st.st_mtime_ns]) for (name, st) in
+                    ((name, os.stat(_source_path(name))) for name in _sources))
+    except OSError:
+        return None
+
+def _bin(angle):
+    '''
+    Angle rounded to 10 degrees, like the mutagenesis wizard does
+    '''
+    return int(_bin_width * round(angle / _bin_width))
+
+def _resolve_dep(library, resn, phi, psi):
+    '''
+    Backbone dependent library key for phi/psi (already rounded to 10
+    degrees), falling back to 20 and 60 degree rounding.
+    '''
+    for step in (_bin_width, 20, 60):
+        (phi, psi) = (int(step * round(phi / step)),
+                      int(step * round(psi / step)))
+        if (resn, phi, psi) in library:
+            break
+    return (resn, phi, psi)
+
+class Library:
+    '''
+    Backbone dependent and independent rotamer libraries in a compact
+    binary file, which is memory mapped read-only (and so shared between
+    processes through the page cache).
+
+    Rotamers are rows of the "angles" (N, 4) (NaN padded chi angles) and
+    "freq" (N,) arrays. The "dep" (residue, phi bin, psi bin, 2) and "ind"
+    (residue, 2) arrays hold (start, count) row ranges. The lookup
+    fallbacks (20 and 60 degree rounding) are resolved when the file is
+    written.
+
+    >>> library = get_library()
+    >>> torsions, angles, freq = library.get('ARG', -60, -40)
+    '''
+
+    def __init__(self, data):
+        if isinstance(data, bytes):
+            data = numpy.frombuffer(data, numpy.uint8)
+        if bytes(data[:8]) != _magic:
+            raise ValueError('not a rotamer library')
+        version, size = data[8:16].view('<u4').tolist()
+        if version != _format_version:
+            raise ValueError('unsupported version %d' % version)
+        header = json.loads(bytes(data[16:16 + size]).decode('utf-8'))
+        self.sources = header['sources']
+        self.residues = header['residues']
+        self.residue_index = dict((resn, i) for (i, resn)
+                                  in enumerate(self.residues))
+        self.torsions = dict((resn, [tuple(t) for t in torsions])
+                for (resn, torsions) in header['torsions'].items())
+        for (name, (dtype, shape, offset)) in header['arrays'].items():
+            dtype = numpy.dtype(dtype)
+            nbytes = dtype.itemsize * int(numpy.prod(shape))
+            setattr(self, name, data[offset:offset + nbytes]
+                    .view(dtype).reshape(shape))
+
+    @classmethod
+    def open(cls, filename):
+        return cls(numpy.memmap(filename, numpy.uint8, 'r'))
+
+    @staticmethod
+    def convert(dep_library, ind_library, sources=None):
+        '''
+        Binary library file contents (bytes) from the dict libraries
+        '''
+        residues = sorted(ind_library)
+        torsions = {}
+        angles = []
+        freq = []
+
+        def add(resn, rotamers):
+            names = torsions.setdefault(resn, [])
+            for rotamer in rotamers:
+                for key in rotamer:
+                    if key != 'FREQ' and key not in names:
+                        names.append(key)
+            start = len(freq)
+            for rotamer in rotamers:
+                row = [rotamer.get(key, numpy.nan) for key in names]
+                angles.append(row + [numpy.nan] * (4 - len(row)))
+                freq.append(rotamer.get('FREQ', 0.0))
+            return (start, len(rotamers))
+
+        ind = numpy.zeros((len(residues), 2), '<i4')
+        dep = numpy.zeros((len(residues), _bin_count, _bin_count, 2), '<i4')
+        ranges = {}
+        for (i, resn) in enumerate(residues):
+            ind[i] = add(resn, ind_library[resn])
+            for phi in range(_bin_count):
+                for psi in range(_bin_count):
+                    key = _resolve_dep(dep_library, resn,
+                            phi * _bin_width - 180, psi * _bin_width - 180)
+                    if key not in dep_library:
+                        continue
+                    if key not in ranges:
+                        ranges[key] = add(resn, dep_library[key])
+                    dep[i, phi, psi] = ranges[key]
+
+        arrays = [
+            ('angles', numpy.array(angles, '<f8').reshape((-1, 4))),
+            ('freq', numpy.array(freq, '<f8')),
+            ('ind', ind),
+            ('dep', dep),
+        ]
+        header = {
+            'sources': sources,
+            'residues': residues,
+            'torsions': torsions,
+            'arrays': {},
+        }
+
+        # the offsets depend on the header size, iterate until stable
+        size = 0
+        while True:
+            offset = (16 + size + 7) // 8 * 8
+            for (name, array) in arrays:
+                header['arrays'][name] = [array.dtype.str, array.shape, offset]
+                offset += (array.nbytes + 7) // 8 * 8
+            encoded = json.dumps(header).encode('utf-8')
+            if len(encoded) == size:
+                break
+            size = len(encoded)
+
+        chunks = [_magic, numpy.array([_format_version, size], '<u4')
+                  .tobytes(), encoded]
+        position = 16 + size
+        for (name, array) in arrays:
+            offset = header['arrays'][name][2]
+            chunks.append(b'\0' * (offset - position))
+            chunks.append(array.tobytes())
+            position = offset + array.nbytes
+        return b''.join(chunks)
+
+    def get(self, resn, phi=None, psi=None):
+        '''
+        Rotamers of a residue type as (torsions, angles (R, k), freq (R,)),
+        or None. With phi/psi, only backbone dependent rotamers are
+        returned.
+        '''
+        resn = rot_type_xref.get(resn, resn)
+        i = self.residue_index.get(resn)
+        if i is None:
+            return None
+        if phi is None or psi is None:
+            start, count = self.ind[i].tolist()
+        else:
+            phi, psi = [min(max(_bin(a) + 180, 0), 360) // _bin_width
+                        for a in (phi, psi)]
+            start, count = self.dep[i, phi, psi].tolist()
+        if not count:
+            return None
+        torsions = self.torsions[resn]
+        return (torsions,
+                numpy.array(self.angles[start:start + count, :len(torsions)]),
+                numpy.array(self.freq[start:start + count]))
+
+    def get_rotamers(self, resn, phi=None, psi=None):
+        '''
+        Like get(), but as a list of rotamer dicts ((a, b, c, d) atom
+        names -> chi angle, and 'FREQ')
+        '''
+        r = self.get(resn, phi, psi)
+        if r is None:
+            return None
+        torsions, angles, freq = r
+        rotamers = []
+        for (row, f) in zip(angles.tolist(), freq.tolist()):
+            rotamer = dict(zip(torsions, row))
+            rotamer['FREQ'] = f
+            rotamers.append(rotamer)
+        return rotamers
+
+def _build_library(sources):
+    '''
+    Convert the pickled libraries and write the binary file to the user
+    cache directory. Keeps the library in memory if that fails.
+    '''
+    data = Library.convert(io.pkl.fromFile(_source_path('sc_bb_dep')),
+                           io.pkl.fromFile(_source_path('sc_bb_ind')), sources)
+    filename = _cache_path()
+    tmp = '%s.%d.tmp' % (filename, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(tmp, 'wb') as handle:
+            handle.write(data)
+        # atomic, concurrent processes may convert at the same time
+        os.replace(tmp, filename)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return Library(data)
+    return Library.open(filename)
+
+def get_library():
+    '''
+    The rotamer Library, loaded once per process. The binary file is
+    created from the pickled libraries on first use, and rebuilt if they
+    change.
+    '''
+    global _library
+    if _library is None:
+        sources = _get_sources()
+        for filename in _library_paths():
+            try:
+                library = Library.open(filename)
+            except (OSError, ValueError):
+                continue
+            # a prebuilt file is installed with the pickles, while the
+            # user cache may be outdated
+            if filename != _cache_path() or sources is None or \
+                    library.sources == sources:
+                _library = library
+                break
+        else:
+            _library = _build_library(sources)
+    return _library
+
+def get_rotamers(resn, phi=None, psi=None, dep=True):
+    '''
+    Rotamers of a residue type as (torsions, angles, freq), see
+    Library.get(), or None if there are none.
+
+    With dep=True and phi/psi, backbone dependent rotamers are used if
+    available, otherwise backbone independent rotamers.
+    '''
+    library = get_library()
+    r = None
+    if dep and phi is not None and psi is not None:
+        r = library.get(resn, phi, psi)
+    if r is None:
+        r = library.get(resn)
+    return r
+
+def get_vdw(symbols):
+    '''
+    Array of van der Waals radii for a list of element symbols
+    '''
+    return numpy.array([vdw_radii.get(s.upper(), default_radius)
+                        for s in symbols], float)
+
+def dihedral(p1, p2, p3, p4):
+    '''
+    Dihedral angles in degrees (IUPAC sign convention) for arrays of
+    positions with shape (..., 3).
+    '''
+    b1 = p2 - p1
+    b2 = p3 - p2
+    b3 = p4 - p3
+    n2 = numpy.cross(b2, b3)
+    y = numpy.sqrt((b2 * b2).sum(-1)) * (b1 * n2).sum(-1)
+    x = (numpy.cross(b1, b2) * n2).sum(-1)
+    return numpy.degrees(numpy.arctan2(y, x))
+
+def superpose(mobile, target):
+    '''
+    Least squares superposition (Kabsch) of mobile (n, 3) onto target.
+
+    @return: (rotation matrix (3, 3), translation (3,)) so that
+    mobile.dot(R.T) + t approximates target
+    '''
+    tc, mc, R = cpv.fit_arrays(target, mobile)[:3]
+    return R, tc - R.dot(mc)
+
+class Template:
+    '''
+    Atoms of one residue with their bonds, for building rotamers.
+
+    >>> template = Template.from_model(fragments.get('arg'))
+    >>> xyz = template.build(get_rotamers('ARG'))
+    '''
+
+    def __init__(self, names, coords, bonds, symbols=None):
+        self.names = list(names)
+        self.coords = numpy.array(coords, dtype=float).reshape((-1, 3))
+        self.symbols = list(symbols) if symbols is not None else \
+                [name.lstrip('0123456789')[:1] for name in self.names]
+        self.index = dict((name, i) for (i, name) in enumerate(self.names))
+        self.adjacent = [[] for _ in self.names]
+        for (i, j) in bonds:
+            self.adjacent[i].append(j)
+            self.adjacent[j].append(i)
+        self.torsions = {}
+
+    @classmethod
+    def from_model(cls, model, hydrogens=True):
+        '''
+        Template from a chempy model (e.g. from chempy.fragments)
+        '''
+        keep = [i for (i, atom) in enumerate(model.atom)
+                if hydrogens or atom.symbol != 'H']
+        new = dict((j, i) for (i, j) in enumerate(keep))
+        atoms = [model.atom[i] for i in keep]
+        bonds = [(new[b.index[0]], new[b.index[1]]) for b in model.bond
+                 if b.index[0] in new and b.index[1] in new]
+        return cls([a.name for a in atoms], [a.coord for a in atoms],
+                   bonds, [a.symbol for a in atoms])
+
+    def resolve(self, torsion):
+        '''
+        Template atom names of a torsion. Library names with "+" separated
+        alternatives (e.g. "CD1+CD" for ILE chi2) resolve to the first name
+        present in the template. None if an atom is missing.
+        '''
+        names = []
+        for name in torsion:
+            for alt in name.split('+'):
+                if alt in self.index:
+                    names.append(alt)
+                    break
+            else:
+                return None
+        return names
+
+    def get_torsion(self, torsion):
+        '''
+        Indices of the four torsion atoms and of all atoms which move when
+        rotating about the central bond (side chain side).
+        '''
+        r = self.torsions.get(torsion)
+        if r is None:
+            i4 = [self.index[name] for name in self.resolve(torsion)]
+            fixed = set(self.index[n] for n in backbone_names
+                        if n in self.index)
+            fixed.add(i4[1])
+            moving = {i4[2]}
+            todo = [i4[2]]
+            while todo:
+                for j in self.adjacent[todo.pop()]:
+                    if j not in fixed and j not in moving:
+                        moving.add(j)
+                        todo.append(j)
+            r = self.torsions[torsion] = (i4, numpy.array(sorted(moving)))
+        return r
+
+    def get_angles(self, rotamers):
+        '''
+        Torsions (list of atom name 4-tuples), chi angles (R, k) and
+        frequencies (R,) for a list of rotamers. Torsions with atoms that
+        are missing in the template are ignored.
+        '''
+        torsions = []
+        for rotamer in rotamers:
+            for key in rotamer:
+                if key != 'FREQ' and key not in torsions and \
+                        self.resolve(key) is not None:
+                    torsions.append(key)
+        angles = numpy.array([[rotamer.get(key, numpy.nan)
+                               for key in torsions] for rotamer in rotamers],
+                             float).reshape((len(rotamers), len(torsions)))
+        freq = numpy.array([rotamer.get('FREQ', 0.0) for rotamer in rotamers],
+                           float)
+        return torsions, angles, freq
+
+    def build(self, rotamers, coords=None):
+        '''
+        Coordinates (R, n, 3) of all rotamers.
+
+        @param rotamers: list of rotamer dicts, or (torsions, angles[, freq])
+        tuple
+        @param coords: start coordinates {default: template coordinates}
+        '''
+        if isinstance(rotamers, tuple):
+            torsions, angles = rotamers[:2]
+        else:
+            torsions, angles, _ = self.get_angles(rotamers)
+        if coords is None:
+            coords = self.coords
+        xyz = numpy.repeat(numpy.asarray(coords, float)[None],
+                           len(angles), 0)
+        for (k, torsion) in enumerate(torsions):
+            if self.resolve(torsion) is None:
+                continue
+            (a, b, c, d), moving = self.get_torsion(torsion)
+            target = angles[:, k]
+            ok = ~numpy.isnan(target)
+            theta = numpy.radians(numpy.where(ok, target, 0.0) - dihedral(
+                xyz[:, a], xyz[:, b], xyz[:, c], xyz[:, d])) * ok
+            origin = xyz[:, c, None]
+            axis = xyz[:, c] - xyz[:, b]
+            axis /= numpy.sqrt((axis * axis).sum(-1))[:, None]
+            axis = axis[:, None]
+            cos = numpy.cos(theta)[:, None, None]
+            sin = numpy.sin(theta)[:, None, None]
+            p = xyz[:, moving] - origin
+            p = p * cos + numpy.cross(axis, p) * sin + \
+                    axis * (p * axis).sum(-1)[..., None] * (1.0 - cos)
+            xyz[:, moving] = p + origin
+        return xyz
+
+    def place(self, backbone):
+        '''
+        Template coordinates superposed onto a residue backbone.
+
+        @param backbone: dict of atom name -> position (N, CA, C and
+        optionally CB are used for fitting)
+        '''
+        names = [n for n in fit_names if n in backbone and n in self.index]
+        if len(names) < 3:
+            raise ValueError('need at least three backbone atoms')
+        R, t = superpose([self.coords[self.index[n]] for n in names],
+                         [backbone[n] for n in names])
+        return self.coords.dot(R.T) + t
+
+class Environment:
+    '''
+    Fixed atoms to score side chain rotamers against, indexed in a cell
+    list.
+
+    Overlap of atoms i and j at distance d is max(0, scale * (ri + rj) - d),
+    the bump score of a rotamer is the sum over its atoms.
+    '''
+
+    def __init__(self, coords, symbols, scale=0.8):
+        self.coords = numpy.asarray(coords, float).reshape((-1, 3))
+        self.radii = get_vdw(symbols)
+        self.scale = float(scale)
+        rmax = self.radii.max() if len(self.radii) else default_radius
+        self.neighbor = Neighbor(self.coords, 2.0 * self.scale * rmax)
+
+    def get_excluded(self, atoms, backbone=(), cutoff=1.9):
+        '''
+        Environment indices to ignore for a residue: its own atoms and atoms
+        covalently bonded to the backbone positions (neighbor residues).
+        '''
+        excluded = set(atoms)
+        if len(backbone):
+            excluded.update(self.neighbor.get_pairs(backbone, cutoff)[1]
+                            .tolist())
+        return numpy.array(sorted(excluded), int)
+
+    def score(self, xyz, symbols, excluded=()):
+        '''
+        Bump scores (R,) for coordinates (R, m, 3)
+        '''
+        xyz = numpy.asarray(xyz, float)
+        R, m = xyz.shape[:2]
+        radii = get_vdw(symbols)
+        if not (R and m and len(self.coords)):
+            return numpy.zeros(R)
+        cutoff = self.scale * (radii.max() + self.radii.max())
+        qi, ai, dist = self.neighbor.get_pairs(xyz.reshape((-1, 3)), cutoff)
+        overlap = self.scale * (radii[qi % m] + self.radii[ai]) - dist
+        mask = overlap > 0.0
+        if len(excluded):
+            mask &= ~numpy.isin(ai, excluded)
+        return numpy.bincount(qi[mask] // m, overlap[mask], minlength=R)
+
+def scan(template, rotamers, backbone, environment, atoms=()):
+    '''
+    Build and score all rotamers of a template placed on a residue.
+
+    @param rotamers: list of rotamer dicts, (torsions, angles, freq) tuple,
+    or None for the template only
+    @param backbone: dict of atom name -> position of the residue
+    @param atoms: environment indices of the residue atoms
+    @return: dict with 'torsions', and ranked (lowest bump score first,
+    then highest frequency) 'score', 'frequency', 'chi' and 'coords'
+    (R, n, 3) arrays, and template atom 'names'
+    '''
+    if not rotamers:
+        torsions, angles, freq = [], numpy.zeros((1, 0)), numpy.ones(1)
+    elif isinstance(rotamers, tuple):
+        torsions, angles, freq = rotamers
+    else:
+        torsions, angles, freq = template.get_angles(rotamers)
+
+    # real backbone positions first, chi1 is defined through N
+    coords = template.place(backbone)
+    for (name, i) in template.index.items():
+        if name in backbone and name in backbone_names:
+            coords[i] = backbone[name]
+    xyz = template.build((torsions, angles), coords)
+
+    side = [i for (i, name) in enumerate(template.names)
+            if name not in backbone_names and template.symbols[i] != 'H']
+    ends = [backbone[n] for n in ('N', 'C') if n in backbone]
+    excluded = environment.get_excluded(atoms, ends)
+    score = environment.score(xyz[:, side],
+            [template.symbols[i] for i in side], excluded)
+
+    order = numpy.lexsort((-freq, score))
+    return {
+        'names': list(template.names),
+        'torsions': torsions,
+        'score': score[order],
+        'frequency': freq[order],
+        'chi': angles[order],
+        'coords': xyz[order],
+    }
+
+_scan_worker = {}
+
+def _scan_init(coords, symbols, scale):
+    '''
+    Worker initializer: build the environment cell list once
+    '''
+    _scan_worker['environment'] = Environment(coords, symbols, scale)
+
+def _scan_task(task):
+    '''
+    Worker task: scan() for one (template, rotamers, backbone, atoms) tuple
+    '''
+    return scan(task[0], task[1], task[2], _scan_worker['environment'],
+                task[3])
+
+def scan_all(tasks, coords, symbols, scale=0.8, processes=1):
+    '''
+    scan() for a list of (template, rotamers, backbone, atoms) tuples
+    against one environment, optionally in a pool of worker processes.
+
+    @return: list of scan() results in task order
+    '''
+    if processes < 2 or len(tasks) < 2:
+        environment = Environment(coords, symbols, scale)
+        return [scan(t[0], t[1], t[2], environment, t[3]) for t in tasks]
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    processes = min(processes, len(tasks))
+    chunksize = max(1, len(tasks) // (processes * 4))
+    with ProcessPoolExecutor(processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_scan_init,
+            initargs=(coords, symbols, scale)) as executor:
+        return list(executor.map(_scan_task, tasks, chunksize=chunksize))
@@ -76,6 +76,11 @@ IS_WINDOWS = sys.platform.startswith('win')
 IS_MACOS = sys.platform.startswith('darwin')
 IS_LINUX = sys.platform.startswith('linux')
 
+from . import profiling
+
+if os.environ.get('PYMOL_STARTUP_REPORT'):
+    profiling.start()
+
 import _thread as thread
 
 import copy
@@ -118,7 +123,8 @@ def _init_internals(_pymol):
     _pymol._session_save_tasks = []
     _pymol._session_restore_tasks = []
 
-    # cached results (as a list):
+    # cached results (as a list, replaced by a pymol.internal.CacheStore
+    # on first use):
     # [ [size, (hash1, hash2, ... ), (inp1, inp2, ...), output],
     #   [size, (hash1, hash2, ... ), (inp1, inp2, ...), output],
     #   ... ]
@@ -261,6 +267,7 @@ def exec_deferred(self):
                     cmd.do(a[4:])
                 else:
                     cmd.load(a, quiet=0)
+                profiling.mark(a[4:] if a[0:4] == "_do_" else a)
     except CmdException as e:
         colorprinting.error(str(e))
         colorprinting.error(
@@ -275,6 +282,10 @@ def exec_deferred(self):
         cmd.refresh()
         cmd.do("time.sleep(2);cmd.quit()")
 
+    # PYMOL_STARTUP_REPORT
+    profiling.mark('deferred')
+    profiling.report()
+
 def adapt_to_hardware(self):
     '''
     optimize for (or workaround) specific hardware
@@ -335,8 +346,7 @@ def adapt_to_hardware(self):
     # table size to reflect available RAM
 
     try:
-        import multiprocessing
-        ncpu = multiprocessing.cpu_count()
+        ncpu = os.cpu_count() or 1
         if ncpu > 1:
              cmd.set("max_threads", ncpu)
              if invocation.options.show_splash:
@@ -388,6 +398,7 @@ def _launch_no_gui():
 
     p = pymol2.SingletonPyMOL()
     p.start()
+    profiling.mark('start')
 
     # TODO sufficient?
     while (p.idle() or p.getRedisplay() or
@@ -411,6 +422,7 @@ def launch(args=None, block_input_hook=0):
     if args is None:
         args = sys.argv
     invocation.parse_args(args)
+    profiling.mark('parse_args')
 
     if invocation.options.gui == 'pmg_qt':
         if invocation.options.no_gui:
@@ -557,10 +569,12 @@ if 'DISPLAY' in os.environ:
 
 import pymol._cmd
 _cmd = sys.modules['pymol._cmd']
+profiling.mark('import pymol._cmd')
 
 get_capabilities = _cmd.get_capabilities
 
 from . import cmd
+profiling.mark('import pymol.cmd')
 
 cmd._COb = None
 
@@ -1,5 +1,75 @@
 
 
+#--------------------------------------------------------------------
+# Commands from modules which are not needed for startup are imported
+# on first use (call, attribute access, help) to keep "import pymol" fast.
+
+class _Resolved:
+    """
+    Attribute of a _LazyCommand instance, computed from the resolved
+    function with `get`. On the class itself, the attribute is `value`
+    (missing if not given), so the class keeps its own docstring.
+    """
+
+    def __init__(self, get, value=AttributeError):
+        self.get = get
+        self.value = value
+
+    def __set_name__(self, cls, name):
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            if self.value is AttributeError:
+                raise AttributeError(self.name)
+            return self.value
+        return self.get(obj._resolve())
+
+
+class _LazyCommand:
+    """
+    Stand-in for the command function `name` from module `pymol.<module>`
+    """
+
+    def __init__(self, module, name):
+        self._module = module
+        self._func = None
+        self.__name__ = self.__qualname__ = name
+        self.__module__ = 'pymol.' + module
+
+    def _resolve(self):
+        if self._func is None:
+            import importlib
+            module = importlib.import_module(self.__module__)
+            self._func = getattr(module, self.__name__)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, key):
+        if key.startswith('__') and key.endswith('__'):
+            raise AttributeError(key)
+        return getattr(self._resolve(), key)
+
+    def __repr__(self):
+        return '<lazy command %s.%s>' % (self._module, self.__name__)
+
+    # attributes which inspect, parsing and help rely on
+    __doc__ = _Resolved(lambda func: func.__doc__, __doc__)
+    __wrapped__ = _Resolved(lambda func: func)
+    __signature__ = _Resolved(lambda func:
+            __import__('inspect').signature(func))
+    __code__ = _Resolved(lambda func: func.__code__)
+    __defaults__ = _Resolved(lambda func: func.__defaults__)
+    __kwdefaults__ = _Resolved(lambda func: func.__kwdefaults__)
+
+
+def _lazy(module, *names):
+    g = globals()
+    for name in names:
+        g[name] = _LazyCommand(module, name)
+
 #--------------------------------------------------------------------
 from .importing import \
       filename_to_objectname, \
@@ -55,10 +125,10 @@ from .creating import \
       volume
 
 #--------------------------------------------------------------------
-from .colorramping import \
-      volume_ramp_new,   \
-      volume_panel,   \
-      volume_color
+_lazy('colorramping',
+      'volume_ramp_new',
+      'volume_panel',
+      'volume_color')
 
 #--------------------------------------------------------------------
 from . import commanding
@@ -161,6 +231,7 @@ from .selecting import \
       indicate,           \
       select,             \
       select_list,        \
+      select_keys,        \
       pop
 
 #--------------------------------------------------------------------
@@ -261,10 +332,12 @@ from .editing import \
 
 from .editor import \
       fab,                \
-      fnab
+      fab_batch,          \
+      fnab,               \
+      rotamer_scan
 
-from .computing import \
-      clean
+_lazy('computing',
+      'clean')
 
 matrix_transfer = matrix_copy # legacy
 
@@ -290,19 +363,20 @@ from .wizarding import \
       wizard
 
 #--------------------------------------------------------------------
-from .fitting import \
-      align,             \
-      alignto,		 \
-      extra_fit,	 \
-      fit,               \
-      super,             \
-      rms,               \
-      rms_cur,           \
-      intra_fit,         \
-      intra_rms,         \
-      intra_rms_cur,     \
-      cealign,          \
-      pair_fit
+_lazy('fitting',
+      'align',
+      'align_all',
+      'alignto',
+      'extra_fit',
+      'fit',
+      'super',
+      'rms',
+      'rms_cur',
+      'intra_fit',
+      'intra_rms',
+      'intra_rms_cur',
+      'cealign',
+      'pair_fit')
 
 #--------------------------------------------------------------------
 # ARE ALL OF THESE UNUSED AND/OR DEPRECATED (?)
@@ -313,8 +387,8 @@ from .preset import \
       publication
 
 #--------------------------------------------------------------------
-from .morphing import \
-    morph
+_lazy('morphing',
+      'morph')
 
 #--------------------------------------------------------------------
 from . import moving
@@ -449,18 +523,18 @@ from .keyboard import \
       editing_ring
 
 #--------------------------------------------------------------------
-from .experimenting import \
-      check,              \
-      dump,               \
-      get_bond_print,     \
-      fast_minimize,      \
-      mem,                \
-      minimize,           \
-      spheroid,           \
-      focal_blur,         \
-      callout,            \
-      desaturate,         \
-      test
+_lazy('experimenting',
+      'check',
+      'dump',
+      'get_bond_print',
+      'fast_minimize',
+      'mem',
+      'minimize',
+      'spheroid',
+      'focal_blur',
+      'callout',
+      'desaturate',
+      'test')
 
 from .internal import      \
       download_chem_comp, \
@@ -469,14 +543,16 @@ from .internal import      \
 from .util import \
       get_sasa_relative
 
-from .stereochemistry import \
-      assign_stereo
+_lazy('stereochemistry',
+      'assign_stereo')
 
 from . import properties
 from .properties import \
      get_property, \
      get_property_list, \
+     get_properties, \
      set_property, \
+     set_properties, \
      set_atom_property
 
 #--------------------------------------------------------------------
@@ -447,171 +447,339 @@ def torus(center=(0., 0., 0.), normal=(0., 0., 1.), radius=1., color='',
 
     return obj
 
-def from_plystr(contents, surfacenormals=True, alphaunit=1.):
-    '''
-    PLY - Polygon File Format
-    '''
-    import sys
-    if isinstance(contents, bytes):
-        contents = contents.decode(errors='ignore')
+_ply_types = {'char': 'i1', 'uchar': 'u1', 'short': 'i2', 'ushort': 'u2',
+        'int': 'i4', 'uint': 'u4', 'float': 'f4', 'double': 'f8',
+        'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+        'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8'}
 
-    lines_iter = iter(contents.splitlines())
+_ply_struct_chars = {'i1': 'b', 'u1': 'B', 'i2': 'h', 'u2': 'H',
+        'i4': 'i', 'u4': 'I', 'f4': 'f', 'f8': 'd'}
 
-    if next(lines_iter) != 'ply':
+def _ply_read_header(contents):
+    '''
+    Parse the PLY header. Returns (format, elements, body offset), with
+    elements as a list of (name, count, properties) and properties as
+    lists of words after "property".
+    '''
+    if not contents.startswith(b'ply'):
         raise ValueError('not a ply file')
 
-    types = {'char': int, 'uchar': int, 'short': int, 'ushort': int,
-            'int': int, 'uint': int, 'float': float, 'double': float,
-            'int8': int, 'uint8': int, 'int16': int, 'uint16': int,
-            'int32': int, 'uint32': int, 'float32': float, 'float64': float}
+    end = contents.find(b'end_header')
+    if end == -1:
+        raise ValueError('ply header incomplete')
 
+    fmt = 'ascii'
     elements = []
 
-    for line in lines_iter:
+    for line in contents[:end].decode(errors='ignore').splitlines()[1:]:
         a = line.split()
 
-        if not a:
+        if not a or a[0] in ('comment', 'obj_info'):
             continue
 
-        command = a[0]
+        if a[0] == 'format':
+            fmt = a[1]
+        elif a[0] == 'element':
+            elements.append((a[1], int(a[2]), []))
+        elif a[0] == 'property':
+            elements[-1][2].append(a[1:])
+        else:
+            print('unknown instruction: ' + a[0])
 
-        if command == 'end_header':
-            break
+    return fmt, elements, contents.index(b'\n', end) + 1
 
-        if command == 'format' or command == 'comment':
-            continue
+def _ply_empty(properties):
+    '''
+    Columns of an element with zero records. List properties get (0, 0)
+    arrays.
+    '''
+    import numpy
+    return dict((prop[-1], numpy.zeros((0, 0) if prop[0] == 'list' else 0,
+        _ply_types[prop[-2]])) for prop in properties)
 
-        if command == 'element':
-            element = {'type': a[1], 'count': int(a[2]), 'properties': []}
-            elements.append(element)
-            continue
+def _ply_read_binary(contents, offset, count, properties, endian):
+    '''
+    Read "count" binary records into a dict of columns. List properties
+    become (count, n) arrays if all lists have the same length, or lists
+    of arrays otherwise. Returns (columns, new offset).
+    '''
+    import numpy
+    import struct
+
+    if count == 0:
+        return _ply_empty(properties), offset
+
+    def dtype(t):
+        return numpy.dtype(endian + _ply_types[t])
+
+    # record layout, assuming list lengths like in the first record
+    fields = []
+    pos = offset
+    for prop in properties:
+        if prop[0] == 'list':
+            ctype, itype = dtype(prop[1]), dtype(prop[2])
+            n = int(numpy.frombuffer(contents, ctype, 1, pos)[0])
+            fields.append(('_n_' + prop[-1], ctype))
+            fields.append((prop[-1], itype, (n,)))
+            pos += ctype.itemsize + n * itype.itemsize
+        else:
+            fields.append((prop[-1], dtype(prop[0])))
+            pos += fields[-1][1].itemsize
+
+    layout = numpy.dtype(fields)
+    end = offset + count * layout.itemsize
+
+    if end <= len(contents):
+        records = numpy.frombuffer(contents, layout, count, offset)
+        if all((records['_n_' + prop[-1]] == layout[prop[-1]].shape[0]).all()
+                for prop in properties if prop[0] == 'list'):
+            return dict((prop[-1], records[prop[-1]])
+                    for prop in properties), end
+
+    # lists of different lengths (e.g. mixed triangles and quads)
+    def unpacker(t):
+        return struct.Struct(endian + _ply_struct_chars[_ply_types[t]])
+
+    readers = [(prop[-1], unpacker(prop[1]), unpacker(prop[2]))
+            if prop[0] == 'list' else (prop[-1], unpacker(prop[0]), None)
+            for prop in properties]
+    columns = dict((prop[-1], []) for prop in properties)
+
+    for _ in range(count):
+        for (name, s, s_item) in readers:
+            value = s.unpack_from(contents, offset)[0]
+            offset += s.size
+            if s_item is not None:
+                fmt = '%s%d%s' % (s_item.format[0], value, s_item.format[1:])
+                value = struct.unpack_from(fmt, contents, offset)
+                offset += s_item.size * len(value)
+            columns[name].append(value)
+
+    for prop in properties:
+        if prop[0] != 'list':
+            columns[prop[-1]] = numpy.array(columns[prop[-1]],
+                    _ply_types[prop[0]])
+
+    return columns, offset
+
+def _ply_read_ascii(lines, count, properties):
+    '''
+    Like _ply_read_binary, but for "count" lines of an ASCII PLY file.
+    Floating point values are kept in double precision.
+    '''
+    import numpy
+
+    if count == 0:
+        return _ply_empty(properties)
+
+    def dtype(t):
+        return float if _ply_types[t][0] == 'f' else _ply_types[t]
+
+    ntokens = len(lines[0].split())
+    values = numpy.fromstring(b' '.join(lines), dtype=float, sep=' ')
+
+    if len(values) == count * ntokens:
+        values = values.reshape((count, ntokens))
+        columns = {}
+        i = 0
+        for prop in properties:
+            if prop[0] == 'list':
+                n = int(values[0, i])
+                if (values[:, i] != n).any():
+                    break
+                columns[prop[-1]] = values[:, i + 1:i + 1 + n].astype(
+                        dtype(prop[2]))
+                i += n + 1
+            else:
+                columns[prop[-1]] = values[:, i].astype(dtype(prop[0]))
+                i += 1
+        else:
+            if i == ntokens:
+                return columns
+
+    # lists of different lengths
+    columns = dict((prop[-1], []) for prop in properties)
+    for line in lines:
+        a = line.split()
+        i = 0
+        for prop in properties:
+            if prop[0] == 'list':
+                n = int(a[i])
+                columns[prop[-1]].append(numpy.array(a[i + 1:i + 1 + n],
+                    float).astype(dtype(prop[2])))
+                i += n + 1
+            else:
+                columns[prop[-1]].append(float(a[i]))
+                i += 1
 
-        if command == 'property':
-            element['properties'].append(a[1:])
-            continue
+    for prop in properties:
+        if prop[0] != 'list':
+            columns[prop[-1]] = numpy.array(columns[prop[-1]],
+                    dtype(prop[0]))
 
-        if command == 'obj_info':
-            # ignore
-            continue
+    return columns
 
-        print('unknown instruction: ' + command)
+def _ply_index_groups(indices):
+    '''
+    Group vertex index lists by length. Yields (record indices, (m, N)
+    index array) tuples.
+    '''
+    import numpy
 
-    table = {}
+    if len(indices) == 0:
+        return
 
-    for element in elements:
-        table[element['type']] = records = []
-        properties = element['properties']
-        for i in range(element['count']):
-            line = next(lines_iter)
-            a_iter = iter(line.split())
-            rec = {}
-            for prop in properties:
-                if prop[0] == 'list':
-                    rec[prop[-1]] = [types[prop[2]](next(a_iter))
-                        for j in range(types[prop[2]](next(a_iter)))]
-                else:
-                    rec[prop[-1]] = types[prop[0]](next(a_iter))
-                    # auto-detect alpha divider
-                    if alphaunit == 1. and prop[-1] == 'alpha' and rec['alpha'] > 1:
-                        alphaunit = 255.
-                    # detect if normals need to be calculated
-                    if surfacenormals and prop[-1] == 'nx':
-                        surfacenormals = False
-            records.append(rec)
+    if isinstance(indices, numpy.ndarray):
+        yield numpy.arange(len(indices)), indices.astype(int)
+        return
 
-    vertices = table['vertex']
+    sizes = numpy.array([len(v) for v in indices], int)
+    for n in numpy.unique(sizes):
+        records = numpy.flatnonzero(sizes == n)
+        yield records, numpy.array([indices[r] for r in records],
+                int).reshape((len(records), n))
 
-    obj = []
+def from_plystr(contents, surfacenormals=True, alphaunit=1.):
+    '''
+    PLY - Polygon File Format
 
-    enum_quad = [0, 1, 2, 2, 3, 0]
+    Reads ASCII and binary (little and big endian) PLY files. Elements
+    are read into NumPy arrays and the CGO is assembled with array
+    operations.
+    '''
+    import numpy
 
-    def colorfromelem(elem):
-        if 'red' in elem:
-            obj.append(COLOR)
-            obj.append(elem['red'] / 255.0)
-            obj.append(elem['green'] / 255.0)
-            obj.append(elem['blue'] / 255.0)
-        if 'alpha' in elem:
-            obj.append(ALPHA)
-            obj.append(elem['alpha'] / alphaunit)
-
-    def compute_surface_normals():
-        '''
-        Compute average normals from all adjacent triangles
-        on each vertex
-        '''
-        from functools import reduce
-
-        # don't use cpv.normalize which has an RSMALL4 limit
-        normalize = lambda v: cpv.scale(v, 1. / cpv.length(v))
-
-        for face in table['face']:
-            if 'vertex_index' in face:
-                indices = face['vertex_index']
-            elif 'vertex_indices' in face:
-                indices = face['vertex_indices']
-            else:
-                return
+    if not isinstance(contents, bytes):
+        contents = contents.encode()
 
-            f_vert = [vertices[i] for i in indices]
-            f_xyz = [(v['x'], v['y'], v['z']) for v in f_vert]
+    fmt, elements, offset = _ply_read_header(contents)
 
-            try:
-                normal = normalize(cpv.cross_product(
-                    cpv.sub(f_xyz[1], f_xyz[0]),
-                    cpv.sub(f_xyz[2], f_xyz[1])))
-            except ZeroDivisionError:
-                continue
+    table = {}
 
-            for v in f_vert:
-                v.setdefault('normals', []).append(normal)
+    if fmt == 'ascii':
+        lines = contents[offset:].splitlines()
+        lines = [line for line in lines if line.strip()]
+        start = 0
+        for (name, count, properties) in elements:
+            table[name] = _ply_read_ascii(lines[start:start + count], count,
+                    properties)
+            start += count
+    elif fmt in ('binary_little_endian', 'binary_big_endian'):
+        endian = '<' if fmt == 'binary_little_endian' else '>'
+        for (name, count, properties) in elements:
+            table[name], offset = _ply_read_binary(contents, offset, count,
+                    properties, endian)
+    else:
+        raise ValueError('unknown ply format: ' + fmt)
+
+    # auto-detect alpha divider
+    if alphaunit == 1. and any(
+            len(columns['alpha']) and numpy.max(columns['alpha']) > 1
+            for columns in table.values() if 'alpha' in columns):
+        alphaunit = 255.
 
-        for v in vertices:
-            try:
-                v['nx'], v['ny'], v['nz'] = normalize(
-                        reduce(cpv.add, v.pop('normals')))
-            except (KeyError, ZeroDivisionError):
+    vertices = table['vertex']
+    xyz = numpy.stack([vertices[k] for k in 'xyz'], 1).astype(float)
+    nvertex = len(xyz)
+
+    if any('nx' in columns for columns in table.values()):
+        surfacenormals = False
+
+    normals = None
+    if 'nx' in vertices:
+        normals = numpy.stack([vertices[k] for k in ('nx', 'ny', 'nz')],
+                1).astype(float)
+
+    def face_indices(records):
+        if 'vertex_index' in records:
+            return records['vertex_index']
+        if 'vertex_indices' in records:
+            return records['vertex_indices']
+        return None
+
+    if surfacenormals and 'face' in table and \
+            face_indices(table['face']) is not None:
+        # average normals from all adjacent faces on each vertex
+        normals = numpy.zeros((nvertex, 3))
+        for (_, idx) in _ply_index_groups(face_indices(table['face'])):
+            if idx.shape[1] < 3:
                 continue
+            f_xyz = xyz[idx[:, :3]]
+            normal = numpy.cross(f_xyz[:, 1] - f_xyz[:, 0],
+                    f_xyz[:, 2] - f_xyz[:, 1])
+            length = numpy.sqrt((normal * normal).sum(1))
+            valid = length > 0.
+            normal = normal[valid] * (1. / length[valid])[:, None]
+            idx = idx[valid]
+            for k in range(3):
+                normals[:, k] += numpy.bincount(idx.ravel(),
+                        numpy.repeat(normal[:, k], idx.shape[1]), nvertex)
+        length = numpy.sqrt((normals * normals).sum(1))
+        length[length == 0.] = 1.
+        normals *= (1. / length)[:, None]
+
+    def color_block(records, m):
+        '''(m, width) array of COLOR and ALPHA operations'''
+        block = []
+        if 'red' in records:
+            block.append(numpy.full((m, 1), COLOR))
+            block.extend(numpy.asarray(records[k], float)[:, None] / 255.0
+                    for k in ('red', 'green', 'blue'))
+        if 'alpha' in records:
+            block.append(numpy.full((m, 1), ALPHA))
+            block.append(numpy.asarray(records['alpha'], float)[:, None] /
+                    alphaunit)
+        return numpy.concatenate(block, 1) if block else numpy.zeros((m, 0))
+
+    # per vertex (COLOR, ALPHA, NORMAL,) VERTEX operations
+    vertex_block = [color_block(vertices, nvertex)]
+    if normals is not None:
+        vertex_block += [numpy.full((nvertex, 1), NORMAL), normals]
+    vertex_block += [numpy.full((nvertex, 1), VERTEX), xyz]
+    vertex_block = numpy.concatenate(vertex_block, 1)
 
-    if surfacenormals and 'face' in table:
-        compute_surface_normals()
+    enum_quad = [0, 1, 2, 2, 3, 0]
+
+    obj = []
 
     for ptype, op in [
             ('face', TRIANGLES),
             ('edge', LINES),
             ('range_grid', POINTS),
             ]:
-        if ptype in table:
-            obj.append(BEGIN)
-            obj.append(op)
-
-            for face in table[ptype]:
-                colorfromelem(face)
-
-                if 'vertex_index' in face:
-                    indices = face['vertex_index']
-                elif 'vertex_indices' in face:
-                    indices = face['vertex_indices']
-                else:
-                    indices = [face['vertex1'], face['vertex2']]
-
-                N = len(indices)
-
-                for i in (enum_quad if N == 4 else range(N)):
-                    vertex = vertices[indices[i]]
-                    colorfromelem(vertex)
-
-                    if 'nx' in vertex:
-                        obj.append(NORMAL)
-                        obj.append(vertex['nx'])
-                        obj.append(vertex['ny'])
-                        obj.append(vertex['nz'])
-
-                    obj.append(VERTEX)
-                    obj.append(vertex['x'])
-                    obj.append(vertex['y'])
-                    obj.append(vertex['z'])
-            obj.append(END)
+        if ptype not in table:
+            continue
 
-    obj.append(STOP)
-    return obj
+        records = table[ptype]
+        indices = face_indices(records)
+        if indices is None:
+            indices = numpy.stack([records['vertex1'], records['vertex2']], 1)
+
+        obj.append(numpy.array([BEGIN, op]))
+
+        # one row of operations per face, rows grouped by polygon size
+        rows = []
+        for (ri, idx) in _ply_index_groups(indices):
+            if idx.shape[1] == 4:
+                idx = idx[:, enum_quad]
+            m = len(idx)
+            face_block = color_block(dict((k, numpy.asarray(v)[ri])
+                for (k, v) in records.items()
+                if k in ('red', 'green', 'blue', 'alpha')), m)
+            rows.append((ri, numpy.concatenate([face_block,
+                vertex_block[idx].reshape((m, -1))], 1)))
+
+        if len(rows) == 1:
+            obj.append(rows[0][1].ravel())
+        elif rows:
+            # mixed polygon sizes, restore file order
+            ordered = [None] * len(indices)
+            for (ri, block) in rows:
+                for (r, row) in zip(ri.tolist(), block):
+                    ordered[r] = row
+            obj.extend(ordered)
+
+        obj.append(numpy.array([END]))
+
+    obj.append(numpy.array([STOP]))
+    return numpy.concatenate(obj).tolist()
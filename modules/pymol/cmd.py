@@ -188,6 +188,7 @@ if True:
         _cache_clear = internal._cache_clear
         _cache_purge = internal._cache_purge
         _cache_mark = internal._cache_mark
+        _cache_status = internal._cache_status
         _sdof = internal._sdof
 
         #######################################################################
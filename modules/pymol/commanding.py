@@ -20,7 +20,6 @@ if True:
     import sys
     if True:
         import _thread as thread
-        import urllib.request as urllib2
         from io import FileIO as file
 
     import inspect
@@ -250,6 +249,7 @@ USAGE
     def _load_splash_image(filename, url, _self=cmd):
         import tempfile
         import struct
+        import urllib.request as urllib2
 
         tmp_filename = ""
         contents = None
@@ -86,6 +86,7 @@ def get_auto_arg_list(self_cmd=cmd):
 # 1st
         {
         'align'          : aa_sel_c,
+        'align_all'      : aa_sel_e,
         'alignto'        : aa_obj_c,
         'alter'          : aa_sel_e,
         'alphatoall'     : aa_sel_c,
@@ -167,6 +168,7 @@ def get_auto_arg_list(self_cmd=cmd):
         'reference'      : [ self_cmd.editing.ref_action_sc  , 'action'          , ', ' ],
         'remove'         : aa_sel_e,
         'reinitialize'   : [ self_cmd.commanding.reinit_sc   , 'option'          , ''   ],
+        'rotamer_scan'   : aa_sel_c,
         'scene'          : aa_scene_e,
         'sculpt_activate': aa_obj_e,
         'sculpt_deactivate': aa_obj_e,
@@ -203,6 +205,7 @@ def get_auto_arg_list(self_cmd=cmd):
 # 2nd
         {
         'align'          : aa_sel_e,
+        'align_all'      : aa_sel_e,
         'alignto'        : aa_ali_e,
         'alter'          : aa_exp_e,
         'alter_state'    : aa_sel_e,
@@ -274,6 +277,7 @@ def get_auto_arg_list(self_cmd=cmd):
         },
 #3rd
         {
+        'align_all'      : aa_ali_e,
         'alter_state'    : aa_exp_e,
         'button'         : [ self_cmd.controlling.but_act_sc , 'button action'   , ''   ],
         'callout'        : aa_sel_e,
@@ -140,18 +140,7 @@ ARGUMENTS
         if ss<0:
             ss = _self.get_setting_int("secondary_structure")
         if ss:
-            if ss==1: # helix
-                phi=-57.0
-                psi=-47.0
-            elif ss==2: # antipara-beta
-                phi=-139.0
-                psi=135.0
-            elif ss==3: # para-beta
-                phi=-119.0
-                psi=113.0
-            else:
-                phi=180.0
-                psi=180.0
+            phi, psi = _ss_phi_psi.get(ss, (180.0, 180.0))
         _self.fragment(amino_acid,tmp_editor, origin=0)
         if _self.count_atoms("elem N",domain=tmp_connect):
             tmp = [ None ]
@@ -309,6 +298,270 @@ _fab_codes = {
     'peptide' : _aa_codes,
     }
 
+# (phi, psi) for ss=1 (helix), 2 (antiparallel beta), 3 (parallel beta),
+# anything else is flat
+_ss_phi_psi = {
+    1 : (-57.0, -47.0),
+    2 : (-139.0, 135.0),
+    3 : (-119.0, 113.0),
+    }
+
+# peptide bond geometry
+_pep_c_n = 1.329
+_pep_c_o = 1.231
+_pep_n_h = 1.01
+_pep_ca_c_n = 116.2
+_pep_c_n_ca = 121.7
+_pep_ca_c_o = 120.5
+_pep_c_n_h = 119.0
+
+_pep_templates = {}
+
+def _pep_place(a, b, c, bond, angle, torsion):
+    '''
+    Position of atom d bonded to c, with the b-c-d angle and the a-b-c-d
+    dihedral given in degrees
+    '''
+    import numpy
+    angle = math.radians(angle)
+    torsion = math.radians(torsion)
+    bc = c - b
+    bc /= math.sqrt(bc.dot(bc))
+    n = numpy.cross(b - a, bc)
+    n /= math.sqrt(n.dot(n))
+    m = numpy.cross(n, bc)
+    return c + bond * (-math.cos(angle) * bc +
+            math.sin(angle) * (math.cos(torsion) * m + math.sin(torsion) * n))
+
+def _pep_frame(a, b, c):
+    '''
+    Orthonormal frame (rows) spanned by the b->a and b->c vectors
+    '''
+    import numpy
+    e1 = a - b
+    e1 /= math.sqrt(e1.dot(e1))
+    e2 = c - b
+    e2 -= e1 * e1.dot(e2)
+    e2 /= math.sqrt(e2.dot(e2))
+    return numpy.array([e1, e2, numpy.cross(e1, e2)])
+
+def _pep_template(code):
+    '''
+    Fragment model of a residue with its coordinate array and backbone
+    geometry, cached
+    '''
+    t = _pep_templates.get(code)
+    if t is None:
+        import numpy
+        from chempy import fragments
+        model = fragments.get(code)
+        coords = numpy.array([a.coord for a in model.atom], float)
+        index = dict((a.name, i) for (i, a) in enumerate(model.atom))
+        t = {'model': model, 'coords': coords, 'index': index}
+        if 'N' in index and 'CA' in index and 'C' in index:
+            n, ca, c = [coords[index[name]] for name in ('N', 'CA', 'C')]
+            t['n_ca'] = numpy.linalg.norm(ca - n)
+            t['ca_c'] = numpy.linalg.norm(c - ca)
+            t['n_ca_c'] = math.degrees(math.acos((n - ca).dot(c - ca) /
+                                                 t['n_ca'] / t['ca_c']))
+            # phi is restrained by the ring: previous C is trans to CD
+            if 'CD' in index and code.startswith('pro'):
+                from chempy.rotamer import dihedral
+                t['phi'] = float(dihedral(coords[index['CD']], n, ca, c)) - 180.0
+        _pep_templates[code] = t
+    return t
+
+def _pep_segment(codes, ss):
+    '''
+    Atom coordinates (list of arrays, one per residue) of a linear peptide
+    with ideal peptide bonds and the phi/psi angles of secondary structure
+    ss. codes are fragment names in N to C order, "ace" only first and
+    "nme" only last.
+    '''
+    import numpy
+    phi_ss, psi_ss = _ss_phi_psi.get(ss, (180.0, 180.0))
+    ace = codes[0] == 'ace'
+    nme = codes[-1] == 'nme'
+    body = codes[int(ace):len(codes) - int(nme)]
+    if not body or 'ace' in body or 'nme' in body:
+        raise ValueError('caps must be terminal')
+
+    # backbone from internal coordinates
+    built = []
+    for code in body:
+        t = _pep_template(code)
+        if 'n_ca' not in t:
+            raise ValueError('not an amino acid: ' + code)
+        phi = t.get('phi', phi_ss)
+        if not built:
+            a = math.radians(t['n_ca_c'])
+            N = numpy.zeros(3)
+            CA = numpy.array([t['n_ca'], 0.0, 0.0])
+            C = CA + t['ca_c'] * numpy.array([-math.cos(a), math.sin(a), 0.0])
+            pos = {'N': N, 'CA': CA, 'C': C}
+        else:
+            prev = built[-1][1]
+            N = _pep_place(prev['N'], prev['CA'], prev['C'], _pep_c_n,
+                           _pep_ca_c_n, psi_ss)
+            CA = _pep_place(prev['CA'], prev['C'], N, t['n_ca'],
+                            _pep_c_n_ca, 180.0)
+            C = _pep_place(prev['C'], N, CA, t['ca_c'], t['n_ca_c'], phi)
+            prev['O'] = _pep_place(N, prev['CA'], prev['C'], _pep_c_o,
+                                   _pep_ca_c_o, 180.0)
+            pos = {'N': N, 'CA': CA, 'C': C}
+            if 'H' in t['index']:
+                pos['H'] = _pep_place(CA, prev['C'], N, _pep_n_h,
+                                      _pep_c_n_h, 180.0)
+        built.append((code, pos))
+
+    if ace:
+        first = built[0][1]
+        phi = _pep_template(body[0]).get('phi', phi_ss)
+        C = _pep_place(first['C'], first['CA'], first['N'], _pep_c_n,
+                       _pep_c_n_ca, phi)
+        CH3 = _pep_place(first['CA'], first['N'], C, 1.52, _pep_ca_c_n, 180.0)
+        O = _pep_place(first['N'], CH3, C, _pep_c_o, _pep_ca_c_o, 180.0)
+        if 'H' in _pep_template(body[0])['index']:
+            first['H'] = _pep_place(first['CA'], C, first['N'], _pep_n_h,
+                                    _pep_c_n_h, 180.0)
+        built.insert(0, ('ace', {'CH3': CH3, 'C': C, 'O': O}))
+
+    if nme:
+        last = built[-1][1]
+        N = _pep_place(last['N'], last['CA'], last['C'], _pep_c_n,
+                       _pep_ca_c_n, psi_ss)
+        CH3 = _pep_place(last['CA'], last['C'], N, 1.458, _pep_c_n_ca, 180.0)
+        H = _pep_place(CH3, last['C'], N, _pep_n_h, _pep_c_n_h, 180.0)
+        last['O'] = _pep_place(N, last['CA'], last['C'], _pep_c_o,
+                               _pep_ca_c_o, 180.0)
+        built.append(('nme', {'N': N, 'CH3': CH3, 'H': H}))
+
+    # superpose the fragments onto three built atoms each, then replace
+    # the built atoms (O of the last residue, H of the first are kept)
+    result = []
+    for (code, pos) in built:
+        t = _pep_template(code)
+        index, coords = t['index'], t['coords']
+        names = {'ace': ('CH3', 'C', 'O'), 'nme': ('H', 'N', 'CH3')}.get(
+                code, ('N', 'CA', 'C'))
+        frag = [coords[index[name]] for name in names]
+        F = _pep_frame(*frag).T.dot(_pep_frame(*[pos[name] for name in names]))
+        xyz = (coords - frag[1]).dot(F) + pos[names[1]]
+        for (name, p) in pos.items():
+            if name in index:
+                xyz[index[name]] = p
+        result.append(xyz)
+    return result
+
+def _pep_segments(tokens, resi, chain, segi, dir):
+    '''
+    Split fab input tokens into [(chain, segi, [(code, resi), ...])],
+    interpreting "segi/chain/resi/" tokens and chain breaks like _fab.
+    '''
+    segments = []
+    current = None
+    for token in tokens:
+        if '/' in token:
+            part = token.split('/')
+            if len(part) > 1 and len(part[-2]):
+                resi = int(part[-2])
+            if len(part) > 2:
+                chain = part[-3]
+            if len(part) > 3:
+                segi = part[-4]
+            current = None
+        else:
+            if current is None:
+                current = (chain, segi, [])
+                segments.append(current)
+            current[2].append((token, resi))
+            resi += dir
+    return segments
+
+def peptide_model(input, resi=1, chain='', segi='', dir=1, hydro=1, ss=1,
+                  origin=(0.0, 0.0, 0.0)):
+    '''
+DESCRIPTION
+
+    API only. Build a peptide (sequence syntax as in "fab", or a list of
+    one-letter codes) as a chempy model, without loading it. Each chain
+    segment is assembled in one pass from the fragment library templates
+    and ideal peptide bond geometry, with the phi/psi angles of "ss".
+
+    The first residue of each segment is centered at "origin".
+
+EXAMPLE
+
+    from chempy import io
+    from pymol import editor
+    for i, seq in enumerate(sequences):
+        io.pdb.toFile(editor.peptide_model(seq, ss=1), 'pep%d.pdb' % i)
+
+SEE ALSO
+
+    fab, fab_batch
+    '''
+    import numpy
+    from chempy import Atom, Bond, models
+
+    resi, dir, hydro, ss = int(resi), int(dir), int(hydro), int(ss)
+    if is_string(input):
+        tokens = []
+        for frag in input.split():
+            if '/' in frag:
+                tokens.append(frag)
+            else:
+                tokens.extend(frag)
+                tokens.append('/')
+    else:
+        tokens = list(input)
+
+    model = models.Indexed()
+    for (chain, segi, items) in _pep_segments(tokens, resi, chain, segi,
+                                              1 if dir > 0 else -1):
+        codes = [_aa_codes[code] for (code, _) in items]
+        if dir < 0:
+            items = items[::-1]
+            codes = codes[::-1]
+        xyz = _pep_segment(codes, ss)
+        first = 0 if dir > 0 else len(xyz) - 1
+        shift = numpy.asarray(origin, float) - xyz[first].mean(0)
+
+        prev_c = None
+        for ((_, resi), code, coords) in zip(items, codes, xyz):
+            fragment = _pep_template(code)['model']
+            offset = len(model.atom)
+            mapping = {}
+            for (atom, coord) in zip(fragment.atom, (coords + shift).tolist()):
+                if not hydro and atom.symbol == 'H':
+                    continue
+                new = Atom()
+                new.__dict__.update(atom.__dict__)
+                new.coord = coord
+                new.resi = resi
+                new.chain = chain
+                new.segi = segi
+                mapping[id(atom)] = len(model.atom)
+                model.atom.append(new)
+            for bond in fragment.bond:
+                i, j = [mapping.get(id(fragment.atom[k])) for k in bond.index]
+                if i is not None and j is not None:
+                    new = Bond()
+                    new.index = [i, j]
+                    new.order = bond.order
+                    model.bond.append(new)
+            names = dict((model.atom[i].name, i) for i in range(offset,
+                         len(model.atom)))
+            if prev_c is not None and 'N' in names:
+                new = Bond()
+                new.index = [prev_c, names['N']]
+                model.bond.append(new)
+            prev_c = names.get('C')
+
+    for (i, atom) in enumerate(model.atom):
+        atom.id = i + 1
+    return model
+
 _pure_number = re.compile("[0-9]+")
 
 def _fab(input,name,mode,resi,chain,segi,state,dir,hydro,ss,quiet,_self=cmd):
@@ -340,6 +593,27 @@ def _fab(input,name,mode,resi,chain,segi,state,dir,hydro,ss,quiet,_self=cmd):
     elif name in _self.get_names():
         _self.delete(name)
 
+    ss = int(ss)
+    if ss < 0:
+        ss = _self.get_setting_int("secondary_structure")
+
+    # with defined phi/psi, build all residues at once (ss=0 keeps the
+    # geometry of the incremental fuse)
+    if seq_len and 0 < ss < 5 and code is not None and \
+            not _self.count_atoms("?pk1"):
+        try:
+            model = peptide_model(input, resi, chain, segi, dir, hydro, ss,
+                                  origin=_self.get_position())
+        except (KeyError, ValueError):
+            model = None
+        if model is not None:
+            if seq_len > 99 and not quiet:
+                print(" Generating a %d residue peptide from sequence..." % seq_len)
+            _self.load_model(model, name, zoom=0)
+            if _self.get_setting_int('auto_zoom'):
+                _self.zoom(name)
+            return DEFAULT_SUCCESS
+
     if mode in [ 'peptide' ]:  # polymers
         if (seq_len>99) and not quiet:
             print(" Generating a %d residue peptide from sequence..."%seq_len)
@@ -1086,6 +1360,68 @@ EXAMPLE
         r = DEFAULT_SUCCESS
     return r
 
+def fab_batch(sequences, prefix='pep', ss=1, chain='', segi='', hydro=-1,
+              quiet=1, *, _self=cmd):
+    '''
+DESCRIPTION
+
+    Build one peptide object per sequence. Sequences are given as a list
+    or as a whitespace separated string, "name:sequence" picks the object
+    name, otherwise objects are named prefix + number.
+
+USAGE
+
+    fab_batch sequences [, prefix [, ss [, chain [, segi [, hydro ]]]]]
+
+ARGUMENTS
+
+    sequences = str or list: sequences in one-letter code
+
+    prefix = str: object name prefix {default: pep}
+
+    ss = int: Secondary structure 1=alpha helix, 2=antiparallel beta,
+    3=parallel beta, 4=flat {default: 1}
+
+EXAMPLE
+
+    fab_batch ACDEFGH KLMNPQ helix1:AAAAAAAA
+    cmd.fab_batch(open('sequences.txt').read().split(), ss=2)
+
+SEE ALSO
+
+    fab
+    '''
+    ss, hydro, quiet = int(ss), int(hydro), int(quiet)
+    if ss < 0:
+        ss = _self.get_setting_int("secondary_structure")
+    if not 0 < ss < 5:
+        raise pymol.CmdException('ss must be 1, 2, 3 or 4')
+    if hydro < 0:
+        hydro = not _self.get_setting_boolean("auto_remove_hydrogens")
+    if is_string(sequences):
+        sequences = sequences.split()
+
+    names = []
+    for (i, sequence) in enumerate(sequences, 1):
+        name, _, sequence = sequence.rpartition(':')
+        if not name:
+            name = '%s%0*d' % (prefix, len(str(len(sequences))), i)
+        try:
+            model = peptide_model(sequence, 1, chain, segi, 1, hydro, ss)
+        except KeyError as e:
+            raise pymol.CmdException('unknown residue code %s in %s' % (e, name))
+        except ValueError as e:
+            raise pymol.CmdException('%s: %s' % (name, e))
+        _self.delete(name)
+        _self.load_model(model, name, zoom=0)
+        names.append(name)
+
+    if not quiet:
+        print(' fab_batch: built %d peptides' % len(names))
+    if names and _self.get_setting_int('auto_zoom'):
+        _self.zoom(' '.join(names))
+    return names
+
 def fnab(input, name=None, mode="DNA", form="B", dbl_helix=1, *, _self=cmd):
     """
 DESCRIPTION
@@ -1153,6 +1489,134 @@ EXAMPLE
     _self.unpick()
     return DEFAULT_SUCCESS
 
+def rotamer_scan(selection, resn='', environment='', state=1, dep=1,
+                 vdw_scale=0.8, processes=1, quiet=1, *, _self=cmd):
+    '''
+DESCRIPTION
+
+    "rotamer_scan" builds all library rotamers for every residue in
+    selection (optionally mutated to other residue types) and ranks them
+    by van der Waals overlap with the environment. Loaded objects are not
+    modified.
+
+    Chi angles are applied to a coordinate template as array operations,
+    and the bumps are scored against a cell list of the environment heavy
+    atoms which is built once. Hydrogens are ignored.
+
+USAGE
+
+    rotamer_scan selection [, resn [, environment [, state [, dep
+        [, vdw_scale [, processes ]]]]]]
+
+ARGUMENTS
+
+    selection = string: residues to scan (need N, CA and C atoms)
+
+    resn = string: residue type(s) to build, "+" separated, or empty to
+    keep the current residue types {default: }
+
+    environment = string: atoms to score against {default: objects of
+    selection}
+
+    state = int: object state {default: 1}
+
+    dep = 0/1: use backbone dependent rotamers {default: 1}
+
+    vdw_scale = float: scale factor for the sum of van der Waals radii
+    below which atoms overlap {default: 0.8}
+
+    processes = int: number of worker processes, 0 for the number of
+    CPUs {default: 1}
+
+PYMOL API
+
+    cmd.rotamer_scan(...) returns a list with one dict per residue and
+    residue type, with keys "model", "segi", "chain", "resi", "resn",
+    "names" (template atom names), "torsions" (chi atom names), and arrays
+    "score", "frequency", "chi" and "coords" (R x atoms x 3) ranked by
+    lowest bump score, then by highest rotamer frequency.
+
+EXAMPLE
+
+    fetch 1ubq, async=0
+    r = cmd.rotamer_scan('1ubq & resi 40-50', 'ALA+LEU+PHE+TRP', processes=4)
+    best = [(x['resi'], x['resn'], x['score'][0]) for x in r]
+
+SEE ALSO
+
+    wizard mutagenesis
+    '''
+    import os
+    import numpy
+    from chempy import fragments, rotamer
+
+    state, dep, processes = int(state), int(dep), int(processes)
+    vdw_scale, quiet = float(vdw_scale), int(quiet)
+    resn_list = resn.upper().replace('+', ' ').split()
+
+    residues = []
+    atoms = []
+    sele_name = _self.get_unused_name('_')
+    try:
+        _self.select(sele_name, '(%s) & name CA' % (selection), 0)
+        _self.iterate(sele_name,
+                'residues.append((model, segi, chain, resi, resn, index))',
+                space={'residues': residues})
+        phipsi = (_self.get_phipsi(sele_name, state) or {}) if dep else {}
+        if not environment:
+            environment = 'byobj ?' + sele_name
+        _self.iterate_state(state,
+                '((%s) | byres ?%s) & not hydro' % (environment, sele_name),
+                'atoms.append((model, segi, chain, resi, name, elem, x, y, z))',
+                space={'atoms': atoms})
+    finally:
+        _self.delete(sele_name)
+
+    coords = numpy.array([a[6:] for a in atoms], float).reshape((-1, 3))
+    symbols = [a[5] for a in atoms]
+    members = {}
+    for (i, a) in enumerate(atoms):
+        members.setdefault(a[:4], []).append(i)
+
+    templates = {}
+    tasks = []
+    results = []
+    for (model, segi, chain, resi, current, index) in residues:
+        key = (model, segi, chain, resi)
+        backbone = dict((atoms[i][4], coords[i]) for i in members.get(key, ()))
+        if not all(name in backbone for name in ('N', 'CA', 'C')):
+            continue
+        phi, psi = phipsi.get((model, index), (None, None))
+        for name in (resn_list or [current]):
+            if name not in templates:
+                try:
+                    templates[name] = rotamer.Template.from_model(
+                            fragments.get(name.lower()), hydrogens=False)
+                except (IOError, OSError):
+                    templates[name] = None
+                    if not quiet:
+                        print(' rotamer_scan: no fragment for %s' % name)
+            if templates[name] is None:
+                continue
+            tasks.append((templates[name],
+                          rotamer.get_rotamers(name, phi, psi, dep),
+                          backbone, members[key]))
+            results.append({'model': model, 'segi': segi, 'chain': chain,
+                            'resi': resi, 'resn': name})
+
+    if processes < 1:
+        processes = os.cpu_count() or 1
+
+    scans = rotamer.scan_all(tasks, coords, symbols, vdw_scale, processes)
+    for (r, scan) in zip(results, scans):
+        r.update(scan)
+        if not quiet:
+            print(' rotamer_scan: /%s/%s/%s/%s %-4s %3d rotamers, best '
+                  'score %.2f' % (r['model'], r['segi'], r['chain'],
+                    r['resi'], r['resn'], len(r['score']), r['score'][0]))
+
+    return results
+
 def build_peptide(sequence,_self=cmd): # legacy
     for aa in sequence:
         attach_amino_acid("pk1",_aa_codes[aa])
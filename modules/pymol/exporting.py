@@ -41,6 +41,7 @@ if True:
         'read_only'   : 2,
         'clear'       : 3,
         'optimize'    : 4,
+        'status'      : 5,
     }
 
     cache_action_sc = Shortcut(cache_action_dict.keys())
@@ -58,7 +59,7 @@ USAGE
 
 ARGUMENTS
 
-    action = string: enable, disable, read_only, clear, or optimize
+    action = string: enable, disable, read_only, clear, optimize, or status
 
     scenes = string: a space-separated list of scene names (default: '')
 
@@ -69,13 +70,25 @@ EXAMPLES
     cache enable
     cache optimize
     cache optimize, F1 F2 F5
+    cache status
 
 NOTES
 
     "cache optimize" will iterate through the list of scenes provided
     (or all defined scenes), compute any missing surfaces, and store
     them in the cache for later reuse.
-    
+
+    "cache status" reports the number of entries, the approximate memory
+    usage and the hit, miss and eviction counters. The API returns them
+    as a dictionary.
+
+    If the PYMOL_CACHE_DIR environment variable is set, computed results
+    are also stored in that directory and reused by later PyMOL processes
+    (e.g. when opening the same session again). PYMOL_CACHE_DIR_MAX
+    limits the directory size in MB (default: 1000). "cache clear" does
+    not remove these files. The directory must not be writable by other
+    users, otherwise it is not used.
+
 PYMOL API
 
     cmd.cache(string action, string scenes, int state, int quiet)
@@ -131,6 +144,18 @@ PYMOL API
             _self.set('cache_max',cache_max) # restore previous limits
             if not quiet:
                 print(" cache: optimization complete (~%0.1f MB)."%(usage*4/1000000.0))
+        elif action == 5: # status
+            status = _self._cache_status()
+            if not quiet:
+                print(" cache: %d entries (~%0.1f MB), %d hits, %d misses,"
+                      " %d evictions." % (status['entries'],
+                          status['bytes'] / 1000000.0, status['hits'],
+                          status['misses'], status['evictions']))
+                if 'disk_bytes' in status:
+                    print(" cache: disk %d hits, %d writes (~%0.1f MB)." % (
+                        status['disk_hits'], status['disk_writes'],
+                        status['disk_bytes'] / 1000000.0))
+            return status
         else:
             raise ValueError('action')
 
@@ -429,7 +454,7 @@ NOTES
                 try:
                     session['session'] = copy.deepcopy(_self._pymol.session)
                     if cache and hasattr(_self._pymol,'_cache'):
-                        session['cache'] = _self._pymol._cache
+                        session['cache'] = list(_self._pymol._cache)
                 except:
                     colorprinting.print_exc()
 
@@ -553,11 +578,14 @@ PYMOL API
         FORMAT_GUESS = -1
         FORMAT_PNG = 0
         FORMAT_PPM = 1
+        FORMAT_RGBA = 2 # raw, with filename=None for a bytes buffer
 
         if format == 'png':
             format = FORMAT_PNG
+        elif format == 'rgba':
+            format = FORMAT_RGBA
 
-        assert format in (FORMAT_PNG, FORMAT_PPM, FORMAT_GUESS)
+        assert format in (FORMAT_PNG, FORMAT_PPM, FORMAT_RGBA, FORMAT_GUESS)
 
         if format == FORMAT_GUESS:
             if filename and filename.endswith(".ppm"):
@@ -705,7 +733,7 @@ ARGUMENTS
                     int(multi), int(quiet))
 
     def multifilesave(filename, selection='*', state=-1, format='', ref='',
-             ref_state=-1, quiet=1, *, _self=cmd):
+             ref_state=-1, quiet=1, threads=1, *, _self=cmd):
         '''
 DESCRIPTION
 
@@ -719,16 +747,56 @@ DESCRIPTION
     {num}   : file number
     {}      : object name (first) or state (second)
 
+ARGUMENTS
+
+    threads = int: number of threads which compress and write the files
+    while the next files are exported, 0 = number of CPUs {default: 1}
+
 EXAMPLES
 
     multifilesave /tmp/{name}.pdb
     multifilesave /tmp/{name}-{state}.cif, state=0
     multifilesave /tmp/{}-{}.cif, state=0
     multifilesave /tmp/{}-{title}.sdf, state=0
+    multifilesave /tmp/{}-{state}.pdb.gz, state=0, threads=4
         '''
-        for (fname, osele, ostate) in multifilenamegen(
-                filename, selection, int(state), _self):
-            r = _self.save(fname, osele, ostate, format, ref, ref_state, quiet)
+        threads = int(threads) or os.cpu_count() or 1
+        r = DEFAULT_ERROR
+
+        if threads < 2:
+            for (fname, osele, ostate) in multifilenamegen(
+                    filename, selection, int(state), _self):
+                r = _self.save(fname, osele, ostate, format, ref, ref_state,
+                        quiet)
+            return r
+
+        # Exporting needs the API lock and happens in this thread, file
+        # output and compression run concurrently in the pool.
+        import collections
+        from concurrent.futures import ThreadPoolExecutor
+
+        pending = collections.deque()
+
+        def writer(fname, zipped, contents):
+            chunks = _save_chunks(contents)
+            if chunks is None:
+                return False
+            while len(pending) >= 2 * threads:
+                pending.popleft().result()
+            pending.append(executor.submit(_save_write_chunks, fname,
+                zipped, list(chunks)))
+            return True
+
+        with ThreadPoolExecutor(threads) as executor:
+            try:
+                for (fname, osele, ostate) in multifilenamegen(
+                        filename, selection, int(state), _self):
+                    r = _self.save(fname, osele, ostate, format, ref,
+                            ref_state, quiet, _writer=writer)
+            finally:
+                while pending:
+                    pending.popleft().result()
+
         return r
 
 
@@ -781,8 +849,131 @@ EXAMPLES
             yield fname, osele, ostate
 
 
+    # leading file header lines of the formats which write one entry per
+    # object-state (only the first chunk keeps them)
+    _per_state_header_lines = {'sdf': 0, 'xyz': 0, 'mol2': 1, 'mae': 2}
+
+    _cif_loop_end = b'_atom_site.pdbx_PDB_model_num\n'
+
+    def _get_bytes_chunks(format, selection, ref, ref_state, quiet, _self):
+        '''
+        Like get_bytes(format, selection, state=0) but generate the file
+        one object-state at a time, so that the complete file never has to
+        be held in memory.
+        '''
+        def export(sele, state):
+            return _self.get_bytes(format, sele, state, ref, ref_state, -1,
+                    quiet)
+
+        def strip_file_header(b, n=1):
+            return b.split(b'\n', n)[-1]
+
+        first = True
+
+        for oname in _self.get_object_list(selection) or ():
+            osele = '(%s) & ?%s' % (selection, oname)
+            nstates = _self.count_states('%' + oname)
+
+            if format != 'cif':
+                nheader = _per_state_header_lines[format]
+                for ostate in range(1, nstates + 1):
+                    b = export(osele, ostate)
+                    yield b if first else strip_file_header(b, nheader)
+                    first = False
+                continue
+
+            # mmCIF: one data block per object, atom ids are only
+            # consistent across states if all states have all atoms
+            natoms = _self.count_atoms(osele)
+            if any(_self.count_atoms(osele, state=ostate) != natoms
+                    for ostate in range(1, nstates + 1)):
+                b = export(osele, 0)
+                if _cif_loop_end in b:
+                    yield b if first else strip_file_header(b)
+                    first = False
+                continue
+
+            in_block = False
+            for ostate in range(1, nstates + 1):
+                b = export(osele, ostate)
+                i = b.find(_cif_loop_end)
+                if i == -1:
+                    continue
+                if in_block:
+                    b = b[i + len(_cif_loop_end):]
+                elif not first:
+                    b = strip_file_header(b)
+                yield b
+                first = False
+                in_block = True
+
+        if first:
+            yield export(selection, 0)
+
+    def _save_chunks(contents):
+        '''
+        Sequence or iterator of str/bytes chunks for the return value of a
+        "savefunctions" function, or None if there is nothing to write.
+        '''
+        import inspect
+        if cmd.is_string(contents):
+            return (contents,)
+        if isinstance(contents, (tuple, list)):
+            return contents or None
+        if inspect.isgenerator(contents):
+            return contents
+        return None
+
+    def _save_write_chunks(filename, zipped, chunks):
+        '''
+        Write chunks to a temporary file next to "filename" and rename it
+        on success, so that a failure doesn't leave a truncated file.
+        '''
+        import gzip
+        import bz2
+        import shutil
+
+        filename = os.path.realpath(filename)
+        tmpname = '%s.%d.%d.tmp' % (filename, os.getpid(), thread.get_ident())
+
+        try:
+            with open(tmpname, 'wb') as raw:
+                if zipped == 'gz':
+                    # keep the final file name in the gzip header
+                    handle = gzip.GzipFile(filename, 'wb', fileobj=raw)
+                elif zipped == 'bz2':
+                    handle = bz2.BZ2File(raw, 'wb')
+                else:
+                    handle = raw
+
+                with handle:
+                    for chunk in chunks:
+                        if not isinstance(chunk, bytes):
+                            chunk = chunk.encode()
+                        handle.write(chunk)
+
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmpname)
+            os.replace(tmpname, filename)
+        except BaseException:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+
+    def _save_write(filename, zipped, contents):
+        '''
+        Write contents incrementally to a (compressed) file. Returns False
+        if there was nothing to write.
+        '''
+        chunks = _save_chunks(contents)
+        if chunks is None:
+            return False
+        _save_write_chunks(filename, zipped, chunks)
+        return True
+
     def save(filename, selection='(all)', state=-1, format='', ref='',
-             ref_state=-1, quiet=1, partial=0, *, _self=cmd):
+             ref_state=-1, quiet=1, partial=0, *, _self=cmd,
+             _writer=_save_write):
         '''
 DESCRIPTION
 
@@ -818,7 +1009,9 @@ NOTES
     
     * if state = -1 (default), then only the current state is written.
 
-    * if state = 0, then a multi-state output file is written.
+    * if state = 0, then a multi-state output file is written. SDF, MOL2,
+      MAE, XYZ and mmCIF files are exported and written one object-state
+      at a time.
     
 SEE ALSO
 
@@ -858,7 +1051,12 @@ SEE ALSO
 
         contents = None
 
-        if format in savefunctions:
+        if (format in _per_state_header_lines or format == 'cif') and \
+                int(state) == 0 and not (ref and int(ref_state) < -1):
+            contents = _get_bytes_chunks(format, selection, ref, ref_state,
+                    quiet, _self)
+
+        elif format in savefunctions:
             # generic forwarding to format specific save functions
             func = savefunctions[format]
             func = _eval_func(func)
@@ -903,25 +1101,8 @@ SEE ALSO
         else:
             raise pymol.CmdException('File format not supported for export')
 
-        # function returned sequence of strings or bytes
-        if isinstance(contents, (tuple, list)) and contents:
-            contents = contents[0][:0].join(contents)
-
-        if cmd.is_string(contents):
-            if not isinstance(contents, bytes):
-                contents = contents.encode()
-
-            if zipped == 'gz':
-                import gzip
-                fopen = gzip.open
-            else:
-                fopen = open
-                if zipped == 'bz2':
-                    import bz2
-                    contents = bz2.compress(contents)
-
-            with fopen(filename, 'wb') as handle:
-                handle.write(contents)
+        # function returned string, bytes, or a sequence or generator of them
+        if _writer(filename, zipped, contents):
             r = DEFAULT_SUCCESS
 
         if _self._raising(r): raise QuietException
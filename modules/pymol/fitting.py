@@ -196,6 +196,273 @@ SEE ALSO
             _self.delete(sele_name)
 
 
+        # per process state of the align_all workers
+        _align_all_worker = {}
+
+        def _ttt_to_homogenous(ttt):
+            '''
+            4x4 homogenous matrix (flat row-major list) from a TTT matrix
+            (rotation, post-translation in the last column, pre-translation
+            in the last row)
+            '''
+            import numpy
+            m = numpy.reshape(ttt, (4, 4))
+            h = numpy.identity(4)
+            h[:3, :3] = m[:3, :3]
+            h[:3, 3] = m[:3, :3].dot(m[3, :3]) + m[:3, 3]
+            return h.ravel().tolist()
+
+        def _fit_homogenous(X, Y):
+            '''
+            4x4 homogenous matrix (flat row-major list) of the least squares
+            superposition of X onto Y (Kabsch)
+            '''
+            import numpy
+            from chempy import cpv
+            yc, xc, R = cpv.fit_arrays(Y, X)[:3]
+            h = numpy.identity(4)
+            h[:3, :3] = R
+            h[:3, 3] = yc - R.dot(xc)
+            return h.ravel().tolist()
+
+        def _tm_score(mobile, target, matrix, pairs, length):
+            '''
+            TM-score of the given (mobile, target) index pairs after applying
+            "matrix" to mobile, normalized by the target length
+            '''
+            import numpy
+            if not len(pairs) or not length:
+                return 0.0
+            h = numpy.reshape(matrix, (4, 4))
+            i, j = numpy.asarray(pairs).T
+            X = mobile[i].dot(h[:3, :3].T) + h[:3, 3]
+            d = numpy.sqrt(((X - target[j]) ** 2).sum(1))
+            d0 = max(0.5, 1.24 * numpy.cbrt(length - 15) - 1.8) \
+                    if length > 15 else 0.5
+            return float((1.0 / (1.0 + (d / d0) ** 2)).sum() / length)
+
+        def _align_all_init(method, data, kwargs):
+            '''
+            Worker initializer: start a private PyMOL instance
+            '''
+            import pymol2
+            p = pymol2.PyMOL()
+            p.start()
+            p.cmd.feedback('disable', 'all', 'everything')
+            _align_all_worker.update(pymol=p, method=method, data=data,
+                    kwargs=kwargs, loaded=set())
+
+        def _align_all_pair(pair):
+            '''
+            Worker task: align one (mobile, target) pair of indices into the
+            data list. Returns (rmsd, length, tm_score, matrix).
+            '''
+            mobile, target = pair
+            w = _align_all_worker
+            p = w['pymol']
+            data = w['data']
+            kwargs = dict(w['kwargs'])
+
+            try:
+                if w['method'] == 'cealign':
+                    X = data[mobile]
+                    Y = data[target]
+                    window = int(kwargs.get('window', 8))
+                    aln_len, rmsd, ttt, i1, i2 = _cmd.cealign(p._COb,
+                            Y.tolist(), X.tolist(),
+                            float(kwargs.get('d0', 3.0)),
+                            float(kwargs.get('d1', 4.0)), window,
+                            int(kwargs.get('gap_max', 30)))
+                    matrix = _ttt_to_homogenous(ttt)
+                    pairs = [(b + k, a + k) for (a, b) in zip(i1, i2)
+                             for k in range(window)]
+                else:
+                    names = []
+                    for i in pair:
+                        names.append('_m%d' % i)
+                        if i not in w['loaded']:
+                            p.cmd.load_model(data[i], names[-1])
+                            w['loaded'].add(i)
+                    X = p.cmd.get_coords(names[0])
+                    Y = p.cmd.get_coords(names[1])
+                    if X is None or Y is None:
+                        raise pymol.CmdException('no coordinates')
+                    kwargs.update(object='_aln', quiet=1, transform=1)
+                    fn = p.cmd.super if w['method'] == 'super' else p.cmd.align
+                    rmsd, aln_len = fn(names[0], names[1], **kwargs)[:2]
+                    # recover the applied transformation, then undo it
+                    matrix = _fit_homogenous(X, p.cmd.get_coords(names[0]))
+                    p.cmd.load_coords(X, names[0])
+                    pairs = []
+                    for column in p.cmd.get_raw_alignment('_aln'):
+                        column = dict(column)
+                        pairs.append((column[names[0]] - 1,
+                                      column[names[1]] - 1))
+                    p.cmd.delete('_aln')
+            except (pymol.CmdException, SystemError):
+                # failed alignment (cealign's findBest may return NULL,
+                # which raises SystemError), other errors propagate
+                return (float('nan'), 0, 0.0, [float('nan')] * 16)
+
+            tm = _tm_score(X, Y, matrix, pairs, len(Y))
+            return (float(rmsd), int(aln_len), tm, matrix)
+
+        def align_all(selection='(all)', targets='', method='cealign',
+                      guide=1, state=1, processes=0, transform=0, quiet=1,
+                      *, _self=cmd, **kwargs):
+            '''
+DESCRIPTION
+
+    "align_all" aligns every object in selection to every target object
+    (all-vs-all if no targets are given) and returns the score matrices
+    and transformation matrices.
+
+    The guide atom coordinates (cealign) or models (align, super) of all
+    objects are extracted once. The alignments run in a pool of worker
+    processes, each with its own PyMOL instance, and do not modify the
+    loaded objects unless "transform" is set.
+
+USAGE
+
+    align_all [ selection [, targets [, method [, guide [, state
+        [, processes [, transform ]]]]]]]
+
+ARGUMENTS
+
+    selection = string: atom selection of the mobile objects {default: all}
+
+    targets = string: atom selection of the target objects {default: same
+    as selection}
+
+    method = string: cealign, align or super {default: cealign}
+
+    guide = 0/1: only use guide atoms (CA, C4') {default: 1}
+
+    state = int: object state {default: 1}
+
+    processes = int: number of worker processes, 0 for the number of
+    CPUs {default: 0}
+
+    transform = 0/1: superpose each mobile object onto the first target
+    object {default: 0}
+
+    ... extra arguments are passed to "method"
+
+PYMOL API
+
+    cmd.align_all(...) returns a dict with the object name lists "mobiles"
+    and "targets", and NumPy arrays "rmsd", "length", "tm_score" (shape
+    NxM) and "matrix" (shape NxMx16, homogenous row-major matrices which
+    superpose mobile onto target). Failed alignments have a RMSD of NaN.
+
+EXAMPLE
+
+    r = cmd.align_all('model_*', method='cealign', processes=8)
+    best = r['tm_score'].argmax(1)
+
+SEE ALSO
+
+    extra_fit, cealign, align, super
+            '''
+            import numpy
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            guide, state, processes = int(guide), int(state), int(processes)
+            transform, quiet = int(transform), int(quiet)
+
+            if method not in ('cealign', 'align', 'super'):
+                raise pymol.CmdException(method, 'Unknown method')
+
+            sele_name = _self.get_unused_name('_')
+            try:
+                _self.select(sele_name, selection, 0)
+                mobiles = _self.get_object_list(sele_name)
+                if targets:
+                    _self.select(sele_name, targets, merge=1)
+                    targets = _self.get_object_list('(' + targets + ')')
+                else:
+                    targets = list(mobiles)
+
+                names = list(mobiles)
+                names += [name for name in targets if name not in mobiles]
+
+                # extract the guide atoms once per object
+                data = []
+                for name in names:
+                    sele = '?%s & ?%s' % (sele_name, name)
+                    if guide:
+                        sele += ' & guide'
+                    if method == 'cealign':
+                        coords = _self.get_coords(sele, state)
+                        data.append(numpy.zeros((0, 3)) if coords is None
+                                    else coords)
+                    else:
+                        data.append(_self.get_model(sele, state, fast=1))
+            finally:
+                _self.delete(sele_name)
+
+            index = dict((name, i) for (i, name) in enumerate(names))
+            shape = (len(mobiles), len(targets))
+            rmsd = numpy.full(shape, numpy.nan)
+            length = numpy.zeros(shape, int)
+            tm_score = numpy.zeros(shape)
+            matrix = numpy.full(shape + (16,), numpy.nan)
+
+            pairs = []
+            cells = []
+            for (i, mobile) in enumerate(mobiles):
+                for (j, target) in enumerate(targets):
+                    if mobile == target:
+                        n = len(data[index[mobile]])
+                        rmsd[i, j], length[i, j], tm_score[i, j] = 0.0, n, 1.0
+                        matrix[i, j] = numpy.identity(4).ravel()
+                    else:
+                        pairs.append((index[mobile], index[target]))
+                        cells.append((i, j))
+
+            if pairs:
+                if processes < 1:
+                    processes = os.cpu_count() or 1
+                processes = min(processes, len(pairs))
+
+                if not quiet:
+                    print(' align_all: %d alignments with %d processes' % (
+                        len(pairs), processes))
+
+                chunksize = max(1, len(pairs) // (processes * 4))
+                with ProcessPoolExecutor(processes,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_align_all_init,
+                        initargs=(method, data, kwargs)) as executor:
+                    results = executor.map(_align_all_pair, pairs,
+                                           chunksize=chunksize)
+                    for ((i, j), r) in zip(cells, results):
+                        rmsd[i, j], length[i, j], tm_score[i, j], \
+                                matrix[i, j] = r
+
+            if transform and targets:
+                for (i, mobile) in enumerate(mobiles):
+                    if mobile != targets[0] and not numpy.isnan(rmsd[i, 0]):
+                        _self.transform_object(mobile, matrix[i, 0].tolist(),
+                                               state=0, homogenous=1)
+
+            if not quiet:
+                for (i, mobile) in enumerate(mobiles):
+                    j = int(numpy.argmax(tm_score[i]))
+                    print(' %-20s best: %-20s RMSD = %8.3f TM = %.3f' % (
+                        mobile, targets[j], rmsd[i, j], tm_score[i, j]))
+
+            return {
+                'mobiles': mobiles,
+                'targets': targets,
+                'rmsd': rmsd,
+                'length': length,
+                'tm_score': tm_score,
+                'matrix': matrix,
+            }
+
+
         def alignto(target='', method="cealign", selection='', quiet=1, *, _self=cmd, **kwargs):
                 """
 DESCRIPTION
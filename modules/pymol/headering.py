@@ -1,6 +1,7 @@
 import os
 import re
 import sys
+import copy
 import struct
 import pymol
 import math
@@ -14,6 +15,23 @@ else:
     MACH_ARCH_CODE_INT = 4
     MACH_ARCH_CODE_FLT = 4
 
+# parsed headers by (class, path, size, mtime), so that the file dialogs
+# and map generation don't parse the same file again
+_header_cache = {}
+_header_cache_size = 16
+
+def _iter_records(f, size=80, count=100):
+    '''
+    Yield fixed size records from the current file position, reading
+    `count` records at once
+    '''
+    while True:
+        block = f.read(size * count)
+        for i in range(0, len(block) - size + 1, size):
+            yield block[i:i + size]
+        if len(block) < size * count:
+            return
+
 class baseHeader:
     """
     A simple base class used to parse biological data headers
@@ -27,6 +45,27 @@ class baseHeader:
 
     def parseFile(self):
         pass
+    def parseFileCached(self):
+        """
+        parseFile, or copy the result from a previous parse of the
+        unchanged file
+        """
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return self.parseFile()
+        key = (type(self), os.path.abspath(self.filename),
+               st.st_size, st.st_mtime_ns)
+        state = _header_cache.get(key)
+        if state is None:
+            self.parseFile()
+            state = copy.deepcopy(self.__dict__)
+            del state["filename"]
+            _header_cache[key] = state
+            while len(_header_cache) > _header_cache_size:
+                del _header_cache[next(iter(_header_cache))]
+        else:
+            self.__dict__.update(copy.deepcopy(state))
     def getColumns(self):
         return self.cols
     def getColumnsOfType(self,targetType):
@@ -99,32 +138,35 @@ class CIFHeader(baseHeader):
     """
     def __init__(self,filename):
         baseHeader.__init__(self,filename)
-        self.parseFile()
+        self.parseFileCached()
 
     def parseFile(self):
+        """
+        Collects the _refln. column names of the first data block. Stops
+        reading at the end of the column names, the reflections are not
+        read.
+        """
         if self.checkFile():
             try:
-                inFile = open(self.filename,'rb')
-                data = inFile.readlines()
-                inFile.close()
-
-                in_loop = False
-
-                curLine = data.pop(0)
-                while curLine is not None:
-                    if in_loop:
-                        if curLine.startswith("_refln."):
-                            self.cols.append(curLine.split(".",1)[1].strip())
-                        else:
-                            in_loop=False
-                    else:
-                        if curLine.startswith("loop_"):
+                with open(self.filename,'rb') as inFile:
+                    in_loop = False
+                    in_block = False
+
+                    for curLine in inFile:
+                        curLine = curLine.lstrip()
+                        if curLine.startswith(b"data_"):
+                            if in_block and self.cols:
+                                break
+                            in_block = True
+                        elif curLine.startswith(b"loop_"):
                             in_loop=True
-                    if len(data):
-                        curLine = data.pop(0)
-                    else:
-                        curLine = None
-
+                        elif in_loop:
+                            if curLine.startswith(b"_refln."):
+                                self.cols.append(curLine.split(b".",1)[1].strip().decode(errors="replace"))
+                            elif self.cols:
+                                break
+                            else:
+                                in_loop=False
 
             except IOError as e:
                 print("Error-CIFReader: Couldn't read '%s' for input." % (self.filename))
@@ -179,7 +221,7 @@ class MTZHeader(baseHeader):
 
         self.datasets  = {}
 
-        self.parseFile()
+        self.parseFileCached()
         self.format_cols()
 
     def format_cols(self,colType=None):
@@ -293,14 +335,17 @@ class MTZHeader(baseHeader):
             header_start  = (header_start-1) * (bAdjust)
 
             if file_len<header_start:
-                print("Error: File '%s' cannot be parsed because PyMOL cannot find the header.  If you think")
+                print("Error: File '%s' cannot be parsed because PyMOL cannot find the header.  If you think" % (self.filename))
                 print("       PyMOL should be able to read this, plese send the file and this mesage to ")
                 print("       help@schrodinger.com.  Thanks!")
 
+            # header records (80 characters each) from header_start to
+            # END, the reflections before are not read
             f.seek(header_start)
+            records = _iter_records(f)
 
-            curLine = struct.unpack("80s", f.read(80))[0]
-            curLine = str(curLine.decode())
+            curLine = next(records, b"END")
+            curLine = str(curLine.decode(errors="replace"))
 
             while not (curLine.startswith("END")):
                 # yank field identifier
@@ -399,8 +444,10 @@ class MTZHeader(baseHeader):
                 except pymol.cmd.QuietException:
                     pass
 
-                curLine = struct.unpack("80s", f.read(80))[0]
-                curLine = str(curLine.decode())
+                curLine = next(records, b"END")
+                curLine = str(curLine.decode(errors="replace"))
+
+            f.close()
 
 
 if __name__=="__main__":
@@ -300,14 +300,16 @@ NOTES
     internal states do not get corrupted.  This makes it very easy to
     build complicated systems which involve direct realtime visualization.
         '''
-        import sys
+        import importlib
         name = _self.kwhash.auto_err(name, 'command')
         func = cmd.keyword[name][0]
         print(' CMD:', name)
         print(' API: %s.%s' % (func.__module__, func.__name__))
         if func == getattr(_self, func.__name__, None):
             print(' API: cmd.' + func.__name__)
-        print(' FILE:', sys.modules[func.__module__].__file__)
+        # imports the module of a lazy command (see api.py)
+        module = importlib.import_module(func.__module__)
+        print(' FILE:', module.__file__)
         return func
 
     def keyboard(*, _self=cmd):
@@ -18,6 +18,7 @@ if True:
     import os
     import sys
     import copy
+    import threading
     import pymol
     cmd = sys.modules["pymol.cmd"]
     from . import selector
@@ -333,9 +334,13 @@ DESCRIPTION
 PYMOL API
 
     cmd.load_model(model, object [,state [,finish [,discrete ]]])
+
+    "model" may be a chempy.models.Indexed or a chempy.fast.FastModel
         '''
         lst = [loadable.model]
         lst.extend(list(arg))
+        if hasattr(lst[1], 'convert_to_indexed'):
+            lst[1] = lst[1].convert_to_indexed()
         return _self.load_object(*lst, **kw)
 
     def load_traj(filename,object='',state=1,format='',interval=1,
@@ -529,6 +534,7 @@ SEE ALSO
             root = None
             port = 0
             wrap_native = 0
+            threaded = 0
             headers = []
             if '://' in fname:
                 lines = urllib.urlopen(fname).readlines()
@@ -587,10 +593,13 @@ SEE ALSO
                             pass
                         elif keyword == 'wrap_native_return_types':
                             wrap_native = 1
+                        elif keyword == 'threaded': # thread per connection, keep-alive
+                            threaded = 1
                         else:
                             print("Error: unrecognized input:  %s"%str(input))
             if launch_flag:
-                server = PymolHttpd(port,root,logging,wrap_native,headers=headers)
+                server = PymolHttpd(port,root,logging,wrap_native,headers=headers,
+                                    threaded=threaded)
                 if port == 0:
                     port = server.port # get the dynamically assigned port number
                 server.start()
@@ -828,8 +837,11 @@ SEE ALSO
 
     def load_pse(filename, partial=0, quiet=1, format='pse', *, _self=cmd):
         try:
-            contents = _self.file_read(filename)
-            session = io.pkl.fromString(contents)
+            if '://' in filename:
+                session = io.pkl.fromString(_self.file_read(filename))
+            else:
+                # memory-mapped (or streamed if compressed)
+                session = io.pkl.fromFile(filename)
         except AttributeError as e:
             raise pymol.CmdException('PSE contains objects which cannot be unpickled (%s)' % str(e))
 
@@ -1152,22 +1164,178 @@ PYMOL API
         ],
     }
 
-    def _fetch(code, name, state, finish, discrete, multiplex, zoom, type, path,
-            file, quiet, _self=cmd):
+    # maximum number of concurrent downloads when fetching multiple codes
+    fetch_max_workers = 8
+
+    class _FetchJob:
         '''
-        code = str: single pdb identifier
-        name = str: object name
-        state = int: object state
-        finish =
-        discrete = bool: make discrete multi-state object
-        multiplex = bool: split states into objects (like split_states)
-        zoom = int: zoom to new loaded object
-        type = str: fofc, 2fofc, pdb, pdb1, ... 
-        path = str: fetch_path
-        file = str or file: file name or open file handle
+        Download source and destination for a single code.
+
+        url_groups is a list of lists of URLs. Groups are tried in order,
+        the URLs within a group only differ by the mirror host and are
+        requested concurrently (first response wins).
         '''
-        r = DEFAULT_ERROR
+        def __init__(self, code, bioType, file, fobj, url_groups):
+            self.code = code
+            self.bioType = bioType
+            self.file = file
+            self.fobj = fobj
+            self.url_groups = url_groups
+
+    class _HTTPConnectionPool:
+        '''
+        Idle keep-alive HTTP(S) connections, keyed by (scheme, host, proxy),
+        shared by all download threads. HTTPS requests through a proxy are
+        tunneled with CONNECT, HTTP requests are sent to the proxy.
+        '''
+        max_idle = 8
+
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.idle = {}
+
+        def acquire(self, key):
+            import http.client
+            with self.lock:
+                idle = self.idle.get(key)
+                if idle:
+                    return idle.pop()
+            scheme, host, proxy = key
+            conn_class = http.client.HTTPSConnection if scheme == 'https' \
+                    else http.client.HTTPConnection
+            if proxy is None:
+                return conn_class(host, timeout=60)
+            conn = conn_class(proxy, timeout=60)
+            if scheme == 'https':
+                conn.set_tunnel(host)
+            return conn
+
+        def release(self, key, conn):
+            with self.lock:
+                idle = self.idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(conn)
+                    return
+            conn.close()
+
+    _http_connections = _HTTPConnectionPool()
+
+    def _url_proxy(parts):
+        '''
+        Proxy URL (split) for the given URL (split) from the http_proxy,
+        https_proxy and no_proxy environment, or None.
+        '''
+        import urllib.request
+        from urllib.parse import urlsplit
+
+        proxy = urllib.request.getproxies().get(parts.scheme)
+        if not proxy or urllib.request.proxy_bypass(parts.netloc):
+            return None
+        if '://' not in proxy:
+            proxy = 'http://' + proxy
+        return urlsplit(proxy)
+
+    def _url_read(url, _self=cmd, redirects=5):
+        '''
+        Like cmd.file_read, but reuses HTTP(S) connections to the same
+        host.
+        '''
+        import http.client
+        from urllib.parse import urlsplit, urljoin
+        from .internal import _file_decompress
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            return _self.file_read(url)
+
+        proxy = _url_proxy(parts)
+        if proxy is not None and (proxy.scheme != 'http' or proxy.username):
+            # authenticating or non-HTTP proxy, leave it to urllib
+            return _self.file_read(url)
+
+        key = (parts.scheme, parts.netloc, proxy and proxy.netloc)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        if proxy is not None and parts.scheme == 'http':
+            path = url.split('#')[0]
+        headers = {'User-Agent': 'PyMOL/' + _self.get_version()[0]}
+
+        for attempt in (0, 1):
+            conn = _http_connections.acquire(key)
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                contents = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # server may have closed an idle connection, retry once
+                conn.close()
+                if attempt:
+                    raise pymol.CmdException('failed to open file "%s"' % url)
+
+        if response.will_close:
+            conn.close()
+        else:
+            _http_connections.release(key, conn)
+
+        if response.status in (301, 302, 303, 307, 308) and redirects > 0:
+            location = urljoin(url, response.getheader('Location', ''))
+            return _url_read(location, _self, redirects - 1)
+
+        if response.status != 200:
+            raise pymol.CmdException('failed to open file "%s" (HTTP %d)' %
+                    (url, response.status))
+
+        return _file_decompress(contents)
+
+    def _fetch_url(url, _self=cmd):
+        contents = _url_read(url, _self)
+
+        # assume HTML content means error on server side without error HTTP code
+        if b'<html' in contents[:500].lower():
+            raise pymol.CmdException('HTML response from "%s"' % url)
+
+        return contents
+
+    def _fetch_race(url_list, quiet, _self=cmd):
+        '''
+        Request all (mirror) URLs concurrently and return the first
+        successful download, or None.
+        '''
+        if len(url_list) == 1:
+            try:
+                return _fetch_url(url_list[0], _self)
+            except pymol.CmdException:
+                if not quiet:
+                    colorprinting.warning(" Warning: failed to fetch from %s" % (url_list[0],))
+                return None
+
+        import concurrent.futures as futures
+
+        executor = futures.ThreadPoolExecutor(len(url_list))
+        try:
+            pending = {executor.submit(_fetch_url, url, _self): url
+                    for url in url_list}
+            while pending:
+                done, _ = futures.wait(pending,
+                        return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        return future.result()
+                    except pymol.CmdException:
+                        if not quiet:
+                            colorprinting.warning(" Warning: failed to fetch from %s" % (url,))
+        finally:
+            # don't wait for the slower mirrors
+            executor.shutdown(wait=False)
 
+        return None
+
+    def _fetch_prepare(code, type, path, file, _self=cmd):
+        '''
+        Resolve download URLs and local file name for a single code.
+        Returns a _FetchJob.
+        '''
         fetch_host_list = [x if '://' in x else fetchHosts[x]
                 for x in _self.get("fetch_host").split()]
 
@@ -1198,17 +1366,18 @@ PYMOL API
         else:
             raise ValueError('type')
 
+        if bioType not in ['cc']:
+            code = code.lower()
+
         url = hostPaths[bioType]
-        url_list = []
+        url_groups = []
         for url in url if cmd.is_sequence(url) else [url]:
-            url_list += [url] if '://' in url else [fetch_host + url
+            group = [url] if '://' in url else [fetch_host + url
                 for fetch_host in fetch_host_list]
-
-        if bioType not in ['cc']:
-            code = code.lower()
+            url_groups.append([u.format(mid=code[-3:-1], code=code, type=type)
+                for u in group])
 
         fobj = None
-        contents = None
 
         if not file or file in (1, '1', 'auto'):
             file = os.path.join(path, nameFmt.format(code=code, type=type))
@@ -1218,23 +1387,30 @@ PYMOL API
             file = None
         elif os.path.exists(file):
             # skip downloading
-            url_list = []
-
-        for url in url_list:
-            url = url.format(mid=code[-3:-1], code=code, type=type)
+            url_groups = []
 
-            try:
-                contents = _self.file_read(url)
+        return _FetchJob(code, bioType, file, fobj, url_groups)
 
-                # assume HTML content means error on server side without error HTTP code
-                if b'<html' in contents[:500].lower():
-                    raise pymol.CmdException
-
-            except pymol.CmdException:
-                if not quiet:
-                    colorprinting.warning(" Warning: failed to fetch from %s" % (url,))
-                continue
+    def _fetch_download(job, quiet, _self=cmd):
+        '''
+        Download the contents for a _FetchJob, or None. Does not touch
+        the object model and may run in a worker thread.
+        '''
+        for url_list in job.url_groups:
+            contents = _fetch_race(url_list, quiet, _self)
+            if contents is not None:
+                return contents
+        return None
+
+    def _fetch_load(job, contents, name, state, finish, discrete, multiplex,
+            zoom, quiet, _self=cmd):
+        '''
+        Save the downloaded contents and load them into object "name".
+        '''
+        r = DEFAULT_ERROR
+        file, fobj, bioType = job.file, job.fobj, job.bioType
 
+        if contents is not None:
             if file:
                 try:
                     fobj = open(file, 'wb')
@@ -1250,9 +1426,7 @@ PYMOL API
             if not file:
                 return DEFAULT_SUCCESS
 
-            break
-
-        if os.path.exists(file):
+        if file and os.path.exists(file):
             r = _self.load(file, name, state, '',
                     finish, discrete, quiet, multiplex, zoom)
         elif contents and bioType in ('pdb', 'bio'):
@@ -1268,11 +1442,29 @@ PYMOL API
         if not _self.is_error(r):
             return name
 
-        colorprinting.error(" Error-fetch: unable to load '%s'." % code)
+        colorprinting.error(" Error-fetch: unable to load '%s'." % job.code)
         return DEFAULT_ERROR
 
+    def _fetch(code, name, state, finish, discrete, multiplex, zoom, type, path,
+            file, quiet, _self=cmd):
+        '''
+        code = str: single pdb identifier
+        name = str: object name
+        state = int: object state
+        finish =
+        discrete = bool: make discrete multi-state object
+        multiplex = bool: split states into objects (like split_states)
+        zoom = int: zoom to new loaded object
+        type = str: fofc, 2fofc, pdb, pdb1, ... 
+        path = str: fetch_path
+        file = str or file: file name or open file handle
+        '''
+        job = _fetch_prepare(code, type, path, file, _self)
+        contents = _fetch_download(job, quiet, _self)
+        return _fetch_load(job, contents, name, state, finish, discrete,
+                multiplex, zoom, quiet, _self)
+
     def _multifetch(code,name,state,finish,discrete,multiplex,zoom,type,path,file,quiet,_self):
-        import string
         r = DEFAULT_SUCCESS
         code_list = code.split()
         name = name.strip()
@@ -1281,6 +1473,7 @@ PYMOL API
             # multiple PDB entries into a single object
 
         all_type = type
+        items = []
         for obj_code in code_list:
             obj_name = name
             type = all_type
@@ -1317,14 +1510,29 @@ PYMOL API
 
             obj_name = _self.get_legal_name(obj_name)
 
-            r = _fetch(obj_code, obj_name, state, finish,
-                    discrete, multiplex, zoom, type, path, file, quiet, _self)
+            job = _fetch_prepare(obj_code, type, path, file, _self)
+            items.append((job, obj_name, chain))
 
-            if chain and isinstance(r, str):
-                if _self.count_atoms(r'?%s & c. \%s' % (r, chain)) == 0:
-                    _self.delete(r)
-                    raise pymol.CmdException('no such chain: ' + chain)
-                _self.remove(r'?%s & ! c. \%s' % (r, chain))
+        # download concurrently, but load one by one (in order) in this
+        # thread, the object model is not thread safe
+        import concurrent.futures as futures
+        executor = futures.ThreadPoolExecutor(
+                max(1, min(fetch_max_workers, len(items))))
+        try:
+            downloads = [executor.submit(_fetch_download, job, quiet, _self)
+                    for (job, _, _) in items]
+
+            for ((job, obj_name, chain), download) in zip(items, downloads):
+                r = _fetch_load(job, download.result(), obj_name, state,
+                        finish, discrete, multiplex, zoom, quiet, _self)
+
+                if chain and isinstance(r, str):
+                    if _self.count_atoms(r'?%s & c. \%s' % (r, chain)) == 0:
+                        _self.delete(r)
+                        raise pymol.CmdException('no such chain: ' + chain)
+                    _self.remove(r'?%s & ! c. \%s' % (r, chain))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return r
 
@@ -1554,7 +1762,7 @@ DESCRIPTION
             object = _self.filename_to_objectname(filename)
 
         data = MmtfReader.from_url(filename)
-        models = data.to_chempy(_self.get_setting_int('cif_use_auth'))
+        models = data.to_fast_models(_self.get_setting_int('cif_use_auth'))
 
         if len(models) == 1:
             _self.load_model(models[0], object, discrete=discrete, zoom=zoom, quiet=quiet)
@@ -1,4 +1,8 @@
+import collections
+import hashlib
+import marshal
 import os
+import stat
 import sys
 cmd = sys.modules["pymol.cmd"]
 from pymol.shortcut import Shortcut
@@ -7,7 +11,6 @@ import threading
 import traceback
 
 import _thread as thread
-import urllib.request as urllib2
 
 import re
 import time
@@ -20,113 +23,372 @@ from .cmd import DEFAULT_ERROR, DEFAULT_SUCCESS, loadable, _load2str, \
 
 # cache management:
 
+class CacheStore:
+    '''
+    Hash indexed store for precomputed results (e.g. molecular surfaces)
+    with least-recently-used eviction.
+
+    Entries are lists (see CacheCreateEntry in layer1/P.cpp):
+    [size, (hash1, hash2, ...), (inp1, inp2, ...), output, access count,
+    timestamp]
+
+    "size" counts tuple items, which take about 4 bytes each. Iterating
+    yields the entries from least to most recently used, this list is what
+    gets stored in sessions.
+    '''
+
+    def __init__(self, entries=()):
+        self.clear()
+        for entry in entries:
+            self._add(list(entry))
+
+    def clear(self):
+        # hash codes -> list of entries (inputs may collide)
+        self._index = collections.OrderedDict()
+        self._count = 0
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for bucket in self._index.values():
+            yield from bucket
+
+    def _add(self, entry):
+        while len(entry) < 6:
+            entry.append(0)
+        key = tuple(entry[1])
+        self._index.setdefault(key, []).append(entry)
+        self._index.move_to_end(key)
+        self._count += 1
+        self.memory += entry[0]
+
+    def _find(self, key, inputs):
+        for entry in self._index.get(key, ()):
+            if entry[2] == inputs:
+                return entry
+        return None
+
+    def get(self, target, hash_size=None):
+        '''
+        Look up the output for the inputs of "target", or None.
+        '''
+        entry = None
+        if hash_size is None:
+            key = tuple(target[1])
+            entry = self._find(key, target[2])
+        else:
+            # match on a prefix of the hash codes
+            key = tuple(target[1][0:hash_size])
+            for other in list(self._index):
+                if other[0:hash_size] == key:
+                    entry = self._find(other, target[2])
+                    if entry is not None:
+                        key = other
+                        break
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._index.move_to_end(key)
+        entry[4] = entry[4] + 1 # access count
+        entry[5] = time.time() # timestamp
+        return entry[3]
+
+    def set(self, new_entry, max_size):
+        '''
+        Store a new entry and purge down to max_size (if positive).
+        '''
+        new_entry[4] = new_entry[4] + 1 # incr access count
+        new_entry[5] = time.time() # timestamp
+        key = tuple(new_entry[1])
+        entry = self._find(key, new_entry[2])
+        if entry is not None: # dupe (shouldn't happen)
+            self.memory += new_entry[0] - entry[0]
+            entry[0] = new_entry[0]
+            entry[3] = new_entry[3]
+            self._index.move_to_end(key)
+        else:
+            self._add(new_entry)
+        if max_size > 0 and self.memory > max_size:
+            self.purge(max_size)
+
+    def mark(self):
+        for entry in self:
+            entry[5] = 0.0
+
+    def purge(self, max_size):
+        '''
+        With max_size >= 0, evict least recently used entries (but keep at
+        least one) until the size requirement is met. With max_size < 0,
+        remove all entries which were not accessed since mark().
+        '''
+        if max_size >= 0:
+            while self.memory > max_size and self._count > 1:
+                key, bucket = next(iter(self._index.items()))
+                entry = bucket.pop(0)
+                if not bucket:
+                    del self._index[key]
+                self._count -= 1
+                self.memory -= entry[0]
+                self.evictions += 1
+        else:
+            entries = list(self)
+            self._index.clear()
+            self._count = 0
+            self.memory = 0
+            for entry in entries:
+                if entry[5] == 0.0:
+                    self.evictions += 1
+                else:
+                    self._add(entry)
+        return self.memory
+
+    def get_status(self):
+        '''
+        Dictionary with entry count, size, approximate bytes and the
+        hit/miss/eviction counters.
+        '''
+        return {
+            'entries': self._count,
+            'size': self.memory,
+            'bytes': self.memory * 4,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+class DiskCache:
+    '''
+    Content addressed on-disk store for cache entries, so results computed
+    in one PyMOL process are reused by the next one.
+
+    Opt-in with the PYMOL_CACHE_DIR environment variable.
+    PYMOL_CACHE_DIR_MAX limits the directory size in MB (default: 1000),
+    least recently used files are removed first.
+
+    File names are a hash of the PyMOL version and the entry inputs
+    (coordinates, settings and representation parameters).
+
+    Entries are stored with marshal (plain tuples, lists and numbers), not
+    pickle, so reading a file never executes code. Anyone who can write
+    to the directory can still inject wrong results, so the directory must
+    be owned by the current user and must not be group or world writable,
+    otherwise the disk cache is disabled.
+    '''
+
+    suffix = '.marshal'
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.writes = 0
+        self._version = repr(_cmd.get_version()).encode()
+        self._bytes = None # unknown until the first scan
+
+    @classmethod
+    def from_environ(cls):
+        path = os.environ.get('PYMOL_CACHE_DIR')
+        if not path:
+            return None
+        max_mb = float(os.environ.get('PYMOL_CACHE_DIR_MAX', 1000))
+        path = os.path.expanduser(path)
+        try:
+            os.makedirs(path, 0o700, exist_ok=True)
+            st = os.stat(path)
+        except OSError as e:
+            print(' DiskCache-Warning: disabled (%s)' % (e,))
+            return None
+        if (st.st_mode & (stat.S_IWGRP | stat.S_IWOTH) or
+                hasattr(os, 'getuid') and st.st_uid != os.getuid()):
+            print(' DiskCache-Warning: disabled, %s is writable by other '
+                    'users' % (path,))
+            return None
+        return cls(path, int(max_mb * 1e6))
+
+    def _filename(self, inputs):
+        h = hashlib.sha256(self._version)
+        h.update(marshal.dumps(inputs, 4))
+        key = h.hexdigest()
+        return os.path.join(self.path, key[:2], key + self.suffix)
+
+    def _files(self):
+        '''
+        List of (mtime, size, filename) for all cache files
+        '''
+        files = []
+        try:
+            subdirs = list(os.scandir(self.path))
+        except OSError:
+            return files
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith(self.suffix):
+                    try:
+                        st = entry.stat()
+                    except OSError: # removed by another process
+                        continue
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        return files
+
+    def get(self, inputs):
+        '''
+        Stored output for the given inputs, or None.
+        '''
+        filename = self._filename(inputs)
+        try:
+            with open(filename, 'rb') as handle:
+                stored_inputs, output = marshal.load(handle)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(' DiskCache-Warning: could not read %s (%s)' % (filename, e))
+            return None
+        if stored_inputs != inputs:
+            return None
+        try:
+            os.utime(filename) # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return output
+
+    def set(self, inputs, output):
+        filename = self._filename(inputs)
+        dirname = os.path.dirname(filename)
+        tmpname = None
+        try:
+            import tempfile
+            data = marshal.dumps((inputs, output), 4)
+            os.makedirs(dirname, 0o700, exist_ok=True)
+            fd, tmpname = tempfile.mkstemp('.tmp', dir=dirname)
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            # atomic, concurrent processes never see partial files
+            os.replace(tmpname, filename)
+        except (OSError, ValueError) as e: # ValueError: not marshallable
+            print(' DiskCache-Warning: could not write %s (%s)' % (filename, e))
+            if tmpname is not None and os.path.exists(tmpname):
+                os.remove(tmpname)
+            return
+        self.writes += 1
+        if self._bytes is None:
+            self._bytes = sum(f[1] for f in self._files())
+        else:
+            self._bytes += len(data)
+        if self._bytes > self.max_bytes:
+            self.purge(self.max_bytes)
+
+    def purge(self, max_bytes):
+        '''
+        Remove least recently used files until the directory size is
+        below max_bytes. Returns the new size.
+        '''
+        files = sorted(self._files())
+        total = sum(f[1] for f in files)
+        for (_, size, filename) in files:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+        self._bytes = total
+        return total
+
+    def get_status(self):
+        if self._bytes is None:
+            self._bytes = sum(f[1] for f in self._files())
+        return {
+            'disk_hits': self.hits,
+            'disk_writes': self.writes,
+            'disk_bytes': self._bytes,
+        }
+
 def _cache_validate(_self=cmd):
-    r = DEFAULT_SUCCESS
     with _self.lock_api_data:
         _pymol = _self._pymol
-        if not hasattr(_pymol,"_cache"):
-            _pymol._cache = []
-        if not hasattr(_pymol,"_cache_memory"):
-            _pymol._cache_memory = 0
+        cache = getattr(_pymol, "_cache", None)
+        if not isinstance(cache, CacheStore):
+            # plain list of entries, e.g. restored from a session
+            _pymol._cache = CacheStore(cache or ())
+        return _pymol._cache
 
 def _cache_clear(_self=cmd):
     r = DEFAULT_SUCCESS
     with _self.lock_api_data:
-        _pymol = _self._pymol
-        _pymol._cache = []
-        _pymol._cache_memory = 0
+        _cache_validate(_self).clear()
     return r
 
 def _cache_mark(_self=cmd):
     r = DEFAULT_SUCCESS
     with _self.lock_api_data:
-        _pymol = _self._pymol
-        _cache_validate(_self)
-        for entry in _self._pymol._cache:
-            entry[5] = 0.0
+        _cache_validate(_self).mark()
     return r
 
 def _cache_purge(max_size, _self=cmd):
-    r = DEFAULT_SUCCESS
+    with _self.lock_api_data:
+        return _cache_validate(_self).purge(max_size)
+
+def _cache_disk(_self=cmd):
+    '''
+    The process-wide DiskCache, or None if not enabled.
+    '''
     with _self.lock_api_data:
         _pymol = _self._pymol
-        _cache_validate(_self)
-        if len(_pymol._cache):
-            cur_size = sum(x[0] for x in _pymol._cache)
-            if max_size>=0: # purge to reduce size
-                now = time.time()
-                # sort by last access time
-                new_cache = [[(now-x[5])/x[4],x] for x in _pymol._cache]
-                new_cache.sort()
-                new_cache = [x[1] for x in new_cache]
-                # remove oldest entries one by one until size requirement is met
-                while (cur_size>max_size) and (len(new_cache)>1):
-                    entry = new_cache.pop()
-                    cur_size = cur_size - entry[0]
-                _pymol._cache = new_cache
-                _pymol._cache_memory = cur_size
-            else: # purge to eliminate unused entries
-                new_cache = []
-                for entry in _pymol._cache:
-                    if entry[5] == 0.0:
-                        cur_size = cur_size - entry[0]
-                    else:
-                        new_cache.append(entry)
-                _pymol._cache = new_cache
-                _pymol._cache_memory = cur_size
-        result = _pymol._cache_memory
-    return result
+        if not hasattr(_pymol, "_cache_disk"):
+            _pymol._cache_disk = DiskCache.from_environ()
+        return _pymol._cache_disk
 
 def _cache_get(target, hash_size = None, _self=cmd):
     result = None
     with _self.lock_api_data:
         try:
-            if hash_size is None:
-                hash_size = len(target[1])
-            key = target[1][0:hash_size]
-            # should optimize this with a dictionary lookup, key -> index in _cache
-            for entry in _self._pymol._cache:
-                if entry[1][0:hash_size] == key:
-                    if entry[2] == target[2]:
-                        while len(entry)<6:
-                            entry.append(0)
-                        entry[4] = entry[4] + 1 # access count
-                        entry[5] = time.time() # timestamp
-                        result = entry[3]
-                        break
+            result = _cache_validate(_self).get(target, hash_size)
         except:
             traceback.print_exc()
+    if result is None and hash_size is None:
+        disk = _cache_disk(_self)
+        if disk is not None:
+            # file I/O without holding lock_api_data
+            result = disk.get(target[2])
+            if result is not None:
+                with _self.lock_api_data:
+                    # same size accounting as PCacheSet
+                    target[0] += len(result) + sum(len(item)
+                            for item in result if isinstance(item, tuple))
+                    target[3] = result
+                    _cache_validate(_self).set(target, 0)
     return result
 
 def _cache_set(new_entry, max_size, _self=cmd):
     r = DEFAULT_SUCCESS
     with _self.lock_api_data:
-        _pymol = _self._pymol
-        _cache_validate(_self)
         try:
-            hash_size = len(new_entry[1])
-            key = new_entry[1][0:hash_size]
-            count = 0
-            found = 0
-            new_entry[4] = new_entry[4] + 1 # incr access count
-            new_entry[5] = time.time() # timestamp
-            for entry in _pymol._cache:
-                if entry[1][0:hash_size] == key:
-                    if entry[2] == new_entry[2]: # dupe (shouldn't happen)
-                        entry[3] = new_entry[3]
-                        found = 1
-                        break
-                count = count + 1
-            if not found:
-                _pymol._cache.append(new_entry)
-                _pymol._cache_memory = _pymol._cache_memory + new_entry[0]
-                if max_size > 0:
-                    if _pymol._cache_memory > max_size:
-                        _cache_purge(max_size, _self)
+            _cache_validate(_self).set(new_entry, max_size)
         except:
             traceback.print_exc()
+    disk = _cache_disk(_self)
+    if disk is not None:
+        disk.set(new_entry[2], new_entry[3])
     return r
 
+def _cache_status(_self=cmd):
+    with _self.lock_api_data:
+        status = _cache_validate(_self).get_status()
+    disk = _cache_disk(_self)
+    if disk is not None:
+        status.update(disk.get_status())
+    return status
+
 # ray tracing threads
 
 def _ray_anti_spawn(thread_info,_self=cmd):
@@ -287,6 +549,7 @@ def file_read(finfo, _self=cmd):
         if not is_string(finfo):
             handle = finfo
         elif '://' in finfo:
+            import urllib.request as urllib2
             req = urllib2.Request(finfo,
                     headers={'User-Agent': 'PyMOL/' + _self.get_version()[0]})
             handle = urllib2.urlopen(req)
@@ -297,6 +560,12 @@ def file_read(finfo, _self=cmd):
     except IOError:
         raise pymol.CmdException('failed to open file "%s"' % finfo)
 
+    return _file_decompress(contents)
+
+def _file_decompress(contents):
+    '''
+    Uncompress gzipped or bzipped contents, or return them unchanged.
+    '''
     if contents[:2] == b'\x1f\x8b': # gzip magic number
         import io, gzip
         fakestream = io.BytesIO(contents)
@@ -15,6 +15,7 @@ def get_command_keywords(self_cmd=cmd):
         'accept'        : [ self_cmd.accept            , 0 , 0 , ''  , parsing.STRICT ],
         'alias'         : [ self_cmd.alias             , 0 , 0 , ''  , parsing.LITERAL1 ], # insecure
         'align'         : [ self_cmd.align             , 0 , 0 , ''  , parsing.STRICT ],
+        'align_all'     : [ self_cmd.align_all         , 0 , 0 , ''  , parsing.STRICT ],
         'alignto'       : [ self_cmd.alignto           , 0 , 0 , ''  , parsing.STRICT ],
         'alter'         : [ self_cmd.alter             , 0 , 0 , ''  , parsing.LITERAL1 ], # insecure
         '_alt'          : [ self_cmd._alt              , 0 , 0 , ''  , parsing.STRICT ],
@@ -84,6 +85,7 @@ def get_command_keywords(self_cmd=cmd):
         'extract'       : [ self_cmd.extract           , 0 , 0 , ''  , parsing.STRICT ],
         'exec'          : [ self_cmd.python_help       , 0 , 0 , ''  , parsing.PYTHON ],
         'fab'           : [ self_cmd.fab               , 0 , 0 , ''  , parsing.STRICT ],
+        'fab_batch'     : [ self_cmd.fab_batch         , 0 , 0 , ''  , parsing.STRICT ],
         'fnab'          : [ self_cmd.fnab              , 0 , 0 , ''  , parsing.STRICT ],
         'feedback'      : [ self_cmd.feedback          , 0,  0 , ''  , parsing.STRICT ],
         'fetch'         : [ self_cmd.fetch             , 0,  0 , ''  , parsing.STRICT ],
@@ -230,6 +232,7 @@ def get_command_keywords(self_cmd=cmd):
         'rewind'        : [ self_cmd.rewind            , 0 , 0 , ''  , parsing.STRICT ],
         #      'rgbfunction'   : [ self_cmd.rgbfunction       , 0 , 0 , ''  , parsing.LEGACY ],
         'rock'          : [ self_cmd.rock              , 0 , 0 , ''  , parsing.STRICT ],
+        'rotamer_scan'  : [ self_cmd.rotamer_scan      , 0 , 0 , ''  , parsing.STRICT ],
         'rotate'        : [ self_cmd.rotate            , 0 , 0 , ''  , parsing.STRICT ],
         'run'           : [ self_cmd.run               , 0 , 0 , ',' , parsing.SECURE ], # insecure
         'rms'           : [ self_cmd.rms               , 0 , 0 , ''  , parsing.STRICT ],
@@ -17,6 +17,7 @@ cmd = sys.modules["pymol.cmd"]
 import math
 import os
 import glob
+import itertools
 import shutil
 import threading
 import time
@@ -684,6 +685,198 @@ def _watch(filename,done_event):
         if done_event.isSet():
             break
 
+def _ffmpeg_codec_args(filename, quality):
+    if filename.endswith('.webm'):
+        args_crf = ['-crf', '{:.0f}'.format(65 - (quality / 2))]
+        return ['-c:v', 'libvpx-vp9', '-b:v', '0'] + args_crf
+    return [
+        '-crf', '10' if quality > 90 else '15' if quality > 80 else '20',
+        '-pix_fmt', 'yuv420p', # needed for Mac support
+    ]
+
+# per process state of the frame rendering workers
+_render_worker = {}
+
+def _render_init(session, width, height, threads):
+    '''
+    Worker initializer: start a private PyMOL instance
+    '''
+    import pymol2
+    p = pymol2.PyMOL()
+    p.start()
+    p.cmd.feedback('disable', 'all', 'everything')
+    # the session is our own, don't lock its movie commands
+    p.cmd.set('security', 0)
+    _render_worker.update(pymol=p, session=session, width=width,
+            height=height, threads=threads, frame=None)
+
+def _render_chunk(task):
+    '''
+    Worker task: ray trace frames first..last. Writes prefix####.png (or
+    .ppm) files, or returns the raw RGBA images if prefix is None.
+    '''
+    first, last, prefix, ext, preserve = task
+    w = _render_worker
+    p = w['pymol']
+
+    # movie commands must run for all preceding frames, in order
+    if w['frame'] is None or w['frame'] >= first:
+        p.cmd.set_session(w['session'])
+        p.cmd.set('max_threads', w['threads'])
+        w['frame'] = 0
+
+    images = []
+    for frame in range(w['frame'] + 1, last + 1):
+        p.cmd.frame(frame, 1)
+        w['frame'] = frame
+        if frame < first:
+            continue
+        if prefix is None:
+            p.cmd.ray(w['width'], w['height'], quiet=1)
+            images.append(p.cmd.png(None, prior=1, quiet=1, format='rgba'))
+        else:
+            filename = '%s%04d%s' % (prefix, frame, ext)
+            if preserve and os.path.exists(filename):
+                continue
+            p.cmd.ray(w['width'], w['height'], quiet=1)
+            p.cmd.png(filename, prior=1, quiet=1)
+    return images
+
+def _render_parallel(first, last, width, height, processes, prefix=None,
+                     ext='.png', preserve=0, quiet=1, _self=cmd):
+    '''
+    Ray trace frames first..last of the current session in headless worker
+    processes, each rendering a contiguous range of frames at a time.
+
+    Writes prefix####.png (or ext) files, or with prefix=None, generates
+    the raw RGBA images in frame order.
+    '''
+    import collections
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if width < 1 or height < 1:
+        w, h = _self.get_viewport()
+        if width > 0:
+            height = width * h // w
+        elif height > 0:
+            width = height * w // h
+        else:
+            width, height = w, h
+
+    count = last - first + 1
+    if processes < 1:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, count))
+    threads = max(1, (os.cpu_count() or 1) // processes)
+
+    # small chunks for raw images, they are held in memory until written
+    chunksize = max(1, count // (processes * 4))
+    if prefix is None:
+        chunksize = min(chunksize, 4)
+    tasks = iter([(i, min(i + chunksize - 1, last), prefix, ext, preserve)
+                  for i in range(first, last + 1, chunksize)])
+
+    if not quiet:
+        print(' Ray tracing %d frames with %d processes' % (count, processes))
+
+    session = _self.get_session()
+    with ProcessPoolExecutor(processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_render_init,
+            initargs=(session, width, height, threads)) as executor:
+        pending = collections.deque(executor.submit(_render_chunk, task)
+                for task in itertools.islice(tasks, processes * 2))
+        while pending:
+            images = pending.popleft().result()
+            for task in itertools.islice(tasks, 1):
+                pending.append(executor.submit(_render_chunk, task))
+            for image in images:
+                yield image
+
+def _render_local(first, last, ray, width, height, _self=cmd):
+    '''
+    Render frames first..last in this instance, generating raw RGBA images
+    '''
+    # movie commands run for every frame, like in mpng
+    for frame in range(1, last + 1):
+        _self.frame(frame, 1)
+        if frame < first:
+            continue
+        if ray:
+            _self.ray(width, height, quiet=1)
+        else:
+            _self.draw(width, height, quiet=1)
+        yield _self.png(None, prior=1, quiet=1, format='rgba')
+
+def _stream(filename, first, last, mode, width, height, quality, quiet,
+            processes=1, _self=cmd):
+    '''
+    Render frames first..last and pipe them as raw RGBA into one ffmpeg
+    process, without temporary image files.
+    '''
+    import subprocess
+    import tempfile
+    from pymol import CmdException
+
+    # same as mpng: only the default mode (-1) checks ray_trace_frames
+    ray = mode == 2 or (mode == -1 and
+            _self.get_setting_boolean('ray_trace_frames')) or \
+            _self._pymol.invocation.options.no_gui
+    fps = get_movie_fps(_self)
+    frame_size = width * height * 4
+
+    if processes != 1:
+        images = _render_parallel(first, last, width, height, processes,
+                                  quiet=quiet, _self=_self)
+    else:
+        images = _render_local(first, last, ray, width, height, _self)
+
+    args = ['ffmpeg', '-v', 'warning',
+        '-f', 'rawvideo', '-pix_fmt', 'rgba',
+        '-s', '%dx%d' % (width, height),
+        '-framerate', '{:.3f}'.format(fps),
+        '-i', '-',
+    ]
+    if filename.endswith('.gif'):
+        args += ['-filter_complex',
+                 'split [a][b]; [a] palettegen [p]; [b][p] paletteuse']
+    else:
+        args += _ffmpeg_codec_args(filename, quality)
+
+    if not quiet:
+        print(" produce: streaming frames %d-%d to '%s'..." % (first, last,
+            filename))
+
+    # stderr to a file, a full pipe would block ffmpeg
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(args + ['-y', filename],
+                stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for (frame, image) in enumerate(images, first):
+                if len(image) != frame_size:
+                    raise CmdException('frame %d: got %d bytes, expected '
+                            '%dx%d RGBA' % (frame, len(image), width, height))
+                try:
+                    process.stdin.write(image)
+                except BrokenPipeError:
+                    break
+        finally:
+            images.close()
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            process.wait()
+            stderr.seek(0)
+            colorprinting.warning(stderr.read().strip().decode(errors='replace'))
+
+    if process.returncode != 0:
+        raise CmdException('ffmpeg failed with exit status {}'.format(
+            process.returncode))
+    if not quiet:
+        print(" produce: finished.")
+
 def _encode(filename,first,last,preserve,
             encoder,tmp_path,prefix,img_ext,quality,quiet,_self=cmd):
     import os
@@ -775,14 +968,7 @@ def _encode(filename,first,last,preserve,
                     '-framerate', '{:.3f}'.format(fps),
                     '-i', prefix + '%04d' + img_ext,
                 ]
-                if fn_rel.endswith('.webm'):
-                    args_crf = ['-crf', '{:.0f}'.format(65 - (quality / 2))]
-                    args += ['-c:v', 'libvpx-vp9', '-b:v', '0'] + args_crf
-                else:
-                    args += [
-                    '-crf', '10' if quality > 90 else '15' if quality > 80 else '20',
-                    '-pix_fmt', 'yuv420p', # needed for Mac support
-                    ]
+                args += _ffmpeg_codec_args(fn_rel, quality)
                 process = subprocess.Popen(args + [fn_rel], stderr=subprocess.PIPE)
             stderr = process.communicate()[1]
             colorprinting.warning(stderr.strip().decode(errors='replace'))
@@ -845,7 +1031,7 @@ def find_exe(exe):
 
 def produce(filename, mode='', first=0, last=0, preserve=0,
             encoder='', quality=-1, quiet=1,
-            width=0, height=0, _self=cmd):
+            width=0, height=0, stream=0, processes=1, _self=cmd):
     '''
 DESCRIPTION
 
@@ -874,10 +1060,18 @@ ARGUMENTS
 
     height = int: Height in pixels {default: from viewport}
 
+    stream = 0/1: with ffmpeg, pipe the rendered frames as raw images
+    directly into the encoder instead of writing temporary PNG files
+    {default: 0}
+
+    processes = int: number of headless worker processes which ray trace
+    the frames from a copy of the session, 0 for one per CPU {default: 1}
+
 EXAMPLE
 
     movie.produce video.mp4, height=1080
     movie.produce video.webm, height=720
+    movie.produce video.mp4, ray, height=2160, stream=1, processes=16
     '''
     from pymol import CmdException
 
@@ -909,6 +1103,8 @@ EXAMPLE
         splitext=(splitext[0],'.mpg')
     filename = splitext[0]+splitext[1]
     width, height = int(width), int(height)
+    stream = int(stream)
+    processes = int(processes)
     img_ext = '.png'
 
     # guess encoder
@@ -932,11 +1128,14 @@ EXAMPLE
     elif not has_exe(encoder):
         raise CmdException('encoder "%s" not available' % (encoder))
 
+    if stream and encoder != 'ffmpeg':
+        raise CmdException('stream=1 requires the "ffmpeg" encoder')
+
     if img_ext == '.png':
         _self.set('opaque_background', quiet=quiet)
 
-    # MP4 needs dimensions divisible by 2
-    if splitext[1] in ('.mp4', '.mov', '.webm'):
+    # MP4 needs dimensions divisible by 2, raw frames need the size upfront
+    if splitext[1] in ('.mp4', '.mov', '.webm') or stream:
         if width < 1 or height < 1:
             w, h = _self.get_viewport()
             if width > 0:
@@ -945,14 +1144,27 @@ EXAMPLE
                 width = height * w / h
             else:
                 width, height = w, h
-        if width % 2:
-            width -= 1
-        if height % 2:
-            height -= 1
+        width, height = int(width), int(height)
+        if splitext[1] in ('.mp4', '.mov', '.webm'):
+            if width % 2:
+                width -= 1
+            if height % 2:
+                height -= 1
 
     # clean up old files if necessary
     if os.path.exists(filename):
         os.unlink(filename)
+
+    if stream:
+        if first <= 0:
+            first = 1
+        if last <= 0:
+            last = _self.count_frames()
+        if last <= 1:
+            last = 1
+        _stream(filename, first, last, mode, width, height, quality, quiet,
+                processes, _self)
+        return _self.DEFAULT_SUCCESS
     if not os.path.exists(tmp_path):
         os.mkdir(tmp_path)
     elif preserve==0:
@@ -971,7 +1183,7 @@ EXAMPLE
         _self.set("keep_alive")
         _self.mpng(os.path.join(tmp_path,prefix + img_ext),first,last,
                    preserve,mode=mode,modal=-1,quiet=quiet,
-                   width=width, height=height)
+                   width=width, height=height, processes=processes)
         # this may run asynchronously
     else:
         ok = 0
@@ -365,7 +365,7 @@ SEE ALSO
 
     def mpng(prefix,first=0,last=0,preserve=0,modal=0,
              mode=-1, quiet=1,
-             width=0, height=0,
+             width=0, height=0, processes=1,
              _self=cmd):
         '''
 DESCRIPTION
@@ -396,6 +396,10 @@ ARGUMENTS
     width = int: width in pixels {default: current viewport}
 
     height = int: height in pixels {default: current viewport}
+
+    processes = int: ray trace the frames in this many headless worker
+    processes (0 for one per CPU), each with a copy of the current
+    session {default: 1, render in this instance}
     
 NOTES
 
@@ -425,6 +429,18 @@ SEE ALSO
         MODE_RAY = 2
         mode = int(mode)
         assert mode in (MODE_DEFAULT, 0, 1, MODE_RAY)
+        if int(processes) != 1:
+            from pymol import movie
+            first, last = max(1, int(first)), int(last)
+            if last < 1:
+                last = max(1, _self.count_frames())
+            ext = '.ppm' if re.search(r"[0-9]*\.ppm$", prefix) else '.png'
+            prefix = _self.exp_path(re.sub(r"[0-9]*\.(png|ppm)$", "", prefix))
+            for _ in movie._render_parallel(first, last, int(width),
+                    int(height), int(processes), prefix, ext, int(preserve),
+                    int(quiet), _self=_self):
+                pass
+            return DEFAULT_SUCCESS
         func = lambda: _self._mpng(prefix, int(first) - 1, int(last) - 1,
                 int(preserve), int(modal), -1, int(mode), int(quiet),
                 int(width), int(height))
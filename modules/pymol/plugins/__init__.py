@@ -18,9 +18,14 @@ from .legacysupport import *
 
 PYMOLPLUGINSRC = os.path.expanduser('~/.pymolpluginsrc.py')
 
+# cached directory listings, metadata and registered commands/menu items
+PLUGINMANIFEST = os.path.join(os.path.expanduser('~'), '.pymol', 'cache',
+                              'plugins.json')
+
 preferences = {
     'verbose': False,
     'instantsave': True,
+    'deferred': True,
 }
 
 autoload = {}
@@ -29,6 +34,14 @@ plugins = {}
 
 HAVE_QT = False
 
+_manifest = None
+_manifest_version = 2
+_manifest_changed = False
+
+# PluginInfo instance which is currently loading (records registrations)
+_loading = None
+_in_addmenuitem = False
+
 # exception types
 
 class QtNotAvailableError(Exception):
@@ -113,20 +126,31 @@ def addmenuitem(label, command=None, menuName='Plugin'):
     '''
     Generic replacement for MegaWidgets menu item adding
     '''
+    global _in_addmenuitem
+
+    if _loading is not None and _loading._record_menuitem(label, command,
+                                                          menuName):
+        # already in the menu as a stub (deferred plugin)
+        return
+
     labels1 = [menuName] + label.split('|')
     labels2 = ['|'.join(labels1[0:i]) for i in range(1, len(labels1))]
     pmgapp = get_pmgapp()
     if pmgapp is not None:
-        for i in range(1, len(labels2)):
-            try:
-                pmgapp.menuBar.addcascademenu(labels2[i-1], labels2[i], label=labels1[i])
-            except ValueError:
-                pass
-        if labels1[-1] == '-':
-            pmgapp.menuBar.addmenuitem(labels2[-1], 'separator')
-        else:
-            pmgapp.menuBar.addmenuitem(labels2[-1], 'command', label=labels1[-1],
-                    command=command)
+        _in_addmenuitem = True
+        try:
+            for i in range(1, len(labels2)):
+                try:
+                    pmgapp.menuBar.addcascademenu(labels2[i-1], labels2[i], label=labels1[i])
+                except ValueError:
+                    pass
+            if labels1[-1] == '-':
+                pmgapp.menuBar.addmenuitem(labels2[-1], 'separator')
+            else:
+                pmgapp.menuBar.addmenuitem(labels2[-1], 'command', label=labels1[-1],
+                        command=command)
+        finally:
+            _in_addmenuitem = False
 
 def plugin_load(name, quiet=1):
     '''
@@ -162,6 +186,13 @@ class PluginInfo(object):
         # set on loading
         self.loadtime = None
         self.commands = []
+        self.menuitems = []
+
+        # set by defer()
+        self.deferred = False
+        self._deferred_pmgapp = None
+        self._menu_commands = {}
+        self._auto_arg = []
 
         # register
         if not self.is_temporary:
@@ -195,18 +226,25 @@ class PluginInfo(object):
         '''
         Parse plugin file for metadata (hash-commented block at beginning of file).
         '''
-        metadata = dict()
-        f = open(self.filename, 'rb')
-        for line in f:
-            line = line.decode('utf-8', errors='replace')
-            if line.strip() == '':
-                continue
-            if not line.startswith('#'):
-                break
-            if ':' in line:
-                key, value = line[1:].split(':', 1)
-                metadata[key.strip()] = value.strip()
-        f.close()
+        entry = None if self.is_temporary else manifest_entry(self.filename)
+        if entry and 'metadata' in entry:
+            metadata = entry['metadata']
+        else:
+            metadata = dict()
+            f = open(self.filename, 'rb')
+            for line in f:
+                line = line.decode('utf-8', errors='replace')
+                if line.strip() == '':
+                    continue
+                if not line.startswith('#'):
+                    break
+                if ':' in line:
+                    key, value = line[1:].split(':', 1)
+                    metadata[key.strip()] = value.strip()
+            f.close()
+            if entry is not None:
+                entry['metadata'] = metadata
+                set_manifest_changed()
         self.get_metadata = lambda: metadata
         return metadata
 
@@ -262,6 +300,11 @@ class PluginInfo(object):
 
         verbose = pref_get('verbose', False)
 
+        global _loading
+        loading_orig = _loading
+        menubar_calls = [0]
+        effects = _record_side_effects(self)
+
         try:
             # overload cmd.extend to register commands
             extend_orig = cmd.extend
@@ -270,19 +313,32 @@ class PluginInfo(object):
                 return extend_orig(a, b)
             cmd.extend = extend_overload
 
-            # do not use self.loaded here
-            if force and self.module is not None:
-                from importlib import reload
-                reload(self.module)
-            else:
-                __import__(self.mod_name, level=0)
+            # record commands and menu items for deferred loading
+            self.commands = []
+            self.menuitems = []
+            _loading = self
 
-            if pmgapp != -1:
-                self.legacyinit(pmgapp)
+            with effects:
+                # do not use self.loaded here
+                if force and self.module is not None:
+                    from importlib import reload
+                    reload(self.module)
+                else:
+                    __import__(self.mod_name, level=0)
 
-            cmd.extend = extend_orig
+                if pmgapp != -1:
+                    with _count_menubar_calls(pmgapp, menubar_calls):
+                        self.legacyinit(pmgapp)
 
             self.loadtime = time.time() - starttime
+            self.deferred = False
+
+            # menu items which bypass addmenuitem and other side effects
+            # (key bindings, settings, ...) can't be stubbed
+            self._record_registrations(pmgapp != -1,
+                    menubar_calls[0] == 0 and not effects.count,
+                    effects.auto_arg)
+
             if verbose and pymol.invocation.options.show_splash:
                 print(' Plugin "%s" loaded in %.2f seconds' % (self.name, self.loadtime))
         except QtNotAvailableError:
@@ -297,9 +353,151 @@ class PluginInfo(object):
                 colorprinting.error(e)
             colorprinting.warning("Unable to initialize plugin '%s' (%s)." % (self.name, self.mod_name))
             return False
+        finally:
+            cmd.extend = extend_orig
+            _loading = loading_orig
 
         return True
 
+    def _record_registrations(self, gui, deferrable, auto_arg):
+        '''
+        Store the commands (with their arguments), auto completions and
+        menu items of the loaded plugin in the manifest, so they can be
+        registered as stubs next time.
+        '''
+        entry = manifest_entry(self.filename)
+        signatures = {}
+        for name in self.commands:
+            params = _parameters(cmd.keyword.get(name, [None])[0])
+            if params is None:
+                deferrable = False
+            else:
+                signatures[name] = params
+        registered = {
+            'gui': gui,
+            'deferrable': deferrable,
+            'commands': self.commands,
+            'signatures': signatures,
+            'auto_arg': auto_arg,
+            'menuitems': self.menuitems,
+        }
+        if entry.get('registered') != registered:
+            entry['registered'] = registered
+            set_manifest_changed()
+            manifest_save()
+
+    def _record_menuitem(self, label, command, menuName):
+        '''
+        Record a menu item added while loading. Returns True if the item
+        is already in the menu as a stub.
+        '''
+        item = [label, menuName]
+        key = (label, menuName, self.menuitems.count(item))
+        self.menuitems.append(item)
+        if key not in self._menu_commands:
+            return False
+        self._menu_commands[key] = command
+        return True
+
+    def defer(self, pmgapp=-1):
+        '''
+        Register the commands and menu items which the plugin registered
+        the last time it was loaded (from the manifest) as stubs, and load
+        the plugin on first use.
+
+        Returns False if this is not possible (plugin changed or never
+        loaded, registers nothing, has other side effects like key
+        bindings or settings, uses the menu bar directly, "deferred"
+        preference disabled, or "Deferred-Load: no" in the metadata).
+        '''
+        if self.is_temporary or self.loaded or not pref_get('deferred', True):
+            return False
+
+        entry = manifest_entry(self.filename)
+        registered = entry.get('registered')
+        if (not registered or not registered['deferrable'] or
+                registered['gui'] != (pmgapp != -1)):
+            return False
+
+        commands = registered['commands']
+        menuitems = registered['menuitems']
+        if not (commands or menuitems):
+            return False
+        if not HAVE_QT and any(m == 'PluginQt' for (_, m) in menuitems):
+            return False
+        if self.get_metadata().get('Deferred-Load', 'yes').lower() == 'no':
+            return False
+
+        auto_arg = registered['auto_arg']
+        for (i, name, source) in auto_arg:
+            if i >= len(cmd.auto_arg) or source not in cmd.auto_arg[i]:
+                return False
+
+        try:
+            stubs = [self._command_stub(name, registered['signatures'][name])
+                     for name in commands]
+        except (KeyError, ValueError, TypeError, SyntaxError):
+            return False
+
+        self.deferred = True
+        self._deferred_pmgapp = pmgapp
+
+        for stub in stubs:
+            cmd.extend(stub.__name__, stub)
+
+        self._auto_arg = auto_arg
+        for (i, name, source) in auto_arg:
+            cmd.auto_arg[i][name] = cmd.auto_arg[i][source]
+
+        self._menu_commands = {}
+        counts = {}
+        for (label, menuName) in menuitems:
+            key = (label, menuName, counts.setdefault((label, menuName), 0))
+            counts[(label, menuName)] += 1
+            self._menu_commands[key] = None
+            addmenuitem(label, self._menu_stub(key), menuName)
+
+        return True
+
+    def _activate(self):
+        if not self.loaded and not self.load(self._deferred_pmgapp):
+            raise pymol.CmdException('loading plugin "%s" failed' % self.name)
+
+    def _command_stub(self, name, params):
+        '''
+        Command which loads the plugin and forwards the call. Mirrors the
+        arguments of the plugin's command for the parser (usage with "?",
+        argument checking, quiet=0).
+        '''
+        import inspect
+        signature = _signature_function(params)
+
+        def stub(*args, **kwargs):
+            self._activate()
+            func = cmd.keyword[name][0]
+            if func is stub:
+                raise pymol.CmdException('plugin "%s" did not register '
+                                         'command "%s"' % (self.name, name))
+            if '_self' in kwargs and not _accepts_self(func):
+                del kwargs['_self']
+            return func(*args, **kwargs)
+
+        stub.__name__ = name
+        stub.__wrapped__ = signature
+        stub.__signature__ = inspect.signature(signature)
+        stub.__doc__ = '''
+    Command from plugin "%s", which is loaded on first use.
+''' % (self.name)
+        return stub
+
+    def _menu_stub(self, key):
+        def stub():
+            self._activate()
+            command = self._menu_commands.get(key)
+            if command is not None:
+                return command()
+        return stub
+
     def legacyinit(self, pmgapp):
         '''
         Call the __init__ or __init_plugin__ function which takes the PMGApp
@@ -363,43 +561,275 @@ class PluginInfo(object):
         showinfo('Info', 'Plugin "%s" successfully removed. Please restart PyMOL.' % (self.name), parent=parent)
         return True
 
+def _parameters(func):
+    '''
+    Arguments of a command as JSON compatible [name, kind(, default)]
+    lists, or None if a default value can't be stored as a literal.
+    '''
+    import inspect
+    import math
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    result = []
+    for p in params:
+        item = [p.name, int(p.kind)]
+        if p.default is not p.empty:
+            if not (p.default is None or type(p.default) in (bool, int, str) or
+                    type(p.default) is float and math.isfinite(p.default)):
+                return None
+            item.append(p.default)
+        result.append(item)
+    return result
+
+def _signature_function(params):
+    '''
+    Function with the given arguments (see _parameters) and no body, for
+    argument parsing of a command stub.
+    '''
+    import inspect
+    sig = inspect.Signature([
+        inspect.Parameter(p[0], p[1], default=p[2] if len(p) > 2 else
+                          inspect.Parameter.empty) for p in params])
+    namespace = {}
+    exec('def signature%s: pass' % (sig,), namespace)
+    return namespace['signature']
+
+def _accepts_self(func):
+    import inspect
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return True
+    return any(p.name == '_self' or p.kind == p.VAR_KEYWORD for p in params)
+
+class _count_menubar_calls(object):
+    '''
+    Context manager which counts menuBar.addmenuitem calls that don't go
+    through addmenuitem()
+    '''
+    def __init__(self, pmgapp, counter):
+        self.menuBar = getattr(pmgapp, 'menuBar', None)
+        self.counter = counter
+
+    def __enter__(self):
+        if self.menuBar is None:
+            return
+        addmenuitem_orig = self.menuBar.addmenuitem
+        def addmenuitem_overload(*args, **kwargs):
+            if not _in_addmenuitem:
+                self.counter[0] += 1
+            return addmenuitem_orig(*args, **kwargs)
+        try:
+            self.overridden = vars(self.menuBar).get('addmenuitem')
+            self.menuBar.addmenuitem = addmenuitem_overload
+        except (AttributeError, TypeError):
+            # can't tell, don't defer
+            self.menuBar = None
+            self.counter[0] += 1
+
+    def __exit__(self, *exc):
+        if self.menuBar is None:
+            return
+        if self.overridden is not None:
+            self.menuBar.addmenuitem = self.overridden
+        else:
+            del self.menuBar.addmenuitem
+
+class _record_side_effects(object):
+    '''
+    Context manager which records auto completions added while loading a
+    plugin, and counts side effects which a deferred plugin could not
+    reproduce (key bindings, settings, aliases, file formats, commands not
+    registered with cmd.extend, replaced cmd attributes).
+
+    Only auto completions which reuse an existing one (e.g.
+    cmd.auto_arg[0]['zoom']) are recorded as [index, name, source] lists,
+    anything else counts as a side effect.
+    '''
+    _counted = ('set', 'unset', 'set_bond', 'unset_bond', 'unset_deep',
+                'set_key', 'alias', 'set_color')
+
+    def __init__(self, info):
+        self.info = info
+        self.auto_arg = []
+        self.count = 0
+
+    def _state(self):
+        from pymol import importing
+        return (set(cmd.keyword), dict(cmd.key_mappings),
+                dict(importing.loadfunctions),
+                dict((k, id(v)) for (k, v) in vars(cmd).items()))
+
+    def __enter__(self):
+        self.auto_arg_orig = [dict(d) for d in cmd.auto_arg]
+        # stubs from defer() don't count as present before loading
+        for (i, name, _) in self.info._auto_arg:
+            self.auto_arg_orig[i].pop(name, None)
+        self.state = self._state()
+        self.overridden = {}
+        for name in self._counted:
+            func = getattr(cmd, name, None)
+            if func is not None:
+                self.overridden[name] = func
+                setattr(cmd, name, self._counting(func))
+
+    def _counting(self, func):
+        def wrapper(*args, **kwargs):
+            self.count += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def __exit__(self, *exc):
+        for (name, func) in self.overridden.items():
+            setattr(cmd, name, func)
+
+        (keyword, *state) = self._state()
+        (keyword_orig, *state_orig) = self.state
+        if state != state_orig:
+            self.count += 1
+        if not keyword.issubset(keyword_orig.union(self.info.commands)):
+            self.count += 1
+
+        for (i, d) in enumerate(cmd.auto_arg):
+            orig = self.auto_arg_orig[i] if i < len(self.auto_arg_orig) else {}
+            for (name, value) in d.items():
+                if orig.get(name) is value:
+                    continue
+                sources = [k for (k, v) in orig.items() if v is value]
+                if sources:
+                    self.auto_arg.append([i, name, sources[0]])
+                else:
+                    self.count += 1
+        for (i, orig) in enumerate(self.auto_arg_orig):
+            if i >= len(cmd.auto_arg) or not set(orig).issubset(cmd.auto_arg[i]):
+                self.count += 1
+
+# plugin manifest
+
+def get_manifest():
+    '''
+    The plugin manifest, read from PLUGINMANIFEST on first use.
+    '''
+    global _manifest
+    if _manifest is None:
+        import json
+        _manifest = {'version': _manifest_version, 'paths': {}, 'plugins': {}}
+        try:
+            with open(PLUGINMANIFEST) as handle:
+                data = json.load(handle)
+            if data.get('version') == _manifest_version:
+                _manifest = data
+        except (IOError, ValueError, AttributeError):
+            pass
+    return _manifest
+
+def set_manifest_changed():
+    global _manifest_changed
+    _manifest_changed = True
+
+def manifest_entry(filename):
+    '''
+    Manifest entry (dict) of a plugin file. Gets reset if the file size or
+    modification time changed.
+    '''
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return {}
+    stat = [st.st_size, st.st_mtime_ns]
+    entries = get_manifest()['plugins']
+    entry = entries.get(filename)
+    if entry is None or entry.get('stat') != stat:
+        entry = entries[filename] = {'stat': stat}
+        set_manifest_changed()
+    return entry
+
+def manifest_save():
+    '''
+    Write the manifest if it has changed.
+    '''
+    global _manifest_changed
+    if not _manifest_changed:
+        return
+    import json
+    tmp = '%s.%d.tmp' % (PLUGINMANIFEST, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(PLUGINMANIFEST), exist_ok=True)
+        with open(tmp, 'w') as handle:
+            json.dump(get_manifest(), handle)
+        # atomic, concurrent PyMOL sessions may write at the same time
+        os.replace(tmp, PLUGINMANIFEST)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if pref_get('verbose', False):
+            print(' Plugin-Error: Cannot write plugin manifest to', PLUGINMANIFEST)
+    _manifest_changed = False
+
+def _listPlugins(path):
+    '''
+    List (name, filename) plugin candidates in a directory.
+    '''
+    found = []
+
+    for filename in sorted(os.listdir(path)):
+        # ignore names that start with dot or underscore
+        if filename[0] in ['.', '_']:
+            continue
+
+        if '.' in filename:
+            name, _, ext = filename.partition('.')
+            if ext == 'py':
+                found.append([name, os.path.join(path, filename)])
+        else:
+            name, filename = filename, os.path.join(path, filename, '__init__.py')
+            if os.path.exists(filename):
+                found.append([name, filename])
+
+    return found
+
 def findPlugins(paths):
     '''
     Find all python modules (extension .py and directories with __init__.py)
     inside a list of directories.
 
+    Directory listings are cached in the manifest and only repeated if the
+    modification time of a directory changed.
+
     Returns a dictionary with names to filenames mapping.
     '''
+    import stat
     import time
     start = time.time()
 
     verbose = pref_get('verbose', False)
 
     modules = dict()
+    listings = get_manifest()['paths']
 
     for path in paths:
-        if not os.path.isdir(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if not stat.S_ISDIR(st.st_mode):
             continue
 
-        for filename in os.listdir(path):
-            # ignore names that start with dot or underscore
-            if filename[0] in ['.', '_']:
-                continue
-
-            if '.' in filename:
-                name, _, ext = filename.partition('.')
-                if ext == 'py':
-                    if name not in modules:
-                        modules[name] = os.path.join(path, filename)
-                    elif verbose:
-                        print(' warning: multiple plugins named', name)
-            else:
-                name, filename = filename, os.path.join(path, filename, '__init__.py')
-                if os.path.exists(filename):
-                    if name not in modules:
-                        modules[name] = filename
-                    elif verbose:
-                        print(' warning: multiple plugins named', name)
+        listing = listings.get(path)
+        if listing is None or listing['mtime'] != st.st_mtime_ns:
+            listing = listings[path] = {
+                'mtime': st.st_mtime_ns,
+                'modules': _listPlugins(path),
+            }
+            set_manifest_changed()
+
+        for (name, filename) in listing['modules']:
+            if name not in modules:
+                modules[name] = filename
+            elif verbose:
+                print(' warning: multiple plugins named', name)
 
     if verbose:
         print(' Scanning for modules took %.4f seconds' % (time.time() - start))
@@ -421,15 +851,25 @@ def initialize(pmgapp=-1):
             colorprinting.warning(str(e))
 
     autoload = (pmgapp != -2)
+    filenames = set()
     for parent in [startup]:
         modules = findPlugins(parent.__path__)
 
         for name, filename in modules.items():
             mod_name = parent.__name__ + '.' + name
             info = PluginInfo(name, filename, mod_name)
-            if autoload and info.autoload:
+            filenames.add(filename)
+            if autoload and info.autoload and not info.defer(pmgapp):
                 info.load(pmgapp)
 
+    # forget about removed plugins
+    entries = get_manifest()['plugins']
+    for filename in set(entries).difference(filenames):
+        del entries[filename]
+        set_manifest_changed()
+
+    manifest_save()
+
 # pymol commands
 cmd.extend('plugin_load', plugin_load)
 cmd.extend('plugin_pref_save', pref_save)
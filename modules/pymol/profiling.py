@@ -0,0 +1,138 @@
+#A* -------------------------------------------------------------------
+#B* This file contains source code for the PyMOL computer program
+#C* Copyright (c) Schrodinger, LLC.
+#D* -------------------------------------------------------------------
+#E* It is unlawful to modify or remove this copyright notice.
+#F* -------------------------------------------------------------------
+#G* Please see the accompanying LICENSE file for further information.
+#H* -------------------------------------------------------------------
+#I* Additional authors of this source file include:
+#-*
+#-*
+#-*
+#Z* -------------------------------------------------------------------
+
+'''
+Startup time report
+
+Set the PYMOL_STARTUP_REPORT environment variable to get a breakdown of
+the PyMOL startup time (phases and Python module imports) on stderr,
+printed when startup (including files and scripts given on the command
+line) has finished:
+
+    PYMOL_STARTUP_REPORT=1 pymol -cq
+
+With PYMOL_STARTUP_REPORT=<n>, the <n> slowest imports are listed
+{default: 20}.
+'''
+
+import sys
+import time
+
+_t0 = time.perf_counter()
+_marks = []
+_imports = {}
+_stack = []
+_reported = False
+
+enabled = False
+
+
+class _TimedLoader:
+    '''
+    Loader wrapper which records the module execution time
+    '''
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        name = module.__name__
+        _stack.append(0.0)
+        t = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - t
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += total
+            _imports[name] = (total - children, total)
+
+
+class _TimingFinder:
+    '''
+    Meta path finder which wraps the loaders of all other finders
+    '''
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and \
+                        hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+def start():
+    '''
+    Start recording imports (called from pymol/__init__.py)
+    '''
+    global enabled
+    if not enabled:
+        enabled = True
+        sys.meta_path.insert(0, _TimingFinder())
+
+
+def mark(label):
+    '''
+    End the current startup phase, which gets the given label
+    '''
+    if enabled:
+        _marks.append((label, time.perf_counter()))
+
+
+def report(file=None):
+    '''
+    Print the startup time report (once)
+    '''
+    global _reported
+    if not enabled or _reported:
+        return
+    _reported = True
+
+    import os
+    try:
+        count = int(os.environ.get('PYMOL_STARTUP_REPORT', ''))
+    except ValueError:
+        count = 20
+
+    if file is None:
+        file = sys.stderr
+
+    now = time.perf_counter()
+    print(' Startup time report', file=file)
+    print('   %8s  %s' % ('ms', 'phase'), file=file)
+    last = _t0
+    for (label, t) in _marks:
+        print('   %8.1f  %s' % ((t - last) * 1e3, label), file=file)
+        last = t
+    print('   %8.1f  total' % ((now - _t0) * 1e3), file=file)
+
+    total = sum(v[0] for v in _imports.values())
+    print('   %8s  %8s  %s (%d modules, %.1f ms)' % ('self ms', 'cum ms',
+        'import', len(_imports), total * 1e3), file=file)
+    items = sorted(_imports.items(), key=lambda item: -item[1][0])
+    for (name, (own, cumulative)) in items[:max(0, count)]:
+        print('   %8.1f  %8.1f  %s' % (own * 1e3, cumulative * 1e3, name),
+              file=file)
@@ -20,10 +20,42 @@ PROPERTY_COLOR = 5
 PROPERTY_STRING = 6
 
 if True:
+    import re
+    import pymol
     cmd = __import__("sys").modules["pymol.cmd"]
+    from . import selector
     from .cmd import _cmd, DEFAULT_ERROR, DEFAULT_SUCCESS, QuietException
     from .querying import get_color_index_from_string_or_list
 
+    # column types for get_properties, other names (e.g. "p.foo") get the
+    # type which NumPy infers from the values
+    _atom_property_dtypes = {
+        'model': str, 'name': str, 'resn': str, 'resi': str, 'chain': str,
+        'segi': str, 'elem': str, 'alt': str, 'ss': str, 'type': str,
+        'text_type': str, 'custom': str, 'label': str, 'oneletter': str,
+        'resv': int, 'index': int, 'ID': int, 'rank': int, 'color': int,
+        'flags': int, 'cartoon': int, 'formal_charge': int, 'state': int,
+        'b': float, 'q': float, 'vdw': float, 'partial_charge': float,
+        'elec_radius': float,
+    }
+
+    # names which map to columns of the cmd.get_coords array
+    _coord_properties = {'x': 0, 'y': 1, 'z': 2, 'coord': None}
+
+    _property_name_re = re.compile(r'[A-Za-z_]\w*(\.[A-Za-z_]\w*)?$')
+
+    def _property_names(names):
+        '''
+        List of names from a comma or space separated string or a sequence
+        '''
+        if isinstance(names, str):
+            names = names.replace(',', ' ').split()
+        names = list(names)
+        for name in names:
+            if not _property_name_re.match(name):
+                raise pymol.CmdException('invalid property name: ' + repr(name))
+        return names
+
     def _typecast(value, proptype, _self=cmd):
         if proptype == PROPERTY_FLOAT:
             return float(value)
@@ -215,3 +247,169 @@ SEE ALSO
         with _self.lockcm:
             r = _self._cmd.set_atom_property(_self._COb, name, value, selection, proptype, state, quiet)
         return r
+
+    def get_properties(selection='all', properties='b', state=1, quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    API only. Get atomic properties of a selection as NumPy arrays, one
+    column per property, in the atom order of "iterate".
+
+    Coordinates (x, y, z, coord) are copied in bulk without any Python
+    evaluation. All other properties are still collected with "iterate",
+    with a single expression evaluation per atom for all of them. This
+    saves one pass per property, but not the per-atom lookup of each
+    property, so for non-coordinate properties expect only a modest
+    speedup over one "iterate" per property.
+
+ARGUMENTS
+
+    selection = str: atom selection {default: all}
+
+    properties = str or list: property names as in "iterate" (e.g. "b",
+    "resv", "p.foo") or "x", "y", "z", "coord" (Nx3 array). A single name
+    returns an array, a list or comma separated string returns a dict of
+    arrays {default: b}
+
+    state = int: state index, -1 for current state, or 0 for all atoms,
+    independent of coordinates (no coordinate properties) {default: 1}
+
+EXAMPLE
+
+    >>> props = cmd.get_properties('polymer', ['resv', 'b', 'coord'])
+    >>> props['b'][props['resv'] > 100].mean()
+
+SEE ALSO
+
+    set_properties, iterate, iterate_state, get_coords
+        '''
+        import numpy
+
+        single = isinstance(properties, str) and \
+                not any(c in properties for c in ', ')
+        names = _property_names(properties)
+        state = int(state)
+        selection = selector.process(selection)
+
+        coord_names = [n for n in names if n in _coord_properties]
+        expr_names = [n for n in names if n not in _coord_properties]
+
+        if coord_names and state == 0:
+            raise pymol.CmdException('coordinates need a state')
+
+        rows = []
+        with _self.lockcm:
+            if coord_names:
+                coords = _self.get_coords(selection, state)
+                if coords is None:
+                    coords = numpy.zeros((0, 3))
+            if expr_names:
+                expression = '_append((' + ','.join(expr_names) + ',))'
+                space = {'_append': rows.append}
+                if state == 0:
+                    _self.iterate(selection, expression, space=space)
+                else:
+                    _self.iterate_state(state, selection, expression,
+                                        space=space)
+
+        columns = {}
+        for (name, values) in zip(expr_names, zip(*rows) if rows else
+                                  [()] * len(expr_names)):
+            columns[name] = numpy.array(values,
+                                        _atom_property_dtypes.get(name))
+        for name in coord_names:
+            i = _coord_properties[name]
+            columns[name] = coords if i is None else \
+                    numpy.ascontiguousarray(coords[:, i])
+
+        if not int(quiet) and columns:
+            count = len(next(iter(columns.values())))
+            print(' get_properties: %d atoms' % count)
+
+        if single:
+            return columns[names[0]]
+        return dict((name, columns[name]) for name in names)
+
+    def set_properties(selection, values, state=1, quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    API only. Set atomic properties of a selection from whole columns
+    (arrays or sequences with one value per atom, in the atom order of
+    "iterate", or scalars which are set for all atoms).
+
+    Coordinates (x, y, z, coord) are set in bulk with "load_coords". All
+    other properties are still assigned by "alter", with a single pass
+    and one expression evaluation per atom for all of them.
+
+ARGUMENTS
+
+    selection = str: atom selection
+
+    values = dict: property name -> values, names as in "alter" or "x",
+    "y", "z", "coord" (Nx3 array)
+
+    state = int: state index for coordinates, -1 for current state
+    {default: 1}
+
+EXAMPLE
+
+    >>> props = cmd.get_properties('name CA', ['resv', 'b'])
+    >>> cmd.set_properties('name CA', {'b': scores[props['resv']]})
+    >>> cmd.spectrum('b', selection='name CA')
+
+SEE ALSO
+
+    get_properties, alter, alter_state, load_coords
+        '''
+        import numpy
+
+        values = dict(values)
+        _property_names(values)
+        selection = selector.process(selection)
+        state = int(state)
+
+        coord_values = dict((name, values.pop(name))
+                            for name in list(values)
+                            if name in _coord_properties)
+
+        def broadcast(name, value, shape):
+            try:
+                return numpy.broadcast_to(value, shape)
+            except ValueError:
+                raise pymol.CmdException('%s: expected %d values, got '
+                        'shape %s' % (name, shape[0], numpy.shape(value)))
+
+        with _self.lockcm:
+            count = 0
+
+            if coord_values:
+                if state == 0:
+                    raise pymol.CmdException('coordinates need a state')
+                coords = _self.get_coords(selection, state)
+                if coords is None:
+                    raise pymol.CmdException('no coordinates for selection')
+                count = len(coords)
+                for (name, value) in coord_values.items():
+                    i = _coord_properties[name]
+                    if i is None:
+                        coords[:] = broadcast(name, value, coords.shape)
+                    else:
+                        coords[:, i] = broadcast(name, value, (count,))
+                _self.load_coords(coords, selection, state)
+
+            if values:
+                count = _self.count_atoms(selection)
+                space = {}
+                assignments = []
+                for (i, (name, value)) in enumerate(values.items()):
+                    column = broadcast(name, numpy.asarray(value), (count,))
+                    space['_v%d' % i] = iter(column.tolist()).__next__
+                    assignments.append('%s = _v%d()' % (name, i))
+                _self.alter(selection, '; '.join(assignments),
+                            space=space)
+
+        if not int(quiet):
+            print(' set_properties: modified %d atoms' % count)
+
+        return count
@@ -17,6 +17,7 @@ import traceback
 import json
 import io as StringIO
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
 from urllib import parse
 from urllib.request import urlopen
 
@@ -32,17 +33,60 @@ from urllib.request import urlopen
 
 _json_mime_types = [ 'text/json', 'application/json' ]
 
-class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
+_binary_mime_type = 'application/octet-stream'
+
+# size of the chunks when streaming binary results
+_stream_chunk_size = 1 << 16
+
+# API functions which wait for the GUI thread (OpenGL context) or for the
+# GUI lock. /batch holds the API lock for the whole batch, and the GUI
+# thread may be waiting for it, so these are rejected in a batch.
+_batch_gui_methods = ('png', 'draw', 'ray', 'mpng', 'scene', 'copy_image',
+                      'refresh')
+
+def _json_default(obj):
+    """
+    JSON encoding fallback for NumPy arrays and scalars
+    """
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError('%s is not JSON serializable' % type(obj).__name__)
 
-    # for now, we're using a single-threaded server
+class _PymolHTTPServer(HTTPServer):
+    # single-threaded, one request (and connection) at a time
+    pass
+
+class _PymolThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    # one thread per connection
+    daemon_threads = True
+
+class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
 
     # our actual HTTP server class is private for the time being
     # if we need to, then we'll change this
 
+    # set while a response body is sent with chunked transfer encoding
+    _chunked = False
+
     def wfile_write(self, s):
         if not isinstance(s, bytes):
             s = s.encode('utf-8')
-        self.wfile.write(s)
+        if self._chunked:
+            if not s:
+                return # empty chunk would terminate the body
+            self.wfile.write(b'%x\r\n' % len(s))
+            self.wfile.write(s)
+            self.wfile.write(b'\r\n')
+        else:
+            self.wfile.write(s)
+
+    def end_body(self):
+        """
+        terminate a chunked response body
+        """
+        if self._chunked:
+            self.wfile.write(b'0\r\n\r\n')
+            self._chunked = False
 
     def do_GET(self):
         self.process_request()
@@ -70,6 +114,7 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
                 self.callback = None
                 self.parse_args()
                 self.process_urlpath()
+                self.end_body()
         except socket.error:
             traceback.print_exc()
             print("broken pipe")
@@ -83,17 +128,26 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
             qsl == "color=blue&selection=benz"
             parse.parse_qs(qs) == {'color': ['blue'], 'selection': ['benz']}
         self.urlpath would be "/apply/pymol.cmd.color"
+
+        POST requests may send the arguments form encoded, or a JSON
+        document (e.g. for /batch) which is kept as self.body
         """
-        self.fs = {}
+        _, _, path, _, qs, _ = parse.urlparse(self.path)
+        self.fs = parse.parse_qs(qs, keep_blank_values=True)
+        self.urlpath = path
+        self.body = b''
 
         if self.command == "POST":
-            self.fs = self.headers
-            self.urlpath = self.path
-
-        elif self.command == "GET":
-            _, _, path, _, qs, _ = parse.urlparse(self.path)
-            self.fs = parse.parse_qs(qs, keep_blank_values=True)
-            self.urlpath = path
+            # always consume the body, the connection may be reused
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.body = self.rfile.read(length)
+            if (self.headers.get_content_type() ==
+                    'application/x-www-form-urlencoded'):
+                form = parse.parse_qs(self.body.decode('utf-8'),
+                                      keep_blank_values=True)
+                for key, value in form.items():
+                    self.fs.setdefault(key, []).extend(value)
 
     def process_urlpath(self):
         """
@@ -115,6 +169,8 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
                 parts.append('')
             if (parts[1] == 'apply'): # calling a method
                 self.pymol_apply(parts[2])
+            elif (parts[1] == 'batch'): # calling a list of methods
+                self.pymol_batch()
             elif (parts[1] == 'getattr'): # retrieving a property
                 self.pymol_getattr(parts[2])
             elif (parts[1] == 'echo'): # for debugging purposes
@@ -136,7 +192,7 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
             except:
                 self.send_error(500,"Unable to get attribute.")
                 self.wfile_write(" %s\n" % attr)
-                traceback.print_exc(file=self.wfile)
+                self.wfile_write(traceback.format_exc())
         else:
             self.send_error(404,"Not a recognized attribute")
             self.wfile_write(" %s is not a recognized attribute\n" % attr)
@@ -144,9 +200,9 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
     def wrap_return(self, result, status="OK", indent=None):
         r = { 'status' : status, 'result' : result }
         if self.server.wrap_natives==1:
-            return json.dumps(r, indent=indent)
+            return json.dumps(r, indent=indent, default=_json_default)
         else:
-            return json.dumps(result, indent=indent)
+            return json.dumps(result, indent=indent, default=_json_default)
 
     def send_json_result(self, result):
         """
@@ -206,15 +262,118 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
                 self.wfile_write(json.dumps(json.loads(response),indent=4))
                 self.wfile_write("</pre>")
 
+    def send_binary_result(self, result):
+        """
+        stream a str, bytes or NumPy array result as raw bytes (chunked
+        if the client speaks HTTP/1.1). Arrays are sent in C order, their
+        dtype and shape go into the X-PyMOL-Dtype and X-PyMOL-Shape
+        headers. Other results are sent as JSON.
+        """
+        headers = []
+        if hasattr(result, 'tobytes') and hasattr(result, 'dtype'):
+            headers = [('X-PyMOL-Dtype', result.dtype.str),
+                       ('X-PyMOL-Shape', ','.join(map(str, result.shape)))]
+            data = result.tobytes()
+        elif isinstance(result, str):
+            data = result.encode('utf-8')
+        elif isinstance(result, bytes):
+            data = result
+        else:
+            self.send_json_result(result)
+            return
+
+        self.send_resp_header(200, _binary_mime_type, headers)
+        view = memoryview(data)
+        for i in range(0, len(view), _stream_chunk_size):
+            self.wfile_write(bytes(view[i:i + _stream_chunk_size]))
+
+    def lookup_method(self, name):
+        """
+        session function for the given name, or None
+        """
+        fn = self.session.get(name, None)
+        if fn is None and name.startswith('pymol.cmd.'):
+            fn = getattr(self.server.pymol_cmd, name[10:], None)
+        return fn
+
+    def pymol_batch(self):
+        """
+        apply a list of methods, all under a single API lock acquisition,
+        and send the list of results. The list is sent as JSON document in
+        the POST body, or as "_json" argument:
+
+        [ [ "my_met1", [ arg1, ... ], { 'key1' : 'val1', ... } ],
+          [ "my_met2", [ arg1, ... ], { 'key1' : 'val1', ... } ] ]
+
+        Methods which need the GUI thread (see _batch_gui_methods) are
+        rejected with status 400, use /apply for them. Nothing is applied
+        if any method is unknown or rejected. If a method raises, the
+        batch stops and the error reports its (zero-based) index.
+        """
+        if '_callback' in self.fs:
+            self.callback = self.fs['_callback'][0]
+
+        try:
+            if '_json' in self.fs:
+                blocks = json.loads(self.fs['_json'][0])
+            else:
+                blocks = json.loads(self.body.decode('utf-8'))
+        except ValueError:
+            self.send_exception_json(400, [ "Unable to parse batch" ])
+            return
+
+        if not isinstance(blocks, list) or not all(
+                isinstance(block, list) and block for block in blocks):
+            self.send_json_error(400, [ "Batch must be a list of lists:",
+                                        str(blocks) ])
+            return
+
+        fns = [self.lookup_method(block[0]) for block in blocks]
+        gui_fns = [getattr(self.server.pymol_cmd, name, None)
+                   for name in _batch_gui_methods]
+        for block, fn in zip(blocks, fns):
+            if fn is None or block[0] == '_quit':
+                self.send_json_error(500, [ "Method not found:",
+                                            str(block) ])
+                return
+            if fn in gui_fns:
+                self.send_json_error(400, [ "Method not allowed in batch:",
+                                            str(block) ])
+                return
+
+        result = []
+        with self.server.pymol_cmd.lockcm:
+            for i, (block, fn) in enumerate(zip(blocks, fns)):
+                args = tuple(block[1]) if len(block) > 1 else ()
+                kwds = block[2] if len(block) > 2 else {}
+                if self.server.pymol_logging:
+                    print('applying: ' + str(block))
+                try:
+                    result.append(fn(*args, **kwds))
+                except:
+                    self.send_exception_json(500,
+                                             [ "Exception in: %s" % block[0],
+                                               "Batch index: %d" % i,
+                                               "Args: " + str(args),
+                                               "Kwds: " + str(kwds)])
+                    return
+
+        self.send_json_result(result)
+
     def pymol_apply(self,method):
         """
         apply the appropriate method held in the session dictionary.
         supply the method arguements in the form of key/value
+
+        with the "_binary" argument (or an "Accept: application/octet-stream"
+        header), str, bytes and NumPy array results are streamed as raw
+        bytes, see send_binary_result
         """
         args = None
         kwds = None
         query_kwds = {}
         send_multi_result_list = False
+        binary = self.headers.get('Accept') == _binary_mime_type
 
         for key, value in self.fs.items():
             first_value = value[0]
@@ -225,6 +384,9 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
                 if key == "_callback":
                     self.callback = first_value
 
+                elif key == "_binary":
+                    binary = first_value not in ('', '0')
+
                 # main path for Javascript API
                 elif key == "_json":
                     # [ "my_method", [ arg1, ... ] , { 'key1' : 'val1, ... } ]
@@ -276,9 +438,7 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
             for block in blocks:
                 if self.server.pymol_logging:
                     print('applying: ' + str(block))
-                fn = self.session.get(block[0],None)
-                if fn is None and block[0].startswith('pymol.cmd.'):
-                    fn = getattr(self.server.pymol_cmd, block[0][10:], None)
+                fn = self.lookup_method(block[0])
                 if fn is not None:
                     len_block = len(block)
                     if len_block>1:
@@ -329,7 +489,10 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
         if send_multi_result_list:
             self.send_json_result(result)
         elif len(result):
-            self.send_json_result(result[-1])
+            if binary:
+                self.send_binary_result(result[-1])
+            else:
+                self.send_json_result(result[-1])
         else:
             self.send_json_result(None)
         return
@@ -350,10 +513,11 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
                                          list(path_list))
                 if os.path.isdir(full_path):
                     full_path = full_path + "/index.html"
-                fp = open(full_path,"rb")
-                self.send_resp_header(200,self.guess_mime(full_path))
-                self.wfile_write(fp.read())
-                fp.close()
+                with open(full_path,"rb") as fp:
+                    self.send_resp_header(200,self.guess_mime(full_path))
+                    for chunk in iter(lambda: fp.read(_stream_chunk_size),
+                                      b''):
+                        self.wfile_write(chunk)
             except:
                 self.send_error(404,"Unable to locate document.")
                 self.wfile_write(": %s" % self.path)
@@ -388,24 +552,37 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
         for item in getattr(self.server, 'custom_headers', ()):
             self.send_header(item[0], item[1])
 
-    def send_error(self,errcode,errmsg):
+    def send_error(self,errcode,errmsg,explain=None):
         self.send_response(errcode)
         self.send_header('Content-type', 'text/plain')
         self.send_header('Pragma','no-cache')
         self.send_header('Cache-Control','no-cache, must-revalidate')
         self.send_header('Expires','Sat, 10 Jan 2008 01:00:00 GMT')
         self.send_custom_headers()
+        # error body is delimited by closing the connection
+        self.send_header('Connection', 'close')
+        self.close_connection = True
         self.end_headers()
         self.wfile_write("PyMOL-HTTPd-Error: "+errmsg+"\n")
 
-    def send_resp_header(self, code=200, mime='text/html'):
+    def send_resp_header(self, code=200, mime='text/html', headers=()):
         self.send_response(code)
         self.send_header('Content-type', mime)
         self.send_header('Pragma','no-cache')
         self.send_header('Cache-Control','no-cache, must-revalidate')
         self.send_header('Expires','Sat, 10 Jan 2008 01:00:00 GMT')
+        for item in headers:
+            self.send_header(item[0], item[1])
         self.send_custom_headers()
-        self.end_headers()
+        if (self.protocol_version == 'HTTP/1.1' and
+                self.request_version == 'HTTP/1.1'):
+            # keep-alive, body is delimited by the terminating chunk
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self._chunked = True
+        else:
+            self.close_connection = True
+            self.end_headers()
 
     def echo_args(self):
         """
@@ -436,13 +613,19 @@ class _PymolHTTPRequestHandler(BaseHTTPRequestHandler):
             else:
                 self.wfile_write(f"{value}\n")
 
+class _PymolHTTP11RequestHandler(_PymolHTTPRequestHandler):
+
+    # keep-alive connections, for the threaded server
+    protocol_version = 'HTTP/1.1'
+
 # this is the public class we're exposing to PyMOL consortium members
 
 class PymolHttpd:
 
-    def __init__(self, port=8080, root=None, logging=1, wrap_natives=0, self_cmd=None, headers=()):
+    def __init__(self, port=8080, root=None, logging=1, wrap_natives=0, self_cmd=None, headers=(), threaded=0):
         '''
         :param headers: A list or tuple of (key, value) header items to send with each response.
+        :param threaded: Handle each connection in its own thread, with HTTP/1.1 keep-alive.
         '''
         if self_cmd is None:
             # fallback on the global singleton PyMOL API
@@ -472,8 +655,12 @@ class PymolHttpd:
 
         session['pymol.cmd.label'] = self_cmd.label2 # no-eval version
 
-        self.server = HTTPServer(('', self.port),
-                                                _PymolHTTPRequestHandler)
+        if threaded:
+            self.server = _PymolThreadingHTTPServer(('', self.port),
+                                                    _PymolHTTP11RequestHandler)
+        else:
+            self.server = _PymolHTTPServer(('', self.port),
+                                           _PymolHTTPRequestHandler)
         self.server.wrap_natives = wrap_natives
         self.server.custom_headers = headers
 
@@ -1057,22 +1057,80 @@ PYMOL API
             print(" cmd.get_dihedral: %5.3f degrees."%r)
         return r
 
-    def get_model(selection="(all)", state=1, ref='', ref_state=0, *, _self=cmd):
+    # (iterate keyword, chempy.Atom attribute) for get_model(fast=1)
+    _fast_model_columns = [
+        ('model', 'model'),
+        ('name', 'name'),
+        ('elem', 'symbol'),
+        ('resn', 'resn'),
+        ('resv', 'resi_number'),
+        ('resi', 'ins_code'),
+        ('chain', 'chain'),
+        ('alt', 'alt'),
+        ('segi', 'segi'),
+        ('ss', 'ss'),
+        ('text_type', 'text_type'),
+        ('custom', 'custom'),
+        ('numeric_type', 'numeric_type'),
+        ('type', 'hetatm'),
+        ('flags', 'flags'),
+        ('ID', 'id'),
+        ('index', 'index'),
+        ('b', 'b'),
+        ('q', 'q'),
+        ('vdw', 'vdw'),
+        ('elec_radius', 'elec_radius'),
+        ('partial_charge', 'partial_charge'),
+        ('formal_charge', 'formal_charge'),
+        ('(x, y, z)', 'coord'),
+    ]
+
+    def _get_fast_model(selection, state, *, _self=cmd):
+        from chempy.fast import FastModel
+
+        rows = []
+        _self.iterate_state(state, selection,
+                '_append((' + ','.join(k for (k, _) in _fast_model_columns) + '))',
+                space={'_append': rows.append})
+
+        columns = dict(zip((a for (_, a) in _fast_model_columns),
+            zip(*rows))) if rows else {'coord': []}
+
+        if rows:
+            columns['ins_code'] = [resi.lstrip('-0123456789')
+                    for resi in columns['ins_code']]
+            columns['hetatm'] = [t == 'HETATM' for t in columns['hetatm']]
+            columns['numeric_type'] = [-9999 if t == '?' else t
+                    for t in columns['numeric_type']]
+
+        return FastModel.from_columns(columns,
+                _self.get_bonds(selection, state))
+
+    def get_model(selection="(all)", state=1, ref='', ref_state=0, fast=0, *, _self=cmd):
         '''
 DESCRIPTION
 
     "get_model" returns a ChemPy "Indexed" format model from a selection.
 
+    With fast=1, returns a columnar "chempy.fast.FastModel" instead, which
+    is built without creating a Python object per atom.
+
 PYMOL API
 
-    cmd.get_model(string selection [,int state] )
+    cmd.get_model(string selection [,int state [,str ref [,int ref_state
+        [,int fast ]]]])
 
         '''
         # preprocess selection
         selection = selector.process(selection)
         #
+        if int(fast) and not ref:
+            return _get_fast_model(selection, state, _self=_self)
         with _self.lockcm:
             r = _cmd.get_model(_self._COb,"("+str(selection)+")",int(state)-1,str(ref),int(ref_state)-1)
+        if int(fast):
+            from chempy.fast import FastModel
+            r = FastModel().from_indexed(r)
         return r
 
     def get_bonds(selection="(all)", state=CURRENT_STATE, *, _self=cmd):
@@ -12,6 +12,7 @@
 #-*
 #Z* -------------------------------------------------------------------
 
+import os
 import sys
 
 cmd = __import__("sys").modules["pymol.cmd"]
@@ -77,6 +78,25 @@ class _verbose_cmd_proxy:
     def set(self, name, value=1):
         return self.cmd.set(name, value, quiet=0)
 
+def _select_in(name, selection, reference, enable=-1, _self=cmd):
+    '''
+    Linear time version of "select name, selection in reference"
+    (same segi, chain, resn, resi and name). Like "in", compares case
+    insensitive with the ignore_case and ignore_case_chain settings.
+    '''
+    fold = _self.get_setting_boolean('ignore_case')
+    fold_chain = _self.get_setting_boolean('ignore_case_chain')
+    key = '(%s)' % ', '.join((f + '.upper()') if folded else f
+            for (f, folded) in [('segi', fold_chain), ('chain', fold_chain),
+                ('resn', fold), ('resi', fold), ('name', fold)])
+    keys = set()
+    _self.iterate(reference, 'keys.add(%s)' % key, space={'keys': keys})
+    atoms = []
+    _self.iterate(selection, '%s in keys and atoms.append((model, index))' % key,
+            space={'keys': keys, 'atoms': atoms})
+    return _self.select_keys(name, atoms, 'model index', enable=enable)
+
+
 def color_by_area(sele, mode="molecular", state=0, palette='rainbow', _self=cmd):
     """
 DESCRIPTION
@@ -97,7 +117,7 @@ ARGUMENTS
 
     orgN = _self.select(orgSel, sele, 0)
     _self.create(tmpObj, "byobj ?%s & ! solvent" % (orgSel), zoom=0)
-    tmpN = _self.select(tmpSel, '?%s in ?%s' % (tmpObj, orgSel), 0)
+    tmpN = _select_in(tmpSel, '?' + tmpObj, '?' + orgSel, 0, _self=_self)
 
     try:
         if orgN != tmpN:
@@ -141,7 +161,7 @@ ARGUMENTS
 
     _self.select(selName, sele)
     _self.create(tmpObj, "(byobj ?%s) & ! solvent" % (selName), zoom=0)
-    _self.select(selName, '?%s in ?%s' % (tmpObj, selName))
+    _select_in(selName, '?' + tmpObj, '?' + selName, _self=_self)
 
     _self.set("dot_solvent", 1, tmpObj);
     _self.get_area(selName, load_b=1)
@@ -152,13 +172,10 @@ ARGUMENTS
     res_area = defaultdict(int)
     _self.iterate(selName, "res_area[segi, chain, resi] += b", space=locals())
 
-    _self.select(selName, 'none')
     _self.delete(tmpObj)
 
-    for (k, v) in res_area.items():
-        if v < surface_residue_cutoff:
-            continue
-        _self.select(selName, 'segi %s & chain %s & resi %s' % k, merge=1)
+    _self.select_keys(selName, [k for (k, v) in res_area.items()
+        if v >= surface_residue_cutoff], 'segi chain resi')
 
     return selName
 
@@ -186,7 +203,7 @@ ARGUMENTS
     _self.create(tmpObj, "(byobj ?%s) & ! solvent" % (tmpSel), zoom=0)
 
     selName = name or _self.get_unused_name("exposed")
-    _self.select(selName, '?%s in ?%s' % (tmpObj, tmpSel))
+    _select_in(selName, '?' + tmpObj, '?' + tmpSel, _self=_self)
 
     _self.set("dot_solvent", 1, tmpObj);
     _self.get_area(selName, load_b=1)
@@ -195,7 +212,8 @@ ARGUMENTS
     if cutoff < 0.0:
         cutoff = _self.get_setting_float("surface_residue_cutoff")
 
-    _self.select(selName, '?%s in (?%s and b > %f)' % (tmpSel, selName, cutoff))
+    _select_in(selName, '?' + tmpSel, '?%s and b > %f' % (selName, cutoff),
+            _self=_self)
     _self.delete(tmpObj)
     _self.delete(tmpSel)
 
@@ -223,7 +241,7 @@ SEE ALSO
 
     tmpObj = _self.get_unused_name("_tmp")
     _self.create(tmpObj, "(byobj ?%s) & ! solvent" % (tmpSel), state, zoom=0)
-    _self.select(tmpSel, '?%s in ?%s' % (tmpObj, tmpSel), 0)
+    _select_in(tmpSel, '?' + tmpObj, '?' + tmpSel, 0, _self=_self)
 
     _self.set("dot_solvent", dot_solvent, tmpObj);
     if dot_density > -1:
@@ -1061,6 +1079,172 @@ DESCRIPTION
     _self.enable(name)
 
 
+def _index_ranges(indices):
+    '''
+    Compact "index" selection for a list of atom indices, e.g.
+    [1, 2, 3, 7] -> "index 1-3+7"
+    '''
+    indices = sorted(indices)
+    ranges = []
+    for i in indices:
+        if ranges and ranges[-1][1] == i - 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return 'index ' + '+'.join(
+            str(a) if a == b else '%d-%d' % (a, b) for (a, b) in ranges)
+
+
+def _get_sasa_exposed(model, keys, subsele, state, _self=cmd):
+    '''
+    Per-residue SASA of fully exposed residues, i.e. of each residue
+    (segi, chain, resi) in "keys" together with its bonded neighbor
+    residues only, like "create tmp, byres (residue extend 1)".
+
+    Residues whose neighborhoods don't share atoms are processed together
+    in one temporary object, with the neighborhoods moved apart so that
+    they don't occlude each other. Typically a handful of objects replaces
+    one object per residue.
+    '''
+    import collections
+    import numpy
+
+    osele = '%%%s & byres ((byres (%%%s & (%s))) extend 1)' % (
+            model, model, subsele)
+
+    atoms = []
+    _self.iterate_state(state, osele,
+            'atoms.append((index, (segi, chain, resi), vdw))',
+            space={'atoms': atoms})
+
+    context = dict((key, {key}) for key in keys)
+    for (atm1, atm2, _) in _self.get_bonds(osele, state):
+        key1, key2 = atoms[atm1][1], atoms[atm2][1]
+        if key1 != key2:
+            if key1 in context:
+                context[key1].add(key2)
+            if key2 in context:
+                context[key2].add(key1)
+
+    # greedy partitioning into batches with non-overlapping neighborhoods
+    batches = []
+    for key in keys:
+        for (used, owner) in batches:
+            if used.isdisjoint(context[key]):
+                break
+        else:
+            used, owner = set(), {}
+            batches.append((used, owner))
+        used.update(context[key])
+        owner.update((k, key) for k in context[key])
+
+    margin = 2.0 * (max([a[2] for a in atoms] or [0.0]) +
+            _self.get_setting_float('solvent_radius')) + 1.0
+
+    exposed = collections.defaultdict(float)
+    tmpname = _self.get_unused_name('_tripep')
+
+    try:
+        for (used, owner) in batches:
+            indices = [a[0] for a in atoms if a[1] in owner]
+            if not indices:
+                continue
+
+            _self.delete(tmpname)
+            _self.create(tmpname, '%%%s & %s' % (model, _index_ranges(indices)),
+                    state, 1, zoom=0)
+
+            centers = {}
+            groups = []
+            _self.iterate_state(1, tmpname,
+                    'groups.append(centers.setdefault('
+                    'owner[segi, chain, resi], len(centers)))',
+                    space=locals())
+
+            # place the neighborhoods on a grid
+            groups = numpy.array(groups)
+            coords = numpy.asarray(_self.get_coords(tmpname, 1), float)
+            lower = numpy.full((len(centers), 3), numpy.inf)
+            upper = numpy.full((len(centers), 3), -numpy.inf)
+            numpy.minimum.at(lower, groups, coords)
+            numpy.maximum.at(upper, groups, coords)
+            spacing = (upper - lower).max() + margin
+            side = int(numpy.ceil(len(centers) ** (1. / 3.)))
+            g = numpy.arange(len(centers))
+            grid = numpy.stack([g % side, g // side % side, g // side // side],
+                    1) * spacing
+            _self.load_coords(coords - lower[groups] + grid[groups], tmpname, 1)
+
+            _self.get_area(tmpname, 1, load_b=1)
+
+            def add(key, b):
+                if key in centers:
+                    exposed[key] += b
+
+            _self.iterate('%%%s & (%s)' % (tmpname, subsele),
+                    'add((segi, chain, resi), b)', space=locals())
+    finally:
+        _self.delete(tmpname)
+
+    return exposed
+
+
+def _get_sasa_relative_object(model, sele, subsele, state, _self=cmd):
+    '''
+    Relative per-residue SASA for the atoms of "sele" in one object.
+    Returns a dict (segi, chain, resi) -> area. Needs dot_solvent=1.
+    '''
+    import collections
+
+    _self.get_area('?%s & %%%s' % (sele, model), state, load_b=1)
+
+    resarea = collections.defaultdict(float)
+    _self.iterate('?%s & %%%s & (%s)' % (sele, model, subsele),
+                  'resarea[segi,chain,resi] += b',
+                  space=locals())
+
+    exposed = _get_sasa_exposed(model, list(resarea), subsele, state, _self)
+
+    for key in resarea:
+        if exposed.get(key, 0.0) != 0.0:
+            resarea[key] /= exposed[key]
+
+    return resarea
+
+
+# per process state of the get_sasa_relative workers
+_sasa_relative_worker = {}
+
+
+def _get_sasa_relative_init(settings):
+    '''
+    Worker initializer: start a private PyMOL instance
+    '''
+    import pymol2
+    p = pymol2.PyMOL()
+    p.start()
+    p.cmd.feedback('disable', 'all', 'everything')
+    for (name, value) in settings:
+        p.cmd.set(name, value, updates=0)
+    _sasa_relative_worker['pymol'] = p
+
+
+def _get_sasa_relative_task(task):
+    '''
+    Worker task: relative SASA for one object, given as (chempy model,
+    0-based indices of selected atoms, subsele).
+    '''
+    model, positions, subsele = task
+    _self = _sasa_relative_worker['pymol'].cmd
+    _self.load_model(model, '_m', zoom=0)
+    try:
+        _self.select('_s', '_m & ' + _index_ranges(
+            [i + 1 for i in positions]), 0)
+        return dict(_get_sasa_relative_object('_m', '_s', subsele, 1, _self))
+    finally:
+        _self.delete('*')
+
+
 def get_sasa_relative(selection='all',
                       state=1,
                       vis=-1,
@@ -1069,6 +1253,7 @@ def get_sasa_relative(selection='all',
                       outfile='',
                       *,
                       subsele='all',
+                      processes=1,
                       _self=cmd):
     '''
 DESCRIPTION
@@ -1102,6 +1287,9 @@ ARGUMENTS
 
     subsele = str: Sub-selection, e.g. "sidechain" {default: all}
 
+    processes = int: number of worker processes for multiple objects,
+    0 for the number of CPUs {default: 1}
+
 EXAMPLE
 
     fetch 1ubq, async=0
@@ -1124,11 +1312,11 @@ SEE ALSO
     import collections
 
     state, vis, quiet = int(state), int(vis), int(quiet)
+    processes = int(processes)
     if vis == -1:
         vis = not quiet
 
     sele = _self.get_unused_name('_sele')
-    tripepname = _self.get_unused_name('_tripep')
 
     _self.select(sele, selection, 0)
 
@@ -1136,27 +1324,45 @@ SEE ALSO
     _self.set('dot_solvent', 1, updates=0)
 
     try:
-        for model in _self.get_object_list(sele):
-            _self.get_area('?%s & ?%s' % (sele, model), state, load_b=1)
-
+        models = _self.get_object_list(sele) or []
         resarea = collections.defaultdict(float)
-        _self.iterate(f"{sele} & ({subsele})",
-                      'resarea[model,segi,chain,resi] += b',
-                      space=locals())
-
-        for key in resarea:
-            _self.create(tripepname, 'byres (/%s/%s/%s/`%s extend 1)' % key, state, 1, zoom=0)
-            _self.get_area(tripepname, 1, load_b=1)
 
-            resarea_exposed = [0.0]
-            _self.iterate(f"/{tripepname}/{key[1]}/{key[2]}/`{key[3]} & ({subsele})",
-                    'resarea_exposed[0] += b', space=locals())
-            _self.delete(tripepname)
+        if processes < 1:
+            processes = os.cpu_count() or 1
+        processes = min(processes, len(models))
 
-            if resarea_exposed[0] == 0.0:
-                continue
-
-            resarea[key] /= resarea_exposed[0]
+        if processes < 2:
+            results = (_get_sasa_relative_object(model, sele, subsele,
+                state, _self) for model in models)
+        else:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            tasks = []
+            for model in models:
+                indices = []
+                selected = set()
+                _self.iterate_state(state, '%' + model,
+                        'indices.append(index)', space=locals())
+                _self.iterate_state(state, '?%s & %%%s' % (sele, model),
+                        'selected.add(index)', space=locals())
+                tasks.append((_self.get_model('%' + model, state),
+                    [i for (i, index) in enumerate(indices)
+                        if index in selected], subsele))
+
+            settings = [(name, _self.get(name))
+                    for name in ('dot_solvent', 'dot_density',
+                        'solvent_radius')]
+
+            with ProcessPoolExecutor(processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_get_sasa_relative_init,
+                    initargs=(settings,)) as executor:
+                results = list(executor.map(_get_sasa_relative_task, tasks))
+
+        for (model, objarea) in zip(models, results):
+            for (key, area) in objarea.items():
+                resarea[(model,) + key] = area
 
         _self.alter(sele,
                 var + ' = resarea[model,segi,chain,resi]', space=locals())
@@ -1969,10 +1969,53 @@ SEE ALSO
 
 
     import colorsys
+
+    def _hsv_to_rgb_array(hsv):
+        '''
+        Vectorized colorsys.hsv_to_rgb for an (N, 3) array
+        '''
+        import numpy
+        h, s, v = hsv.T
+        i = numpy.floor(h * 6.0)
+        f = (h * 6.0) - i
+        p = v * (1.0 - s)
+        q = v * (1.0 - s * f)
+        t = v * (1.0 - s * (1.0 - f))
+        i = i.astype(int) % 6
+        return numpy.stack([
+            numpy.choose(i, [v, q, p, p, t, v]),
+            numpy.choose(i, [t, v, v, q, p, p]),
+            numpy.choose(i, [p, p, t, v, v, q]),
+        ], 1)
+
+    def _hls_to_rgb_array(hls):
+        '''
+        Vectorized colorsys.hls_to_rgb for an (N, 3) array
+        '''
+        import numpy
+        h, l, s = hls.T
+        m2 = numpy.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+        m1 = 2.0 * l - m2
+
+        def _v(hue):
+            hue = hue % 1.0
+            return numpy.select([
+                hue < 1.0 / 6.0,
+                hue < 0.5,
+                hue < 2.0 / 3.0,
+            ], [
+                m1 + (m2 - m1) * hue * 6.0,
+                m2,
+                m1 + (m2 - m1) * (2.0 / 3.0 - hue) * 6.0,
+            ], m1)
+
+        return numpy.stack([_v(h + 1.0 / 3.0), _v(h), _v(h - 1.0 / 3.0)], 1)
+
+    # from_rgb converts one color tuple, to_rgb converts an (N, 3) array
     _spectrumany_interpolations = {
-        'hls': (colorsys.rgb_to_hls, colorsys.hls_to_rgb),
-        'hsv': (colorsys.rgb_to_hsv, colorsys.hsv_to_rgb),
-        'rgb': ((lambda *rgb: rgb), (lambda *rgb: rgb)),
+        'hls': (colorsys.rgb_to_hls, _hls_to_rgb_array),
+        'hsv': (colorsys.rgb_to_hsv, _hsv_to_rgb_array),
+        'rgb': ((lambda *rgb: rgb), (lambda rgb: rgb)),
     }
 
     def spectrumany(expression, colors, selection='(all)', minimum=None,
@@ -1988,6 +2031,7 @@ DESCRIPTION
 
     This is not a separate PyMOL command but is used as a fallback in "spectrum".
         '''
+        import numpy
         from . import CmdException
 
         try:
@@ -2009,7 +2053,7 @@ DESCRIPTION
         if None in col_tuples:
             raise CmdException('unknown color')
 
-        col_tuples = [from_rgb(*c) for c in col_tuples]
+        col_tuples = numpy.array([from_rgb(*c) for c in col_tuples])
 
         expression = {'pc': 'partial_charge', 'fc': 'formal_charge',
                 'resi': 'resv'}.get(expression, expression)
@@ -2020,18 +2064,23 @@ DESCRIPTION
             e_list = []
             _self.iterate(selection, 'e_list.append(%s)' % (expression), space=locals())
 
+        valid = numpy.fromiter((v is not None for v in e_list), bool,
+                len(e_list))
+
         try:
-            v_list = [float(v) for v in e_list if v is not None]
+            v_list = numpy.array([v for v in e_list if v is not None],
+                    dtype=float)
         except (TypeError, ValueError):
             if not quiet:
                 print(' Spectrum: Expression is non-numeric, enumerating values')
-            v_list = e_list = list(map(sorted(set(e_list)).index, e_list))
+            v_list = numpy.unique(e_list, return_inverse=True)[1].astype(float)
+            valid[:] = True
 
-        if not v_list:
+        if not len(v_list):
             return (0., 0.)
 
-        if minimum is None: minimum = min(v_list)
-        if maximum is None: maximum = max(v_list)
+        if minimum is None: minimum = v_list.min()
+        if maximum is None: maximum = v_list.max()
         r = minimum, maximum = float(minimum), float(maximum)
         if not quiet:
             print(' Spectrum: range (%.5f to %.5f)' % r)
@@ -2041,23 +2090,19 @@ DESCRIPTION
             _self.color(colors[0], selection)
             return r
 
-        e_it = iter(e_list)
-        def next_color():
-            v = next(e_it)
-            if v is None:
-                return False
-            v = min(1.0, max(0.0, (float(v) - minimum) / val_range)) * (n_colors - 1)
-            i = min(int(v), n_colors - 2)
-            p = v - i
-
-            col = [(col_tuples[i+1][j] * p + col_tuples[i][j] * (1.0 - p))
-                    for j in range(3)]
+        v = numpy.clip((v_list - minimum) / val_range, 0.0, 1.0) * (n_colors - 1)
+        i = numpy.minimum(v.astype(int), n_colors - 2)
+        p = (v - i)[:, None]
 
-            rgb = [int(0xFF * v) for v in to_rgb(*col)]
+        col = col_tuples[i + 1] * p + col_tuples[i] * (1.0 - p)
+        rgb = (0xFF * to_rgb(col)).astype(int)
 
-            return 0x40000000 + rgb[0] * 0x10000 + rgb[1] * 0x100 + rgb[2]
+        color_list = numpy.zeros(len(e_list), int)
+        color_list[valid] = 0x40000000 + rgb[:, 0] * 0x10000 + \
+                rgb[:, 1] * 0x100 + rgb[:, 2]
 
-        _self.alter(selection, 'color = next_color() or color', space=locals())
+        _self.alter(selection, 'color = _next_color() or color',
+                space={'_next_color': iter(color_list.tolist()).__next__})
         _self.recolor(selection)
 
         return r
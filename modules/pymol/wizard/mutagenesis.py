@@ -1,10 +1,9 @@
 from pymol.wizard import Wizard
 from pymol import cmd,editor
-from chempy import io
+from chempy import rotamer
 from copy import deepcopy
 
 import pymol
-import os
 import traceback
 
 src_sele = "_mutate_sel"
@@ -55,8 +54,6 @@ class Mutagenesis(Wizard):
         self.bump_scores = []
         self.dep = default_dep
 
-        self.ind_library = io.pkl.fromFile(os.environ['PYMOL_DATA']+
-                                           "/chempy/sidechains/sc_bb_ind.pkl")
         self.load_library()
         self.status = 0 # 0 no selection, 1 mutagenizing
         self.bump_check = 1
@@ -71,7 +68,7 @@ class Mutagenesis(Wizard):
         self.hyd = default_hyd
         self.n_cap = default_n_cap
         self.c_cap = default_c_cap
-        residues = list(self.ind_library.keys())
+        residues = list(self.library.residues)
         # could extent with additional fragments manually as below
         residues.extend(['GLY','ALA'])
         residues.extend(['HID','HIE','HIP'])
@@ -218,10 +215,8 @@ class Mutagenesis(Wizard):
             cmd.refresh_wizard()
 
     def load_library(self):
-        if self.dep == 'dep':
-            if not hasattr(self,'dep_library'):
-                self.dep_library = io.pkl.fromFile(os.environ['PYMOL_DATA']+
-                                           "/chempy/sidechains/sc_bb_dep.pkl")
+        # converted once, memory mapped and shared by all instances
+        self.library = rotamer.get_library()
 
     def set_mode(self,mode):
         cmd=self.cmd
@@ -571,49 +566,29 @@ class Mutagenesis(Wizard):
         sticks = (cmd.count_atoms("(%s & name CA & rep sticks)"%src_sele)>0)
 
         cmd.delete(obj_name)
-        key = rot_type
         lib = None
         if self.dep == 'dep':
             try:
                 result = cmd.phi_psi("%s"%src_sele)
                 if len(result)==1:
                     (phi,psi) = list(result.values())[0]
-                    (phi,psi) = (int(10*round(phi/10)),int(10*(round(psi/10))))
-                    key = (rot_type,phi,psi)
-                    if key not in self.dep_library:
-                        (phi,psi) = (int(20*round(phi/20)),int(20*(round(psi/20))))
-                        key = (rot_type,phi,psi)
-                        if key not in self.dep_library:
-                            (phi,psi) = (int(60*round(phi/60)),int(60*(round(psi/60))))
-                            key = (rot_type,phi,psi)
-                    lib = self.dep_library.get(key,None)
+                    lib = self.library.get_rotamers(rot_type,phi,psi)
             except:
                 pass
         if lib is None:
-            key = rot_type
-            lib = self.ind_library.get(key,None)
+            lib = self.library.get_rotamers(rot_type)
             if (lib is not None) and self.dep == 'dep':
                 print(' Mutagenesis: no phi/psi, using backbone-independent rotamers.')
         if lib is not None:
-            state = 1
-            for a in lib:
+            for state in range(1, len(lib) + 1):
                 cmd.create(obj_name,frag_name,1,state)
-                if state == 1:
-                    cmd.select(mut_sele,"(byres (%s like %s))"%(obj_name,src_sele))
-                if rot_type=='PRO':
-                    cmd.unbond("(%s & name N)"%mut_sele,"(%s & name CD)"%mut_sele)
-                for b in a.keys():
-                    if b!='FREQ':
-                        cmd.set_dihedral("(%s & n;%s)"%(mut_sele,b[0]),
-                                         "(%s & n;%s)"%(mut_sele,b[1]),
-                                         "(%s & n;%s)"%(mut_sele,b[2]),
-                                         "(%s & n;%s)"%(mut_sele,b[3]),
-                                         a[b],state=state)
-                    else:
-                        cmd.set_title(obj_name,state,"%1.1f%%"%(a[b]*100))
-                if rot_type=='PRO':
-                    cmd.bond("(%s & name N)"%mut_sele,"(%s & name CD)"%mut_sele)
-                state = state + 1
+            cmd.select(mut_sele,"(byres (%s like %s))"%(obj_name,src_sele))
+            # apply the chi angles of all rotamers at once
+            template = rotamer.Template.from_model(cmd.get_model(mut_sele, 1))
+            coords = template.build(lib)
+            for state in range(1, len(lib) + 1):
+                cmd.load_coords(coords[state - 1], mut_sele, state)
+                cmd.set_title(obj_name,state,"%1.1f%%"%(lib[state - 1]['FREQ']*100))
             cmd.delete(frag_name)
             print(" Mutagenesis: %d rotamers loaded."%len(lib))
             if self.bump_check:
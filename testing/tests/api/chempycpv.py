@@ -0,0 +1,69 @@
+from pymol import cmd, testing
+
+class TestChempyCpv(testing.PyMOLTestCase):
+
+    def _coords(self, rng, n=40):
+        import numpy
+        from chempy import cpv
+        target = rng.uniform(-10., 10., (n, 3))
+        rot = numpy.array(cpv.rotation_matrix(1.2, cpv.normalize([1, 2, 3])))
+        source = target.dot(rot.T) + [3., -4., 5.]
+        return target, source
+
+    def testFit(self):
+        import numpy
+        from chempy import cpv
+
+        rng = numpy.random.RandomState(123)
+        target, source = self._coords(rng)
+        source += rng.normal(0., 0.1, source.shape)
+
+        t1, t2, rot, rmsd = cpv.fit(target.tolist(), source.tolist())
+        self.assertTrue(isinstance(rot, list))
+        fitted = numpy.array([cpv.add(t1, cpv.transform(rot, cpv.sub(x, t2)))
+                for x in source.tolist()])
+        self.assertAlmostEqual(rmsd, numpy.sqrt(((fitted - target) ** 2)
+            .sum(1).mean()), delta=1e-6)
+
+        coords = source.copy()
+        self.assertTrue(cpv.fit_apply_inplace((t1, t2, rot), coords) is coords)
+        self.assertArrayEqual(coords, fitted, delta=1e-6)
+
+        # mirror image: still a proper rotation
+        rot = cpv.fit_arrays(target, target * [-1., 1., 1.])[2]
+        self.assertAlmostEqual(numpy.linalg.det(rot), 1.0, delta=1e-6)
+
+    def testFitBatch(self):
+        import numpy
+        from chempy import cpv
+
+        rng = numpy.random.RandomState(123)
+        target, source = self._coords(rng)
+        frames = source + rng.normal(0., 0.2, (10,) + source.shape)
+
+        t1, t2, rot, rmsd = result = cpv.fit_arrays(target, frames)
+        self.assertEqual(rot.shape, (10, 3, 3))
+        self.assertEqual(rmsd.shape, (10,))
+        for i in (0, 7):
+            self.assertAlmostEqual(rmsd[i], cpv.fit(target.tolist(),
+                frames[i].tolist())[3], delta=1e-6)
+
+        cpv.fit_apply_inplace(result, frames)
+        self.assertArrayEqual(numpy.sqrt(((frames - target) ** 2)
+            .sum(-1).mean(-1)), rmsd, delta=1e-6)
+
+    def testFitWeights(self):
+        import numpy
+        from chempy import cpv
+
+        rng = numpy.random.RandomState(123)
+        target, source = self._coords(rng)
+        source[:10] = rng.uniform(-10., 10., (10, 3))
+        weights = numpy.ones(len(source))
+        weights[:10] = 0.
+
+        rot, rmsd = cpv.fit_arrays(target, source, weights)[2:]
+        self.assertAlmostEqual(rmsd, 0.0, delta=1e-6)
+        self.assertArrayEqual(rot, cpv.fit_arrays(target[10:],
+            source[10:])[2], delta=1e-6)
+        self.assertRaises(ValueError, cpv.fit_arrays, target, source[1:])
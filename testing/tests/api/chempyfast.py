@@ -0,0 +1,62 @@
+from pymol import cmd, testing
+
+class TestChempyFast(testing.PyMOLTestCase):
+
+    def _assertAtomsEqual(self, atoms1, atoms2):
+        self.assertEqual(len(atoms1), len(atoms2))
+        for (a1, a2) in zip(atoms1, atoms2):
+            self.assertEqual(a1.__dict__, a2.__dict__)
+
+    def testRoundTrip(self):
+        from chempy.fast import FastModel
+
+        cmd.fragment('trp')
+        model = cmd.get_model()
+        model.atom[0].custom_attr = [1, 2]
+        model.atom[1].atom_properties['foo'] = 3
+        model.cell = [10., 20., 30., 90., 90., 90.]
+        model.spacegroup = 'P 1'
+        model.connect_mode = 3
+
+        fast = FastModel().from_indexed(model)
+        self.assertEqual(fast.nAtom, model.nAtom)
+        self.assertEqual(fast.nBond, model.nBond)
+        self.assertArrayEqual(fast.coord, model.get_coord_list(), delta=1e-6)
+
+        model2 = fast.convert_to_indexed()
+        self._assertAtomsEqual(model.atom, model2.atom)
+        self.assertEqual([b.index for b in model.bond],
+                         [b.index for b in model2.bond])
+        self.assertEqual([b.order for b in model.bond],
+                         [b.order for b in model2.bond])
+        for key in ('cell', 'spacegroup', 'connect_mode'):
+            self.assertEqual(getattr(model2, key), getattr(model, key))
+
+    def testGetModelFast(self):
+        cmd.fragment('his')
+        cmd.alter('all', 'b = index * 2')
+        model = cmd.get_model()
+        fast = cmd.get_model(fast=1)
+
+        self.assertEqual(fast.nAtom, model.nAtom)
+        self.assertEqual(fast.nBond, model.nBond)
+        self.assertEqual(list(fast.atom['name']), [a.name for a in model.atom])
+        self.assertEqual(list(fast.atom['symbol']), [a.symbol for a in model.atom])
+        self.assertArrayEqual(fast.atom['b'], [a.b for a in model.atom], delta=1e-4)
+        self.assertArrayEqual(fast.coord, model.get_coord_list(), delta=1e-4)
+
+    def testLoadModelFast(self):
+        cmd.fragment('gly', 'm1')
+        fast = cmd.get_model('m1', fast=1)
+        fast.atom['b'] = 42.0
+        fast.coord[:] += 10.0
+
+        # modified columns count as set, unmodified ones keep has()
+        model = fast.convert_to_indexed()
+        self.assertTrue(all(a.has('b') for a in model.atom))
+        self.assertFalse(any(a.has('elec_radius') for a in model.atom))
+
+        cmd.load_model(fast, 'm2')
+        self.assertEqual(cmd.count_atoms('m2'), fast.nAtom)
+        self.assertEqual(cmd.count_atoms('m2 & b = 42'), fast.nAtom)
+        self.assertArrayEqual(cmd.get_coords('m2'), fast.coord, delta=1e-4)
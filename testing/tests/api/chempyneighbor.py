@@ -0,0 +1,68 @@
+from pymol import cmd, testing
+
+class TestChempyNeighbor(testing.PyMOLTestCase):
+
+    def _brute(self, coords, points, box=None):
+        import numpy
+        delta = coords[None] - points[:, None]
+        if box is not None:
+            delta -= box * numpy.round(delta / box)
+        return numpy.sqrt((delta * delta).sum(-1))
+
+    @testing.foreach(False, True)
+    def testPairs(self, periodic):
+        import numpy
+        from chempy.neighbor import Neighbor
+
+        rng = numpy.random.RandomState(123)
+        coords = rng.uniform(-10., 10., (500, 3))
+        points = rng.uniform(-12., 12., (50, 3))
+        box = numpy.array([20., 15., 25.]) if periodic else None
+
+        nbr = Neighbor(coords, 2.0, box)
+        dist = self._brute(coords, points, box)
+
+        qi, ai, d = nbr.get_pairs(points, 3.5)
+        self.assertEqual(sorted(zip(qi.tolist(), ai.tolist())),
+                sorted(zip(*[x.tolist() for x in (dist <= 3.5).nonzero()])))
+        self.assertArrayEqual(d, dist[qi, ai], delta=1e-6)
+
+        i, j, d = nbr.get_self_pairs(1.5)
+        self.assertTrue((i < j).all())
+        self.assertEqual(len(i), ((self._brute(coords, coords, box) <= 1.5)
+            .sum() - len(coords)) // 2)
+
+        d, index = nbr.get_nearest(points, 3)
+        self.assertArrayEqual(d, numpy.sort(dist, 1)[:, :3], delta=1e-6)
+
+        for p in points:
+            self.assertTrue(set(nbr.get_within(p, 2.0)) <=
+                    set(nbr.get_neighbors(p)))
+
+    def testUpdate(self):
+        import numpy
+        from chempy.neighbor import Neighbor
+
+        rng = numpy.random.RandomState(123)
+        coords = rng.uniform(-10., 10., (500, 3))
+        nbr = Neighbor(coords, 2.0)
+        nbr.optimize()
+
+        indices = numpy.arange(0, 500, 7)
+        coords[indices] += rng.normal(0., 2., (len(indices), 3))
+        self.assertTrue(nbr.update(coords[indices], indices) > 0)
+
+        ref = Neighbor(coords, 2.0)
+        self.assertEqual(nbr.order.tolist(), ref.order.tolist())
+        self.assertEqual(nbr.voxel, ref.voxel)
+        self.assertEqual(sorted(nbr.get_neighbors(coords[0])),
+                sorted(ref.get_neighbors(coords[0])))
+
+    def testProteinAddBonds(self):
+        from chempy import protein
+        cmd.fab('ACDEF', 'm1')
+        model = cmd.get_model('m1')
+        nbond = model.nBond
+        model.bond = []
+        protein.add_bonds(model)
+        self.assertEqual(model.nBond, nbond)
@@ -0,0 +1,48 @@
+import bz2
+import gzip
+import pickle
+
+from pymol import cmd, testing
+
+class TestChempyPkl(testing.PyMOLTestCase):
+
+    def _legacy_dumps(self, obj):
+        from chempy.pkl import cPickle
+        cPickle.configure_legacy_dump(True)
+        try:
+            return cPickle.dumps(obj, 1)
+        finally:
+            cPickle.configure_legacy_dump(False)
+
+    @testing.requires_version('3.2')
+    def testLoadsLegacy(self):
+        from chempy.pkl import cPickle
+        data = {'names': ['obj', ('x', b'\x00\x01'), [1.5, {'k': 'v'}]]}
+
+        s = self._legacy_dumps(data)
+        self.assertEqual(cPickle.loads(s), pickle._loads(s))
+        self.assertEqual(cPickle.loads(s), data)
+
+        # printable strings only (C unpickler without fallback)
+        s = self._legacy_dumps({'a': ['x', ('y', 1)]})
+        self.assertEqual(cPickle.loads(s), {'a': ['x', ('y', 1)]})
+
+    @testing.requires_version('3.2')
+    @testing.foreach(open, gzip.open, bz2.open)
+    def testFromFile(self, opener):
+        from chempy import io
+        data = {'names': ['obj', ('x', b'\x00\x01')], 'view': [0.5] * 18}
+
+        with testing.mktemp('.pse') as filename:
+            with opener(filename, 'wb') as handle:
+                handle.write(self._legacy_dumps(data))
+            self.assertEqual(io.pkl.fromFile(filename), data)
+
+    @testing.requires_version('3.2')
+    def testLoadPze(self):
+        cmd.fragment('gly')
+        with testing.mktemp('.pze') as filename:
+            cmd.save(filename)
+            cmd.delete('*')
+            cmd.load(filename)
+        self.assertEqual(cmd.count_atoms('gly'), 7)
@@ -0,0 +1,129 @@
+from pymol import cmd, testing
+
+class TestChempyRotamer(testing.PyMOLTestCase):
+
+    @testing.requires_version('3.2')
+    @testing.foreach('arg', 'his', 'ile', 'trp')
+    def testBuild(self, name):
+        import numpy
+        from chempy import fragments, rotamer
+
+        template = rotamer.Template.from_model(fragments.get(name))
+        rotamers = rotamer.get_library().get_rotamers(name.upper())
+        torsions, angles, freq = template.get_angles(rotamers)
+        self.assertEqual(angles.shape, (len(rotamers), len(torsions)))
+
+        xyz = template.build(rotamers)
+        self.assertEqual(xyz.shape, (len(rotamers),) + template.coords.shape)
+        self.assertArrayEqual(template.build(rotamer.get_rotamers(
+            name.upper())).ravel().tolist(), xyz.ravel().tolist(), delta=1e-6)
+
+        # all library torsions apply (ILE chi2 is "CD1+CD")
+        self.assertEqual(len(torsions), len(set().union(*rotamers)) - 1)
+
+        for (k, torsion) in enumerate(torsions):
+            i = [template.index[n] for n in template.resolve(torsion)]
+            delta = (rotamer.dihedral(*[xyz[:, j] for j in i]) -
+                     angles[:, k] + 180.0) % 360.0 - 180.0
+            self.assertArrayEqual(delta.tolist(), [0.0] * len(delta), delta=1e-6)
+
+        # backbone does not move, bond lengths are kept
+        for n in ('N', 'CA', 'C', 'O'):
+            i = template.index[n]
+            self.assertArrayEqual((xyz[:, i] - template.coords[i]).ravel()
+                    .tolist(), [0.0] * (3 * len(xyz)), delta=1e-6)
+        for (i, adjacent) in enumerate(template.adjacent):
+            for j in adjacent:
+                d0 = numpy.linalg.norm(template.coords[i] - template.coords[j])
+                d = numpy.linalg.norm(xyz[:, i] - xyz[:, j], axis=1)
+                self.assertArrayEqual(d.tolist(), [d0] * len(d), delta=1e-6)
+
+    @testing.requires_version('3.2')
+    def testScore(self):
+        import numpy
+        from chempy import rotamer
+
+        rng = numpy.random.RandomState(123)
+        coords = rng.uniform(-10., 10., (800, 3))
+        symbols = ['C', 'N', 'O', 'S'] * 200
+        points = rng.uniform(-8., 8., (5, 7, 3))
+        env = rotamer.Environment(coords, symbols)
+
+        score = env.score(points, ['C'] * 7, [0, 1, 2])
+        radii = rotamer.get_vdw(symbols)
+        dist = numpy.sqrt(((points[:, :, None] - coords) ** 2).sum(-1))
+        overlap = numpy.maximum(0.0, 0.8 * (1.7 + radii) - dist)
+        overlap[:, :, :3] = 0.0
+        self.assertArrayEqual(score.tolist(), overlap.sum((1, 2)).tolist(),
+                              delta=1e-6)
+
+    @testing.requires_version('3.2')
+    def testScan(self):
+        import numpy
+        from chempy import fragments, rotamer
+
+        template = rotamer.Template.from_model(fragments.get('ile'),
+                                               hydrogens=False)
+        rotamers = rotamer.get_rotamers('ILE')
+
+        # non-ideal backbone
+        backbone = dict((n, template.coords[template.index[n]] + d)
+                for (n, d) in zip(('N', 'CA', 'C'), ([0.3, -0.2, 0.1],
+                    [0., 0., 0.], [-0.1, 0.2, 0.])))
+        env = rotamer.Environment(numpy.zeros((0, 3)), [])
+        result = rotamer.scan(template, rotamers, backbone, env)
+
+        xyz = result['coords']
+        for (n, p) in backbone.items():
+            self.assertArrayEqual(xyz[:, template.index[n]], [p] * len(xyz),
+                                  delta=1e-6)
+        for (k, torsion) in enumerate(result['torsions']):
+            i = [template.index[n] for n in template.resolve(torsion)]
+            delta = (rotamer.dihedral(*[xyz[:, j] for j in i]) -
+                     result['chi'][:, k] + 180.0) % 360.0 - 180.0
+            self.assertArrayEqual(delta, [0.0] * len(delta), delta=1e-6)
+
+    @testing.requires_version('3.2')
+    def testLibrary(self):
+        from chempy import rotamer
+        chi1 = ('N', 'CA', 'CB', 'OG')
+        dep = {
+            ('SER', -60, -40): [{chi1: 60.0, 'FREQ': 0.7}, {chi1: -60.0, 'FREQ': 0.3}],
+            ('SER', 120, 120): [{chi1: 180.0, 'FREQ': 1.0}],
+        }
+        ind = {
+            'SER': [{chi1: 65.0, 'FREQ': 0.5}, {chi1: -65.0, 'FREQ': 0.5}],
+            'VAL': [{('N', 'CA', 'CB', 'CG1'): 175.0, 'FREQ': 1.0}],
+        }
+
+        with testing.mktemp('.bin') as filename:
+            with open(filename, 'wb') as handle:
+                handle.write(rotamer.Library.convert(dep, ind))
+            library = rotamer.Library.open(filename)
+
+            self.assertEqual(library.residues, ['SER', 'VAL'])
+            self.assertEqual(library.get_rotamers('SER', -62, -38), dep['SER', -60, -40])
+            # 10 degree bin (-60, -50) is missing, 20 degree rounding
+            self.assertEqual(library.get_rotamers('SER', -58, -52), dep['SER', -60, -40])
+            # 60 degree rounding
+            self.assertEqual(library.get_rotamers('SER', 100, 100), dep['SER', 120, 120])
+            self.assertEqual(library.get_rotamers('SER'), ind['SER'])
+            self.assertEqual(library.get_rotamers('VAL', -60, -40), None)
+            self.assertEqual(library.get_rotamers('VAL'), ind['VAL'])
+            self.assertEqual(library.get_rotamers('GLY'), None)
+
+            torsions, angles, freq = library.get('SER', -60, -40)
+            self.assertEqual(torsions, [chi1])
+            self.assertEqual(angles.tolist(), [[60.0], [-60.0]])
+            self.assertEqual(freq.tolist(), [0.7, 0.3])
+            del library, torsions, angles, freq
+
+    @testing.requires_version('3.2')
+    def testLibraryPickles(self):
+        import chempy
+        from chempy import io, rotamer
+        ind = io.pkl.fromFile(chempy.path + 'sidechains/sc_bb_ind.pkl')
+        library = rotamer.get_library()
+        self.assertTrue(library is rotamer.get_library())
+        for resn in ind:
+            self.assertEqual(library.get_rotamers(resn), ind[resn])
@@ -59,3 +59,42 @@ class TestCIF(testing.PyMOLTestCase):
         cmd.load(self.datafile('4m4b-minimal-w-assembly.cif'))
         self.assertEqual(cmd.count_states(), 2)
         self.assertEqual(cmd.get_chains(), ['B'])
+
+    def test_parse_cif_stream(self):
+        import gzip
+        import io
+        from chempy.cif import parse_cif, parse_cif_stream
+
+        filename = self.datafile('1v5a-3models.cif')
+        with open(filename) as handle:
+            block, = parse_cif(handle.read())
+        with open(filename, 'rb') as handle:
+            gzcontents = gzip.compress(handle.read())
+        block_s, = parse_cif_stream(io.BytesIO(gzcontents))
+
+        self.assertEqual(block.name, block_s.name)
+        self.assertEqual(block.key_value, block_s.key_value)
+        self.assertEqual(len(block.loops), len(block_s.loops))
+
+        for (loop, loop_s) in zip(block.loops, block_s.loops):
+            self.assertEqual(loop.keys, loop_s.keys)
+            self.assertEqual(loop.rows, loop_s.rows)
+
+        loop = block_s.loops[[('_atom_site_cartn_x' in loop.keys)
+            for loop in block_s.loops].index(True)]
+        self.assertEqual(len(loop), 387 * 3)
+        x = loop.get_array('_atom_site.cartn_x')
+        self.assertEqual(x.dtype.kind, 'f')
+        self.assertAlmostEqual(x[0], float(loop.rows[0][loop.keys['_atom_site_cartn_x']]))
+        self.assertEqual(loop.get_str('_atom_site.label_atom_id')[0], 'N')
+
+    def test_cif_stream_model(self):
+        from chempy.cif import CIF
+        filename = self.datafile('1v5a-3models.cif')
+        rec = CIF(filename).read()
+        rec_s = CIF(filename, stream=True).read()
+        self.assertEqual(rec_s.model.nAtom, rec.model.nAtom)
+        self.assertEqual(list(rec_s.model.atom['name']),
+                [a.name for a in rec.model.atom])
+        self.assertArrayEqual(rec_s.model.coord, rec.model.get_coord_list())
+        self.assertArrayEqual(rec_s.extra_coords.ravel(), rec.extra_coords)
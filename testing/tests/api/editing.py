@@ -149,6 +149,35 @@ class TestEditing(testing.PyMOLTestCase):
         self.assertEqual(v_xyz_1_post, v_xyz_1_pre)
         self.assertEqual(v_xyz_2_post, v_mock)
 
+    @testing.requires_version('3.2')
+    def testSetProperties(self):
+        import numpy
+        cmd.fragment('ala')
+        cmd.create('ala', 'ala', 1, 2)
+        n = cmd.count_atoms('all')
+
+        r = cmd.set_properties('all', {
+            'b': numpy.arange(n) * 1.5,
+            'chain': 'X',
+            'resn': ['ALB'] * n,
+        })
+        self.assertEqual(r, n)
+        self.assertEqual(cmd.count_atoms('chain X & resn ALB'), n)
+        self.assertArrayEqual(cmd.get_properties('all', 'b'),
+                              numpy.arange(n) * 1.5, delta=1e-4)
+
+        xyz_1 = cmd.get_coords('all', 1)
+        cmd.set_properties('all', {'z': numpy.arange(n)}, state=2)
+        xyz_2 = cmd.get_coords('all', 2)
+        self.assertArrayEqual(xyz_2[:, 2], numpy.arange(n), delta=1e-4)
+        self.assertArrayEqual(xyz_2[:, :2], xyz_1[:, :2], delta=1e-4)
+        self.assertArrayEqual(cmd.get_coords('all', 1), xyz_1, delta=1e-4)
+
+        with self.assertRaises(CmdException):
+            cmd.set_properties('all', {'b': [1.0, 2.0]})
+        with self.assertRaises(CmdException):
+            cmd.set_properties('all', {'b = 1; q': 1.0})
+
     def test_alter_list(self):
         cmd.fragment('gly')
         cmd.alter_list('gly', [[i+1, 'name = "X%d"' % i] for i in range(7)])
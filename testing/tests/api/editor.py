@@ -2,6 +2,7 @@
 Testing: pymol.editor
 '''
 
+import pymol
 from pymol import cmd, testing, stored, editor
 
 class TestEditorFab(testing.PyMOLTestCase):
@@ -63,3 +64,99 @@ class TestEditorFab(testing.PyMOLTestCase):
     def testSS(self, ss):
         cmd.fab('AAAPAAA', 'm1', ss=ss)
 
+    @testing.requires_version('3.2')
+    @testing.foreach.product((1, 2, 3, 4), (1, -1))
+    def testSSGeometry(self, ss, dir):
+        phi, psi = editor._ss_phi_psi.get(ss, (180., 180.))
+        cmd.fab('ACDEFGHIKLMNQRSTVWY', 'm1', ss=ss, dir=dir)
+        self.assertEqual(cmd.count_atoms('m1 & name CA'), 19)
+        self.assertEqual(cmd.count_atoms('m1 & name CA & bound_to name N'), 19)
+
+        ca = 'm1 & name CA'
+        v = cmd.get_phipsi('%s & !(first (%s)) & !(last (%s))' % (ca, ca, ca))
+        self.assertEqual(len(v), 17)
+        for (phi_i, psi_i) in v.values():
+            self.assertAlmostEqual(phi_i % 360, phi % 360, delta=0.1)
+            self.assertAlmostEqual(psi_i % 360, psi % 360, delta=0.1)
+
+        # dir=-1 numbers the residues down from 1, escape negative resi
+        resv = []
+        cmd.iterate(ca, 'resv_append(resv)', space={'resv_append': resv.append})
+        r5, r6 = sorted(resv)[4:6]
+        v = cmd.get_dihedral('m1 & resi \\%d & name CA' % r5,
+                             'm1 & resi \\%d & name C' % r5,
+                             'm1 & resi \\%d & name N' % r6,
+                             'm1 & resi \\%d & name CA' % r6)
+        self.assertAlmostEqual(abs(v), 180., delta=0.1)
+
+    @testing.requires_version('3.2')
+    def testCaps(self):
+        cmd.fab('BAAZ', 'm1', ss=1)
+        self.assertEqual(cmd.count_atoms('m1 & name CA'), 2)
+        self.assertEqual(cmd.count_atoms('m1 & resn ACE+NME & !hydro'), 5)
+        self.assertEqual(cmd.count_atoms('m1 & resn ACE & name C & '
+                                         'bound_to (resn ALA & name N)'), 1)
+        self.assertEqual(cmd.count_atoms('m1 & resn NME & name N & '
+                                         'bound_to (resn ALA & name C)'), 1)
+
+    @testing.requires_version('3.2')
+    def testPeptideModel(self):
+        model = editor.peptide_model('ACD F/20/ GG', chain='A', hydro=0)
+        v = [(a.chain, a.resi, a.resn) for a in model.atom if a.name == 'CA']
+        self.assertEqual(v, [('A', '1', 'ALA'), ('A', '2', 'CYS'), ('A', '3', 'ASP'),
+                             ('F', '20', 'GLY'), ('F', '21', 'GLY')])
+        self.assertFalse([a for a in model.atom if a.symbol == 'H'])
+        self.assertRaises(ValueError, editor.peptide_model, 'AZA')
+
+    @testing.requires_version('3.2')
+    def testBatch(self):
+        v = cmd.fab_batch(['ACD', 'EFGH', 'm9:KLM'], prefix='p', ss=2)
+        self.assertEqual(v, ['p1', 'p2', 'm9'])
+        self.assertEqual(cmd.get_object_list(), ['p1', 'p2', 'm9'])
+        self.assertEqual(cmd.get_fastastr('m9').splitlines()[1], 'KLM')
+        self.assertRaises(pymol.CmdException, cmd.fab_batch, 'AXA')
+
+
+
+class TestEditorRotamerScan(testing.PyMOLTestCase):
+
+    @testing.requires_version('3.2')
+    def testRotamerScan(self):
+        from chempy.rotamer import dihedral
+        cmd.fab('AAAAFAAAAA', 'm1', ss=1)
+        xyz = cmd.get_coords('m1')
+
+        r = cmd.rotamer_scan('m1 & resi 5')
+        self.assertEqual(len(r), 1)
+        r = r[0]
+        self.assertEqual((r['model'], r['resi'], r['resn']), ('m1', '5', 'PHE'))
+        n = len(r['score'])
+        self.assertTrue(n > 1)
+        self.assertTrue(all(a <= b for (a, b) in zip(r['score'], r['score'][1:])))
+        self.assertEqual(r['coords'].shape, (n, len(r['names']), 3))
+
+        # chi angles are applied
+        for (k, torsion) in enumerate(r['torsions']):
+            i = [r['names'].index(name) for name in torsion]
+            chi = dihedral(*[r['coords'][:, j] for j in i])
+            delta = (chi - r['chi'][:, k] + 180.0) % 360.0 - 180.0
+            self.assertArrayEqual(delta.tolist(), [0.0] * n, delta=1e-3)
+
+        # not modified
+        self.assertArrayEqual(cmd.get_coords('m1'), xyz, delta=1e-6)
+
+    @testing.requires_version('3.2')
+    def testRotamerScanMutate(self):
+        cmd.fab('AAAAAAAAAA', 'm1', ss=1)
+        serial = cmd.rotamer_scan('m1 & resi 4-6', 'LEU+TRP')
+        self.assertEqual([(x['resi'], x['resn']) for x in serial], [
+            ('4', 'LEU'), ('4', 'TRP'),
+            ('5', 'LEU'), ('5', 'TRP'),
+            ('6', 'LEU'), ('6', 'TRP'),
+        ])
+        self.assertTrue('CZ2' in serial[1]['names'])
+
+        parallel = cmd.rotamer_scan('m1 & resi 4-6', 'LEU+TRP', processes=2)
+        for (a, b) in zip(serial, parallel):
+            self.assertArrayEqual(a['score'].tolist(), b['score'].tolist(),
+                                  delta=1e-6)
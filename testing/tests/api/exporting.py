@@ -2,6 +2,7 @@
 unit tests for pymol.exporting
 '''
 
+import gzip
 import os
 import sys
 import tempfile
@@ -17,6 +18,70 @@ class TestExporting(testing.PyMOLTestCase):
         for action in pymol.exporting.cache_action_dict:
             cmd.cache(action)
 
+    @testing.requires('no_edu') # ray
+    def testCacheStatus(self):
+        cmd.cache('clear')
+        cmd.cache('enable')
+        cmd.fragment('gly')
+        cmd.show_as('surface')
+        cmd.rebuild()
+        cmd.ray(10, 10)
+        status = cmd.cache('status')
+        self.assertEqual(status['entries'], 1)
+        self.assertEqual(status['misses'], 1)
+        self.assertEqual(status['bytes'], status['size'] * 4)
+
+        cmd.rebuild()
+        cmd.ray(10, 10)
+        self.assertEqual(cmd.cache('status')['hits'], 1)
+
+        cmd.set('cache_max', 1)
+        cmd.create('m2', 'gly')
+        cmd.translate([5., 0., 0.], 'm2', camera=0)
+        cmd.show_as('surface', 'm2')
+        cmd.ray(10, 10)
+        status = cmd.cache('status')
+        self.assertEqual(status['entries'], 1)
+        self.assertEqual(status['evictions'], 1)
+
+    @testing.requires('no_edu') # ray
+    def testCacheDisk(self):
+        from unittest import mock
+        with testing.mkdtemp() as dirname, \
+                mock.patch.dict(os.environ, {'PYMOL_CACHE_DIR': dirname}):
+            cmd._pymol.__dict__.pop('_cache_disk', None)
+            try:
+                cmd.cache('clear')
+                cmd.cache('enable')
+                cmd.fragment('gly')
+                cmd.show_as('surface')
+                cmd.ray(10, 10)
+                self.assertEqual(cmd.cache('status')['disk_writes'], 1)
+
+                # fresh memory cache, surface comes from disk
+                cmd.cache('clear')
+                cmd.rebuild()
+                cmd.ray(10, 10)
+                status = cmd.cache('status')
+                self.assertEqual(status['disk_hits'], 1)
+                self.assertEqual(status['entries'], 1)
+            finally:
+                cmd._pymol.__dict__.pop('_cache_disk', None)
+
+    @testing.requires_version('3.2')
+    def testCacheDiskUnsafe(self):
+        from unittest import mock
+        from pymol.internal import DiskCache
+        with testing.mkdtemp() as dirname, \
+                mock.patch.dict(os.environ, {'PYMOL_CACHE_DIR': dirname}):
+            disk = DiskCache.from_environ()
+            disk.set(('in', [1, 2]), ((1.0, 2.0), [3]))
+            self.assertEqual(disk.get(('in', [1, 2])), ((1.0, 2.0), [3]))
+
+            # anyone could place files there
+            os.chmod(dirname, 0o777)
+            self.assertIsNone(DiskCache.from_environ())
+
     def testCopyImage(self):
         cmd.copy_image
         self.skipTest("TODO")
@@ -123,6 +188,77 @@ class TestExporting(testing.PyMOLTestCase):
             cmd.load(filenames_full[1])
             self.assertEqual(cmd.count_atoms(), 24)
 
+    @testing.requires_version('3.2')
+    def testMultifilesaveThreads(self):
+        import glob
+
+        cmd.fragment('ala')
+        cmd.fragment('gly')
+        for i in range(2, 6):
+            cmd.create('ala', 'ala', 1, i)
+
+        contents = []
+        for threads in [1, 3]:
+            with testing.mkdtemp() as dirname:
+                cmd.multifilesave(os.path.join(dirname, '{}-{}.sdf.gz'), '*',
+                        0, threads=threads)
+                filenames = sorted(glob.glob(os.path.join(dirname, '*.gz')))
+                self.assertEqual(len(filenames), 6)
+                contents.append([])
+                for f in filenames:
+                    with gzip.open(f) as handle:
+                        contents[-1].append(handle.read())
+
+        self.assertEqual(contents[0], contents[1])
+
+    @testing.foreach('sdf', 'mol2', 'xyz', 'mae', 'cif')
+    @testing.requires_version('3.2')
+    def testSaveMultistate(self, fmt):
+        import bz2
+        cmd.fragment('ala')
+        cmd.fragment('gly')
+        for i in range(2, 5):
+            cmd.create('ala', 'ala', 1, i)
+            cmd.translate([i, 0, 0], 'ala', state=i)
+        cmd.create('gly', 'gly', 1, 3)
+
+        expected = cmd.get_bytes(fmt, 'all', 0)
+
+        for ext, fopen in [('', open), ('.gz', gzip.open), ('.bz2', bz2.open)]:
+            with testing.mktemp('.' + fmt + ext) as filename:
+                cmd.save(filename, 'all', 0)
+                with fopen(filename, 'rb') as handle:
+                    self.assertEqual(handle.read(), expected)
+
+    @testing.requires_version('3.2')
+    def testSaveFailureKeepsFile(self):
+        import glob
+        from pymol.exporting import _save_write
+
+        def chunks():
+            yield 'partial\n'
+            raise ValueError('export failed')
+
+        with testing.mkdtemp() as dirname:
+            filename = os.path.join(dirname, 'out.pdb')
+            with open(filename, 'w') as handle:
+                handle.write('previous\n')
+
+            with self.assertRaises(ValueError):
+                _save_write(filename, '', chunks())
+
+            with open(filename) as handle:
+                self.assertEqual(handle.read(), 'previous\n')
+            self.assertEqual(os.listdir(dirname), ['out.pdb'])
+
+            # gzip header has the final name, not the temporary one
+            cmd.fragment('gly')
+            cmd.save(filename + '.gz')
+            with open(filename + '.gz', 'rb') as handle:
+                self.assertIn(b'out.pdb\0', handle.read(100))
+            self.assertEqual(sorted(glob.glob(dirname + '/*')),
+                    [filename, filename + '.gz'])
+
     @testing.foreach(
         ('0.5in', '0.25in', 200, (100, 50)),   # inch
         ('2.54cm', '1.27cm', 100, (100, 50)),  # centimeter
@@ -154,6 +290,26 @@ class TestExporting(testing.PyMOLTestCase):
         self.assertEqual(img.shape[:2], (nrow, ncol))
         self.assertImageHasColor('yellow', img)
 
+    @testing.requires('no_edu') # ray
+    @testing.requires_version('3.2')
+    def testPngRawRGBA(self):
+        self.ambientOnly()
+        cmd.fragment('gly')
+        cmd.show_as('spheres')
+        cmd.color('yellow')
+        cmd.zoom(complete=1)
+
+        ncol, nrow = 120, 80
+        cmd.ray(ncol, nrow)
+        buf = cmd.png(None, prior=1, format='rgba')
+        self.assertEqual(len(buf), ncol * nrow * 4)
+        import io
+        import numpy
+        img = numpy.frombuffer(buf, numpy.uint8).reshape((nrow, ncol, 4))
+        self.assertImageHasColor('yellow', img)
+        ref = Image.open(io.BytesIO(cmd.png(None, prior=1)))
+        self.assertArrayEqual(img, numpy.asarray(ref.convert('RGBA')))
+
     # not supported in older versions: xyz (no ref)
     @testing.foreach('pdb', 'sdf', 'mol', 'mol2')
     def testSaveRef(self, format):
@@ -27,6 +27,47 @@ class TestFitting(testing.PyMOLTestCase):
         self.assertEqual(alen, 40)
         self.assertEqual(alen, cmd.count_atoms("aln") / 2)
 
+    @testing.requires_version('3.2')
+    def testAlignAll(self):
+        cmd.load(self.datafile("1oky-frag.pdb"), "m1")
+        cmd.load(self.datafile("1t46-frag.pdb"), "m2")
+        cmd.create("m3", "m1")
+        xyz = cmd.get_coords("m1")
+
+        r = cmd.align_all("m1 m2 m3", method="cealign", processes=2)
+        self.assertEqual(r["mobiles"], ["m1", "m2", "m3"])
+        self.assertEqual(r["targets"], ["m1", "m2", "m3"])
+        self.assertEqual(r["rmsd"].shape, (3, 3))
+        self.assertEqual(r["matrix"].shape, (3, 3, 16))
+        self.assertArrayEqual(r["rmsd"].diagonal(), [0.0] * 3)
+        self.assertAlmostEqual(r["rmsd"][0, 2], 0.0, delta=1e-3)
+        # identical copy, cealign aligns whole windows (40 of 42 CA)
+        self.assertAlmostEqual(r["tm_score"][0, 2],
+                r["length"][0, 2] / cmd.count_atoms("m1 & guide"), delta=1e-3)
+
+        ref = cmd.cealign("m2", "m1", transform=0)
+        self.assertAlmostEqual(r["rmsd"][0, 1], ref["RMSD"], delta=1e-3)
+        self.assertEqual(r["length"][0, 1], ref["alignment_length"])
+
+        # objects are not modified unless requested
+        self.assertArrayEqual(cmd.get_coords("m1"), xyz, delta=1e-4)
+
+        ref = cmd.align("m1 & guide", "m2 & guide", transform=0)
+        r = cmd.align_all("m1", "m2", method="align", processes=1,
+                          transform=1)
+        self.assertAlmostEqual(r["rmsd"][0, 0], ref[0], delta=1e-3)
+        self.assertEqual(r["length"][0, 0], ref[1])
+
+        # m1 superposed onto m2
+        matrix = r["matrix"][0, 0].reshape((4, 4))
+        self.assertArrayEqual(cmd.get_coords("m1"),
+                              xyz.dot(matrix[:3, :3].T) + matrix[:3, 3],
+                              delta=1e-3)
+
+        # errors other than failed alignments are not hidden
+        self.assertRaises(TypeError, cmd.align_all, "m1", "m2",
+                          method="align", processes=1, no_such_argument=1)
+
     def testFit(self):
         cmd.fragment("gly", "m1")
         cmd.create("m2", "m1")
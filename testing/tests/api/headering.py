@@ -46,3 +46,42 @@ class TestHeadering(testing.PyMOLTestCase):
         ])
 
         self.assertEqual(header.getColumnsOfType("W"), ['cryst_1/data_1/FOM'])
+
+    def testCache(self):
+        filename = self.datafile('4rwb.mtz')
+        header = headering.MTZHeader(filename)
+        header.datasets['0']['name'] = 'modified'
+
+        # parsed once per file, copies are independent
+        header2 = headering.MTZHeader(filename)
+        self.assertEqual(header2.datasets['0']['name'], 'HKL_base')
+        self.assertEqual(header2.reso_max, header.reso_max)
+        self.assertEqual(header2.getColumnsOfType("W"), ['cryst_1/data_1/FOM'])
+
+    def testCIF(self):
+        content = (
+            'data_r1abcsf\n'
+            '_cell.length_a 40.930\n'
+            'loop_\n'
+            '_symmetry_equiv.id\n'
+            '_symmetry_equiv.pos_as_xyz\n'
+            '1 x,y,z\n'
+            'loop_\n'
+            '_refln.index_h\n'
+            '_refln.index_k\n'
+            '_refln.index_l\n'
+            '_refln.F_meas_au\n'
+            '_refln.F_meas_sigma_au\n'
+        ) + '1 2 3 45.6 1.2\n' * 100 + (
+            'data_r1abcsf2\n'
+            'loop_\n'
+            '_refln.index_h\n'
+            '_refln.intensity_meas\n'
+        )
+        with testing.mkdtemp() as path:
+            filename = os.path.join(path, 'r1abcsf.cif')
+            with open(filename, 'w') as handle:
+                handle.write(content)
+            header = headering.CIFHeader(filename)
+            self.assertEqual(header.getColumns(), ['index_h', 'index_k',
+                'index_l', 'F_meas_au', 'F_meas_sigma_au'])
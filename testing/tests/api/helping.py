@@ -37,6 +37,33 @@ class TestHelping(testing.PyMOLTestCase):
             cmd.help('color')
             self.assertTrue('USAGE\n\n    color color' in out.getvalue())
 
+    def testApiLazy(self):
+        # commands from lazily imported modules
+        with patch('sys.stdout', new=StringIO()) as out:
+            self.assertTrue(cmd.api("align") is cmd.keyword['align'][0])
+            self.assertTrue('API: pymol.fitting.align' in out.getvalue())
+            self.assertTrue('fitting.py' in out.getvalue())
+
+    def testHelpLazy(self):
+        with patch('sys.stdout', new=StringIO()) as out:
+            cmd.help('morph')
+            self.assertTrue('Creates an interpolated trajectory' in
+                    out.getvalue())
+
+    def testLazyCommand(self):
+        import inspect
+        func = cmd.keyword['rms_cur'][0]
+        self.assertEqual(func.__name__, 'rms_cur')
+        self.assertTrue('_self' in inspect.signature(func).parameters)
+        self.assertEqual(func.__module__, 'pymol.fitting')
+        # the stand-in class keeps its own docstring and module
+        self.assertTrue('Stand-in' in type(func).__doc__)
+        self.assertEqual(type(func).__module__, 'pymol.api')
+        cmd.fragment('gly')
+        cmd.create('m2', 'gly')
+        cmd.do('rms_cur gly, m2')
+        self.assertAlmostEqual(cmd.rms_cur('gly', 'm2'), 0.0)
+
     @testing.requires_version('2.5')
     def testHelp_dedent(self):
         with patch('sys.stdout', new=StringIO()) as out:
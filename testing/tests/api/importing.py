@@ -113,6 +113,100 @@ class TestImporting(testing.PyMOLTestCase):
             names += ['1aq5_%04d' % (i+1) for i in range(20)]
             self.assertItemsEqual(cmd.get_names(), names)
 
+    @testing.requires_version('3.2')
+    def testFetchConcurrent(self):
+        import functools
+        import http.server
+        import threading
+        from unittest import mock
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        handler = functools.partial(Handler,
+                directory=self.datafile('pdb.mirror'))
+        server = http.server.ThreadingHTTPServer(('localhost', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        # first mirror is not reachable, second one serves the files
+        hosts = 'http://localhost:%d http://localhost:%d' % (
+                _get_free_port(), server.server_address[1])
+
+        try:
+            with testing.mkdtemp() as fetch_path, mock.patch.dict(
+                    pymol.importing.hostPaths,
+                    {'pdb': ['/data/structures/divided/pdb/{mid}/pdb{code}.ent.gz']}):
+                cmd.set('fetch_path', fetch_path)
+                cmd.set('fetch_host', hosts)
+                cmd.fetch('1avy 1aq5 1avyB', type='pdb')
+                self.assertItemsEqual(cmd.get_names(), ['1avy', '1aq5', '1avyB'])
+                self.assertEqual(cmd.get_chains('1avyB'), ['B'])
+                self.assertEqual(cmd.count_states('1aq5'), 20)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @testing.requires_version('3.2')
+    def testFetchProxy(self):
+        import functools
+        import http.server
+        import threading
+        from unittest import mock
+        from urllib.parse import urlsplit
+
+        requested = []
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                # proxy requests have the absolute URL as path
+                requested.append(self.path)
+                self.path = urlsplit(self.path).path
+                super().do_GET()
+
+        handler = functools.partial(Handler,
+                directory=self.datafile('pdb.mirror'))
+        server = http.server.ThreadingHTTPServer(('localhost', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        port = server.server_address[1]
+        environ = {
+            'http_proxy': 'http://localhost:%d' % port,
+            'no_proxy': '',
+        }
+
+        try:
+            with testing.mkdtemp() as fetch_path, mock.patch.dict(
+                    pymol.importing.hostPaths,
+                    {'pdb': ['/data/structures/divided/pdb/{mid}/pdb{code}.ent.gz']}
+                    ), mock.patch.dict(os.environ, environ):
+                cmd.set('fetch_path', fetch_path)
+
+                # unresolvable host, only reachable through the proxy
+                cmd.set('fetch_host', 'http://pdb.invalid')
+                cmd.fetch('1avy', type='pdb')
+                self.assertEqual(cmd.get_names(), ['1avy'])
+                self.assertEqual(requested, ['http://pdb.invalid'
+                    '/data/structures/divided/pdb/av/pdb1avy.ent.gz'])
+
+                # no_proxy bypasses the (now unreachable) proxy
+                os.environ['http_proxy'] = 'http://localhost:%d' % (
+                        _get_free_port(), )
+                os.environ['no_proxy'] = 'localhost'
+                cmd.set('fetch_host', 'http://localhost:%d' % port)
+                cmd.fetch('1aq5', type='pdb')
+                self.assertEqual(cmd.get_names(), ['1avy', '1aq5'])
+                self.assertEqual(requested[-1],
+                    '/data/structures/divided/pdb/aq/pdb1aq5.ent.gz')
+        finally:
+            server.shutdown()
+            server.server_close()
+
     def testFinishObject(self):
         # Disclaimer: I don't know the relevance of load(..., finish=0) and
         # finish_object(), but it does call ObjectMoleculeUpdateIDNumbers
@@ -545,6 +639,74 @@ class TestImporting(testing.PyMOLTestCase):
         e = cmd.get_extent('test_PHE_pentamer')
         self.assertArrayEqual(e, [[-3.141,-3.036,-2.809], [15.920, 10.425, 8.680]], delta=1e-3)
 
+    @testing.requires_version('3.2')
+    @testing.foreach('binary_little_endian', 'binary_big_endian')
+    def testLoadPLYBinary(self, fmt):
+        import numpy
+        from pymol import cgo
+        coords = [(0., 0., 0.), (2., 0., 0.), (2., 3., 0.), (0., 3., 4.)]
+        colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
+        faces = [(0, 1, 2), (0, 1, 2, 3), (1, 2, 3)]
+
+        def header(fmt):
+            return ('ply\nformat %s 1.0\nelement vertex 4\n'
+                    'property float x\nproperty float y\nproperty float z\n'
+                    'property uchar red\nproperty uchar green\nproperty uchar blue\n'
+                    'element face 3\nproperty list uchar int vertex_indices\n'
+                    'end_header\n' % fmt)
+
+        ascii = header('ascii') + ''.join(
+            '%g %g %g %d %d %d\n' % (v + c) for (v, c) in zip(coords, colors)
+        ) + ''.join('%d %s\n' % (len(f), ' '.join(map(str, f))) for f in faces)
+
+        e = '<' if fmt == 'binary_little_endian' else '>'
+        vertex = numpy.zeros(4, [('xyz', e + 'f4', 3), ('rgb', 'u1', 3)])
+        vertex['xyz'] = coords
+        vertex['rgb'] = colors
+        face = b''.join(numpy.array([len(f)], 'u1').tobytes() +
+                        numpy.array(f, e + 'i4').tobytes() for f in faces)
+        binary = header(fmt).encode() + vertex.tobytes() + face
+
+        self.assertArrayEqual(cgo.from_plystr(binary),
+                              cgo.from_plystr(ascii), delta=1e-6)
+
+        # vertex operations in file order, quads as two triangles
+        expected = [cgo.BEGIN, cgo.TRIANGLES]
+        for f in faces:
+            if len(f) == 4:
+                f = [f[j] for j in (0, 1, 2, 2, 3, 0)]
+            for i in f:
+                expected += [cgo.COLOR] + [c / 255. for c in colors[i]]
+                expected += [cgo.VERTEX] + list(coords[i])
+        expected += [cgo.END, cgo.STOP]
+        self.assertArrayEqual(cgo.from_plystr(ascii, False), expected,
+                              delta=1e-6)
+
+        with testing.mktemp('.ply') as filename:
+            with open(filename, 'wb') as handle:
+                handle.write(binary)
+            cmd.load(filename, 'm1')
+        e = cmd.get_extent('m1')
+        self.assertArrayEqual(e, [[0., 0., 0.], [2., 3., 4.]], delta=1e-3)
+
+    @testing.requires_version('3.2')
+    @testing.foreach('ascii', 'binary_little_endian', 'binary_big_endian')
+    def testLoadPLYNoFaces(self, fmt):
+        import numpy
+        from pymol import cgo
+        # point cloud export
+        contents = ('ply\nformat %s 1.0\nelement vertex 2\n'
+                    'property float x\nproperty float y\nproperty float z\n'
+                    'element face 0\nproperty list uchar int vertex_indices\n'
+                    'end_header\n' % fmt).encode()
+        if fmt == 'ascii':
+            contents += b'0 0 0\n1 2 3\n'
+        else:
+            e = '<' if fmt == 'binary_little_endian' else '>'
+            contents += numpy.array([[0, 0, 0], [1, 2, 3]], e + 'f4').tobytes()
+        self.assertEqual(cgo.from_plystr(contents),
+                         [cgo.BEGIN, cgo.TRIANGLES, cgo.END, cgo.STOP])
+
     @testing.requires_version('1.8.4')
     def testLoadMMTF(self):
         cmd.load(self.datafile("3njw.mmtf.gz"))
@@ -565,6 +727,29 @@ class TestImporting(testing.PyMOLTestCase):
         self.assertEqual(13, cmd.count_atoms('organic'))
         self.assertEqual(5, cmd.count_atoms('inorganic'))
 
+    @testing.requires_version('3.2')
+    def testLoadMMTF_python(self):
+        # Python fallback reader, goes through FastModel.convert_to_indexed
+        pymol.importing.load_mmtf(self.datafile("3njw.mmtf.gz"), 'm1')
+        self.assertEqual(169, cmd.count_atoms())
+        symmetry = cmd.get_symmetry('m1')
+        self.assertArrayEqual(symmetry[:6], [19.465, 21.432, 29.523, 90.0, 90.0, 90.0], delta=1e-4)
+        self.assertEqual(symmetry[6], 'P 21 21 21')
+
+    def testMMTFFastModels(self):
+        from chempy.mmtf import MmtfReader
+        data = MmtfReader.from_url(self.datafile("1x8x.mmtf.gz"))
+        models = data.to_chempy()
+        fast_models = data.to_fast_models()
+        self.assertEqual(len(models), len(fast_models))
+        for (model, fast) in zip(models, fast_models):
+            self.assertEqual(fast.nAtom, model.nAtom)
+            self.assertEqual(fast.nBond, model.nBond)
+            self.assertEqual(list(fast.atom['name']), [a.name for a in model.atom])
+            self.assertEqual(list(fast.atom['resi_number']), [a.resi_number for a in model.atom])
+            self.assertArrayEqual(fast.coord, model.get_coord_list(), delta=1e-4)
+            self.assertEqual(fast.bond['index'].tolist(), [b.index for b in model.bond])
+
     @testing.requires_version('1.8.4')
     def testLoadMMTFEmpty(self):
         cmd.load(self.datafile("mmtf/empty-all0.mmtf"))
@@ -649,6 +834,89 @@ class TestImporting(testing.PyMOLTestCase):
             content = response.content.decode("ascii", errors="ignore")
             self.assertTrue(content, cmd.get_version()[0] in content)
 
+    @testing.requires_version('3.2')
+    def testLoadPWGThreaded(self):
+        port = _get_free_port()
+        base_url = f"http://localhost:{port}"
+
+        with TemporaryDirectory() as root_dir:
+            root_dir = Path(root_dir)
+            (root_dir / "index.html").write_bytes(b"Hello World\n")
+            start_pwg_file = root_dir / "start.pwg"
+            start_pwg_file.write_text(
+                f"root {root_dir}\n"
+                f"port {port}\n"
+                "threaded\n"
+            )
+            cmd.load(str(start_pwg_file))
+
+            # Warning: can't call locking functions here (e.g. /batch),
+            # will dead-lock
+
+            with requests.Session() as session:
+                for _ in range(2):
+                    response = session.get(
+                        f"{base_url}/apply/pymol.cmd.get_version",
+                        headers={"Accept": "application/json"}, timeout=5)
+                    response.raise_for_status()
+                    self.assertEqual(response.headers["Transfer-Encoding"], "chunked")
+                    self.assertEqual(response.json()[0], cmd.get_version()[0])
+
+                response = session.get(base_url, timeout=5)
+                self.assertEqual(response.content, b"Hello World\n")
+
+    @testing.requires_version('3.2')
+    def testLoadPWGBatch(self):
+        port = _get_free_port()
+        base_url = f"http://localhost:{port}"
+
+        with TemporaryDirectory() as root_dir:
+            start_pwg_file = Path(root_dir) / "start.pwg"
+            start_pwg_file.write_text(f"port {port}\nthreaded\n")
+            cmd.load(str(start_pwg_file))
+
+            def batch(blocks):
+                return requests.post(f"{base_url}/batch", json=blocks,
+                        headers={"Accept": "application/json"}, timeout=5)
+
+            # all results in order
+            response = batch([
+                ["pymol.cmd.fragment", ["gly"]],
+                ["pymol.cmd.count_atoms", ["gly"]],
+                ["pymol.cmd.get_names", [], {"enabled_only": 1}],
+            ])
+            response.raise_for_status()
+            self.assertEqual(response.json(), [None, 7, ["gly"]])
+
+            # unknown method, nothing is applied
+            response = batch([
+                ["pymol.cmd.fragment", ["ala"]],
+                ["pymol.cmd.no_such_method", []],
+            ])
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(response.json()[0], "Method not found:")
+            self.assertEqual(cmd.get_names(), ["gly"])
+
+            # methods which need the GUI thread are rejected
+            response = batch([
+                ["pymol.cmd.fragment", ["ala"]],
+                ["pymol.cmd.png", [str(Path(root_dir) / "image.png")]],
+            ])
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()[0], "Method not allowed in batch:")
+            self.assertEqual(cmd.get_names(), ["gly"])
+
+            # exception stops the batch and reports the index
+            response = batch([
+                ["pymol.cmd.fragment", ["ala"]],
+                ["pymol.cmd.fragment", ["no_such_fragment"]],
+                ["pymol.cmd.fragment", ["trp"]],
+            ])
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(response.json()[:2],
+                    ["Exception in: pymol.cmd.fragment", "Batch index: 1"])
+            self.assertEqual(cmd.get_names(), ["gly", "ala"])
+
     @testing.requires_version('2.1')
     def testChemCompCartnUse(self):
         xyz_model = (1., 2., 3.)
@@ -89,3 +89,33 @@ class TestMovie(testing.PyMOLTestCase):
 
     def test_produce(self):
         self.skipTest("TODO") # movie.produce(filename, mode='', first=0, last=0, preserve=0,
+
+    @testing.requires('no_edu') # ray
+    @testing.requires_version('3.2')
+    def test_produce_stream(self):
+        if not movie.find_exe('ffmpeg'):
+            self.skipTest('no ffmpeg')
+        import os
+        self._make_n_states(4)
+        cmd.mset('1 x2 2 x2 3 x2 4 x2')
+        with testing.mktemp('.mp4') as filename:
+            movie.produce(filename, 'ray', width=64, height=48, stream=1)
+            self.assertTrue(os.path.getsize(filename) > 0)
+            self.assertFalse(os.path.exists(filename[:-4] + '.tmp'))
+
+    @testing.requires('no_edu') # ray
+    @testing.requires_version('3.2')
+    def test_mpng_processes(self):
+        import numpy
+        self._make_n_states(4)
+        cmd.mset('1 x2 2 x2 3 x2 4 x2')
+        cmd.mdo(5, 'turn y, 30')
+        view = cmd.get_view()
+        with testing.mkdtemp() as dirname:
+            cmd.mpng(dirname + '/serial', width=40, height=30, mode=2)
+            cmd.set_view(view)
+            cmd.mpng(dirname + '/sharded', width=40, height=30, processes=3)
+            for frame in range(1, 9):
+                serial = self.get_imagearray('%s/serial%04d.png' % (dirname, frame))
+                sharded = self.get_imagearray('%s/sharded%04d.png' % (dirname, frame))
+                self.assertTrue(numpy.array_equal(serial, sharded), frame)
@@ -0,0 +1,143 @@
+import inspect
+import os
+import sys
+from unittest.mock import patch
+from pymol import cmd, testing
+
+plugin_source = '''
+# Version: 0.1
+from pymol import cmd
+from pymol import stored
+stored.test_plugin_loads = getattr(stored, 'test_plugin_loads', 0) + 1
+def test_plugin_cmd(value=1, quiet=1):
+    return int(value) * 2
+cmd.extend('test_plugin_cmd', test_plugin_cmd)
+cmd.auto_arg[0]['test_plugin_cmd'] = cmd.auto_arg[0]['zoom']
+'''
+
+
+@testing.requires_version('3.2')
+class TestPlugins(testing.PyMOLTestCase):
+
+    def _patch(self, path):
+        from pymol import plugins
+        return [
+            patch.object(plugins, 'PLUGINMANIFEST',
+                         os.path.join(path, 'plugins.json')),
+            patch.object(plugins, 'PYMOLPLUGINSRC',
+                         os.path.join(path, 'pymolpluginsrc.py')),
+            patch.object(plugins, 'preferences', {'instantsave': False}),
+            patch.object(plugins, 'plugins', {}),
+            patch.object(plugins, 'autoload', {}),
+            patch.object(plugins.startup, '__path__',
+                         [os.path.join(path, 'startup')]),
+        ]
+
+    def _initialize(self):
+        from pymol import plugins
+        plugins._manifest = None
+        sys.modules.pop('pmg_tk.startup.test_plugin', None)
+        cmd.keyword.pop('test_plugin_cmd', None)
+        plugins.initialize(-1)
+        return plugins.plugins['test_plugin']
+
+    def testFindPlugins(self):
+        from pymol import plugins
+        with testing.mkdtemp() as path:
+            for p in self._patch(path):
+                self.addCleanup(p.stop)
+                p.start()
+            plugins._manifest = None
+            startup = os.path.join(path, 'startup')
+            os.mkdir(startup)
+            with open(os.path.join(startup, 'foo.py'), 'w') as handle:
+                handle.write('# Version: 1.0\n')
+            st = os.stat(startup)
+
+            self.assertEqual(list(plugins.findPlugins([startup])), ['foo'])
+
+            # cached listing, unless the directory changed
+            with open(os.path.join(startup, 'bar.py'), 'w'):
+                pass
+            os.utime(startup, ns=(st.st_atime_ns, st.st_mtime_ns))
+            self.assertEqual(list(plugins.findPlugins([startup])), ['foo'])
+            os.utime(startup, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            self.assertEqual(sorted(plugins.findPlugins([startup])),
+                             ['bar', 'foo'])
+
+            plugins.manifest_save()
+            self.assertTrue(os.path.exists(plugins.PLUGINMANIFEST))
+
+    def testDeferred(self):
+        from pymol import plugins, stored
+        with testing.mkdtemp() as path:
+            for p in self._patch(path):
+                self.addCleanup(p.stop)
+                p.start()
+            os.mkdir(os.path.join(path, 'startup'))
+            with open(os.path.join(path, 'startup', 'test_plugin.py'), 'w') as handle:
+                handle.write(plugin_source)
+            stored.test_plugin_loads = 0
+
+            # first launch: load and record the command
+            info = self._initialize()
+            self.assertTrue(info.loaded)
+            self.assertEqual(info.commands, ['test_plugin_cmd'])
+            self.assertEqual(info.get_metadata()['Version'], '0.1')
+            self.assertEqual(stored.test_plugin_loads, 1)
+
+            # second launch: command stub, load on first use
+            info = self._initialize()
+            self.assertFalse(info.loaded)
+            self.assertTrue(info.deferred)
+            self.assertEqual(stored.test_plugin_loads, 1)
+            self.assertTrue('test_plugin_cmd' in cmd.keyword)
+            self.assertIs(cmd.auto_arg[0]['test_plugin_cmd'],
+                          cmd.auto_arg[0]['zoom'])
+
+            # stub has the arguments of the plugin command
+            from pymol import parsing
+            stub = cmd.keyword['test_plugin_cmd'][0]
+            self.assertEqual(list(inspect.signature(stub).parameters),
+                             ['value', 'quiet'])
+            self.assertEqual(parsing.prepare_call(stub, [(None, '3'),
+                ('quiet', '1')], parsing.STRICT, _self=cmd),
+                ([], {'value': '3', 'quiet': '1'}))
+            self.assertRaises(parsing.QuietException, parsing.prepare_call,
+                              stub, [(None, '?')], _self=cmd)
+            self.assertFalse(info.loaded)
+
+            self.assertEqual(stub(3), 6)
+            self.assertTrue(info.loaded)
+            self.assertEqual(stored.test_plugin_loads, 2)
+
+            # opt out
+            plugins.preferences['deferred'] = False
+            info = self._initialize()
+            self.assertTrue(info.loaded)
+            self.assertEqual(stored.test_plugin_loads, 3)
+            cmd.keyword.pop('test_plugin_cmd', None)
+            cmd.auto_arg[0].pop('test_plugin_cmd', None)
+
+    def testSideEffects(self):
+        from pymol import plugins, stored
+        with testing.mkdtemp() as path:
+            for p in self._patch(path):
+                self.addCleanup(p.stop)
+                p.start()
+            os.mkdir(os.path.join(path, 'startup'))
+            with open(os.path.join(path, 'startup', 'test_plugin.py'), 'w') as handle:
+                handle.write(plugin_source)
+                handle.write('cmd.set_key("F12", test_plugin_cmd)\n')
+            self.addCleanup(cmd.key_mappings.pop, 'F12', None)
+            stored.test_plugin_loads = 0
+
+            # key binding can't be stubbed, load eagerly
+            info = self._initialize()
+            self.assertTrue(info.loaded)
+            info = self._initialize()
+            self.assertTrue(info.loaded)
+            self.assertFalse(info.deferred)
+            self.assertEqual(stored.test_plugin_loads, 2)
+            cmd.keyword.pop('test_plugin_cmd', None)
+            cmd.auto_arg[0].pop('test_plugin_cmd', None)
@@ -266,6 +266,31 @@ class TestQuerying(testing.PyMOLTestCase):
         self.assertArrayEqual(a.ref_coord,  ref, delta=1e-4)
         self.assertArrayEqual(a.coord,      coord, delta=1e-4)
 
+    @testing.requires_version('3.2')
+    def testGetProperties(self):
+        cmd.fragment('ala', 'm1')
+        cmd.alter('all', 'b = index * 2')
+
+        rows = []
+        cmd.iterate('all', 'rows.append((name, b, elem))', space={'rows': rows})
+        names, bs, elems = zip(*rows)
+
+        props = cmd.get_properties('all', ['name', 'b', 'elem', 'coord'])
+        self.assertEqual(list(props), ['name', 'b', 'elem', 'coord'])
+        self.assertEqual(props['name'].tolist(), list(names))
+        self.assertEqual(props['b'].dtype.kind, 'f')
+        self.assertArrayEqual(props['b'], bs, delta=1e-4)
+        self.assertEqual(props['elem'].tolist(), list(elems))
+        self.assertArrayEqual(props['coord'], cmd.get_coords(), delta=1e-4)
+
+        # single name returns an array
+        self.assertArrayEqual(cmd.get_properties('all', 'x'),
+                              cmd.get_coords()[:, 0], delta=1e-4)
+        self.assertEqual(cmd.get_properties('none', 'resv').tolist(), [])
+
+        with self.assertRaises(CmdException):
+            cmd.get_properties('all', 'x', state=0)
+
     def testGetMovieLength(self):
         cmd.fragment('gly')
         self.assertEqual(cmd.get_movie_length(), 0)
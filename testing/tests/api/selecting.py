@@ -153,6 +153,29 @@ class TestSelecting(testing.PyMOLTestCase):
         cmd.select_list('s1', 'm1', [100], mode=mode)
         self.assertEqual(cmd.count_atoms('s1'), 0)
 
+    @testing.requires_version('3.2')
+    def testSelectKeys(self):
+        cmd.fab('ACDEF', 'm1', chain='A')
+        cmd.fab('GHI', 'm2', chain='B')
+
+        n = cmd.select_keys('s1', {('m1', '', 'A', '2'), ('m2', '', 'B', '3')})
+        self.assertEqual(n, cmd.count_atoms('/m1///2 | /m2///3'))
+        self.assertEqual(cmd.count_atoms('s1'), n)
+
+        n = cmd.select_keys('s1', ['CA', 'N'], 'name', 'm1')
+        self.assertEqual(n, 10)
+
+        n = cmd.select_keys('s1', [('m2', 1)], 'model index', merge=1)
+        self.assertEqual(n, 11)
+
+        n = cmd.select_keys('s1', [('m1', 1), ('m1', 3)], 'model, index')
+        self.assertEqual(n, 2)
+        self.assertEqual(cmd.count_atoms('s1 & m1 & index 1+3'), 2)
+
+        n = cmd.select_keys('s2', [])
+        self.assertEqual(n, 0)
+        self.assertEqual(cmd.count_atoms('s2'), 0)
+
     def testMacros(self):
         '''
         Test selection macros: /model/segi/chain/resn`resi/name`alt
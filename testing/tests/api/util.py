@@ -2,6 +2,8 @@ from __future__ import print_function
 from __future__ import absolute_import
 from __future__ import division
 
+import collections
+
 import pymol
 from pymol import cmd, testing, stored
 
@@ -30,14 +32,51 @@ class TestUtil(testing.PyMOLTestCase):
                 'molecular' if mode == 'solvent' else 'solvent')
         self.assertNotEqual(colors, colors_mode_other)
 
-    @testing.requires_version('1.7.2')
+    @testing.foreach.product((0, 1), (0, 1))
+    @testing.requires_version('3.2')
+    def test_select_in(self, ignore_case, ignore_case_chain):
+        cmd.fragment('ala', 'm1')
+        cmd.alter('m1', 'chain, segi = "A", "S"')
+        cmd.create('m2', 'm1')
+        cmd.alter('m2 & name C+O', 'chain = "a"')
+        cmd.alter('m2 & name CA+CB', 'name = name.lower()')
+        cmd.alter('m2 & name N', 'resn = "ala"')
+        cmd.set('ignore_case', ignore_case)
+        cmd.set('ignore_case_chain', ignore_case_chain)
+
+        n = pymol.util._select_in('s1', 'm1', 'm2')
+        self.assertEqual(n, cmd.select('s2', 'm1 in m2'))
+        self.assertEqual(cmd.count_atoms('s1 & s2'), n)
+
+    @testing.requires_version('3.2')
     def test_find_surface_residues(self):
-        pymol.util.find_surface_residues
-        self.skipTest("TODO")
-
+        cmd.load(self.datafile('1oky-frag.pdb'), 'm1')
+        cmd.remove('solvent')
+        cmd.set('dot_solvent')
+        cmd.get_area('m1', load_b=1)
+        res_area = collections.defaultdict(float)
+        cmd.iterate('m1', 'res_area[segi, chain, resi] += b', space=locals())
+        cutoff = cmd.get_setting_float('surface_residue_cutoff')
+        expected = set(k for (k, v) in res_area.items() if v >= cutoff)
+
+        name = pymol.util.find_surface_residues('m1', 'exposed')
+        self.assertEqual(name, 'exposed')
+        found = set()
+        cmd.iterate(name, 'found.add((segi, chain, resi))', space=locals())
+        self.assertEqual(found, expected)
+
+    @testing.requires_version('3.2')
     def test_find_surface_atoms(self):
-        pymol.util.find_surface_atoms
-        self.skipTest("TODO")
+        cmd.load(self.datafile('1oky-frag.pdb'), 'm1')
+        cmd.remove('solvent')
+        cmd.set('dot_solvent')
+        cmd.get_area('m1', load_b=1)
+        n = cmd.count_atoms('m1 & b > 10')
+        cmd.set('dot_solvent', 0)
+
+        name = pymol.util.find_surface_atoms('m1', 'exposed', 10)
+        self.assertEqual(cmd.count_atoms(name), n)
+        self.assertEqual(cmd.count_atoms(name + ' & b > 10'), n)
 
     @testing.requires_version('1.7.2')
     def test_get_area(self):
@@ -235,6 +274,31 @@ class TestUtil(testing.PyMOLTestCase):
         r = cmd.get_sasa_relative("resi 86", subsele="sidechain")
         self.assertAlmostEqual(r['1oky-frag', '', 'A', '86'], 0.812, delta=1e-3)
 
+    @testing.requires_version('3.2')
+    def test_get_sasa_relative_batched(self):
+        cmd.load(self.datafile('1oky-frag.pdb'), 'm1')
+        r = cmd.get_sasa_relative()
+
+        # reference: one tripeptide object per residue
+        cmd.set('dot_solvent')
+        for key in list(r)[::5]:
+            cmd.get_area('m1', load_b=1)
+            area = cmd.get_area('/%s/%s/%s/`%s' % key)
+            cmd.create('tripep', 'byres (/%s/%s/%s/`%s extend 1)' % key, zoom=0)
+            exposed = cmd.get_area('/tripep/%s/%s/`%s' % key[1:])
+            cmd.delete('tripep')
+            self.assertAlmostEqual(r[key], area / exposed, delta=1e-3)
+
+    @testing.requires_version('3.2')
+    def test_get_sasa_relative_processes(self):
+        cmd.load(self.datafile('1oky-frag.pdb'), 'm1')
+        cmd.create('m2', 'm1 & chain A')
+        r1 = cmd.get_sasa_relative()
+        r2 = cmd.get_sasa_relative(processes=2)
+        self.assertEqual(sorted(r1), sorted(r2))
+        for key in r1:
+            self.assertAlmostEqual(r1[key], r2[key], delta=1e-3)
+
     @testing.requires_version('1.8.6')
     def test_ligand_zoom(self):
         pymol.util.ligand_zoom
@@ -541,6 +541,45 @@ class TestViewing(testing.PyMOLTestCase):
         self.assertImageHasColor('blue', img)
         self.assertImageHasColor('0x7f007f', img, delta=30)
 
+    @testing.foreach('rgb', 'hsv', 'hls')
+    @testing.requires_version('3.2')
+    def testSpectrumanyInterpolation(self, interpolation):
+        import colorsys
+        from_rgb, to_rgb = {
+            'rgb': (lambda *c: c, lambda *c: c),
+            'hsv': (colorsys.rgb_to_hsv, colorsys.hsv_to_rgb),
+            'hls': (colorsys.rgb_to_hls, colorsys.hls_to_rgb),
+        }[interpolation]
+
+        cmd.fab('ACDEFGHIKLMNPQ', 'm1')
+        cmd.alter('all', 'b = resv * 1.5')
+        r = cmd.spectrum('b', 'red green blue', 'all',
+                interpolation=interpolation)
+        self.assertEqual(r, (1.5, 21.0))
+
+        cols = [from_rgb(*cmd.get_color_tuple(c)) for c in ('red', 'green', 'blue')]
+        stored.colors = []
+        cmd.iterate('all', 'stored.colors.append((b, color))')
+        for (b, color) in stored.colors:
+            v = (b - 1.5) / 19.5 * 2
+            i = min(int(v), 1)
+            p = v - i
+            col = [cols[i + 1][j] * p + cols[i][j] * (1.0 - p) for j in range(3)]
+            rgb = [int(0xFF * x) for x in to_rgb(*col)]
+            self.assertEqual(color,
+                    0x40000000 + rgb[0] * 0x10000 + rgb[1] * 0x100 + rgb[2])
+
+    @testing.requires_version('3.2')
+    def testSpectrumanyEnumerate(self):
+        cmd.fab('AGAGC', 'm1')
+        cmd.spectrum('resn', 'red blue', 'all')
+        stored.colors = {}
+        cmd.iterate('all', 'stored.colors.setdefault(resn, set()).add(color)')
+        self.assertEqual(len(stored.colors['ALA']), 1)
+        self.assertEqual(stored.colors['ALA'], {0x40ff0000})
+        self.assertEqual(stored.colors['GLY'], {0x400000ff})
+        self.assertEqual(len(stored.colors['CYS']), 1)
+
     def testSetColor(self):
         self._testSpectrum_setup()
         cmd.color('red')
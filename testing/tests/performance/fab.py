@@ -5,3 +5,8 @@ class StressFab(testing.PyMOLTestCase):
     def test(self):
         with self.timing(max=0.1):
             cmd.fab('AAAA')
+
+    @testing.requires_version('3.2')
+    def testBulk(self):
+        with self.timing(max=0.5):
+            cmd.fab('ACDEFGHIKLMNPQRSTVWY' * 10, ss=1)
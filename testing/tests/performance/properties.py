@@ -0,0 +1,68 @@
+'''
+Stress testing for get_properties/set_properties
+'''
+
+from pymol import cmd, testing
+
+class StressProperties(testing.PyMOLTestCase):
+
+    def load_big_example_multistate(self):
+        # 4434 atoms in 61 states (270474 atoms)
+        cmd.load(self.datafile('2cas.pdb.gz'))
+        cmd.load(self.datafile('2cas.dcd'))
+
+    def iterate_columns(self, state, names):
+        columns = {}
+        for name in names:
+            columns[name] = values = []
+            cmd.iterate_state(state, 'all', '_append(%s)' % name,
+                    space={'_append': values.append})
+        return columns
+
+    @testing.requires_version('3.2')
+    def testGetCoordinates(self):
+        self.load_big_example_multistate()
+        states = range(1, cmd.count_states() + 1)
+
+        # not part of the timing: first call imports numpy
+        cmd.get_properties('none', 'x')
+
+        with self.timing('iterate'):
+            ref = [self.iterate_columns(state, 'xyz') for state in states]
+
+        with self.timing('get_properties'):
+            props = [cmd.get_properties('all', 'x y z', state)
+                     for state in states]
+
+        # bulk copy, no Python evaluation per atom
+        (_, t_iterate), (_, t_props) = self.timings[-2:]
+        self.assertTrue(t_props * 2 < t_iterate)
+
+        for (columns, ref_columns) in zip(props, ref):
+            for name in 'xyz':
+                self.assertArrayEqual(columns[name], ref_columns[name],
+                                      delta=1e-4)
+
+    @testing.requires_version('3.2')
+    def testGetSetColumns(self):
+        self.load_big_example_multistate()
+        names = ['b', 'q', 'partial_charge', 'resv', 'flags', 'color']
+
+        with self.timing('iterate'):
+            ref = self.iterate_columns(1, names)
+
+        # one iterate pass for all columns (the per-atom property lookup
+        # remains, so the gain is modest)
+        with self.timing('get_properties'):
+            props = cmd.get_properties('all', names)
+
+        for name in names:
+            self.assertArrayEqual(props[name], ref[name], delta=1e-4)
+
+        b = props['b'][::-1]
+        with self.timing('set_properties'):
+            cmd.set_properties('all', {'b': b, 'q': 0.5})
+
+        self.assertArrayEqual(cmd.get_properties('all', 'b'), b, delta=1e-4)
+        self.assertArrayEqual(cmd.get_properties('all', 'q'),
+                              [0.5] * len(b), delta=1e-4)
@@ -42,3 +42,33 @@ class TestSystem(testing.PyMOLTestCase):
         import pymol
         with self.assertRaises(pymol.CmdException):
             import cmd
+
+    @testing.requires_version('3.2')
+    def testStartupReport(self):
+        import os, subprocess
+        env = dict(os.environ, PYMOL_STARTUP_REPORT='5')
+        output = subprocess.check_output([sys.executable, '-m', 'pymol',
+            '-cq'], env=env, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        self.assertTrue('Startup time report' in output)
+        self.assertTrue('import pymol.cmd' in output)
+        self.assertTrue('self ms' in output)
+
+    @testing.requires_version('3.2')
+    def testStartupLazy(self):
+        import subprocess
+        output = subprocess.check_output([sys.executable, '-m', 'pymol',
+            '-cq', '-d', '/import sys; print(sorted(set(["pymol.fitting",'
+            ' "pymol.morphing"]).intersection(sys.modules)))'],
+            universal_newlines=True)
+        self.assertEqual(output.split()[-1], '[]')
+
+    @testing.requires_version('3.2')
+    def testApiLazy(self):
+        # fresh process, fitting not imported yet
+        import subprocess
+        output = subprocess.check_output([sys.executable, '-m', 'pymol',
+            '-cq', '-d', 'api align'], stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        self.assertTrue('API: pymol.fitting.align' in output)
+        self.assertTrue('fitting.py' in output)